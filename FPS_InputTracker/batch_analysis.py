@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Batch Analysis - Analyze a whole directory of session logs at once
+Runs the vectorized session analysis across a process pool, caches results
+per file by content hash and writes an aggregated per-player report
+
+Usage:
+    python batch_analysis.py sessions/ --report season_report.json --workers 8
+
+Players are taken from the first sub-directory under the root
+(sessions/<player>/...), or from the file name prefix (<player>_<anything>.json)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+from session_analysis import analyze_file
+
+SESSION_SUFFIXES = ('.json', '.ndjson', '.itsb', '.itsa')
+CACHE_FILE = '.analysis_cache.json'
+CACHE_VERSION = 1
+
+
+def file_hash(path, block_size=1 << 20):
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def player_for(path, root):
+    """Player name from the directory layout or the file name prefix"""
+    relative = path.relative_to(root)
+    if len(relative.parts) > 1:
+        return relative.parts[0]
+    for separator in ('_', '-'):
+        if separator in path.stem:
+            return path.stem.split(separator, 1)[0]
+    return path.stem
+
+
+def find_sessions(root, exclude=()):
+    """All session files under root, sorted for stable output"""
+    exclude = {Path(p).resolve() for p in exclude}
+    return sorted(p for p in root.rglob('*')
+                  if p.is_file() and p.suffix in SESSION_SUFFIXES
+                  and not p.name.startswith('.') and p.resolve() not in exclude)
+
+
+def load_cache(path):
+    try:
+        with open(path, 'r') as f:
+            cache = json.load(f)
+        if cache.get('version') == CACHE_VERSION:
+            return cache
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+    return {'version': CACHE_VERSION, 'files': {}, 'results': {}}
+
+
+def save_cache(path, cache):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, path)
+
+
+def analyze_worker(path):
+    """Process pool entry point: analyze one file, never raise"""
+    try:
+        return path, analyze_file(path), None
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}"
+
+
+def weighted_mean(items, key):
+    """Mean of summary dicts' means, weighted by their counts"""
+    total = sum(item[key]['count'] for item in items if item[key].get('count'))
+    if not total:
+        return 0
+    return round(sum(item[key]['mean'] * item[key]['count']
+                     for item in items if item[key].get('count')) / total, 2)
+
+
+def aggregate_player(results):
+    """Combine per-session analysis results into one player summary"""
+    duration = sum(r['duration_s'] for r in results)
+    flicks = sum(r['mouse']['flicks']['count'] for r in results)
+    
+    mouse = [r['mouse'] for r in results]
+    clicks = [r['clicks'] for r in results]
+    holds = [r['key_holds'] for r in results]
+    strafes = [{'counter_strafe_ms': r['counter_strafe_ms']} for r in results]
+    
+    return {
+        'sessions': len(results),
+        'events': sum(r['events'] for r in results),
+        'duration_s': round(duration, 1),
+        'key_hold_mean_ms': weighted_mean(holds, 'overall'),
+        'key_holds': sum(h['overall']['count'] for h in holds),
+        'mouse_velocity_mean': weighted_mean(mouse, 'velocity'),
+        'mouse_distance_px': round(sum(m.get('distance_px', 0) for m in mouse), 1),
+        'flicks': flicks,
+        'flicks_per_minute': round(flicks / (duration / 60), 2) if duration > 0 else 0,
+        'counter_strafe_mean_ms': weighted_mean(strafes, 'counter_strafe_ms'),
+        'counter_strafes': sum(s['counter_strafe_ms']['count'] for s in strafes),
+        'move_to_click_mean_ms': weighted_mean(clicks, 'move_to_click_ms')
+    }
+
+
+def run_batch(root, report_path, cache_path, workers=None):
+    """Analyze new/changed sessions under root and write the report"""
+    root = Path(root)
+    cache = load_cache(cache_path)
+    files = find_sessions(root, exclude=[report_path, cache_path])
+    
+    file_results = {}
+    pending = {}
+    for path in files:
+        key = str(path.relative_to(root))
+        stat = path.stat()
+        entry = cache['files'].get(key)
+        
+        # Unchanged size/mtime: trust the cached hash without reading the file
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            digest = entry['sha256']
+        else:
+            digest = file_hash(path)
+            cache['files'][key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                                   'sha256': digest}
+        
+        if digest in cache['results']:
+            file_results[key] = cache['results'][digest]
+        else:
+            pending[str(path)] = (key, digest)
+    
+    errors = {}
+    if pending:
+        print(f"🔬 Analyzing {len(pending)} new/changed sessions "
+              f"({len(files) - len(pending)} cached)...")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(analyze_worker, path) for path in pending]
+            for future in as_completed(futures):
+                path, results, error = future.result()
+                key, digest = pending[path]
+                if error:
+                    errors[key] = error
+                    print(f"❌ {key}: {error}")
+                    continue
+                cache['results'][digest] = results
+                file_results[key] = results
+    else:
+        print(f"✅ All {len(files)} sessions cached, nothing to analyze")
+    
+    # Drop cache entries for files that no longer exist
+    live_keys = {str(p.relative_to(root)) for p in files}
+    cache['files'] = {k: v for k, v in cache['files'].items() if k in live_keys}
+    live_hashes = {v['sha256'] for v in cache['files'].values()}
+    cache['results'] = {k: v for k, v in cache['results'].items() if k in live_hashes}
+    save_cache(cache_path, cache)
+    
+    by_player = {}
+    for key, results in file_results.items():
+        by_player.setdefault(player_for(root / key, root), []).append(results)
+    
+    report = {
+        'generated': datetime.now().isoformat(),
+        'root': str(root),
+        'sessions': len(file_results),
+        'players': {player: aggregate_player(results)
+                    for player, results in sorted(by_player.items())},
+        'errors': errors
+    }
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Report for {len(report['players'])} players saved to {report_path}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch-analyze a directory of session logs")
+    parser.add_argument('directory', help="directory to scan (recursively) for sessions")
+    parser.add_argument('--report', default=None,
+                        help="report path (default: <directory>/season_report.json)")
+    parser.add_argument('--cache', default=None,
+                        help=f"cache path (default: <directory>/{CACHE_FILE})")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+    
+    root = Path(args.directory)
+    if not root.is_dir():
+        print("Directory not found!")
+        return 1
+    
+    report_path = Path(args.report) if args.report else root / 'season_report.json'
+    cache_path = Path(args.cache) if args.cache else root / CACHE_FILE
+    report = run_batch(root, report_path, cache_path, args.workers)
+    return 1 if report['errors'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
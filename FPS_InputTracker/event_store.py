@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Event Store - Compact columnar storage for InputTracker events
+Keeps one typed array per field instead of building a dict per event, so
+high polling rates don't turn into GC pressure on the listener threads
+"""
+
+import threading
+from array import array
+from collections.abc import Sequence
+from datetime import datetime
+
+# Event type codes (index into EVENT_TYPES)
+EVENT_TYPES = (
+    'keypress',
+    'keyrelease',
+    'mouse_click',
+    'mouse_release',
+    'mouse_move',
+    'mouse_scroll',
+)
+EVENT_CODES = {name: code for code, name in enumerate(EVENT_TYPES)}
+
+KEYPRESS = EVENT_CODES['keypress']
+KEYRELEASE = EVENT_CODES['keyrelease']
+MOUSE_CLICK = EVENT_CODES['mouse_click']
+MOUSE_RELEASE = EVENT_CODES['mouse_release']
+MOUSE_MOVE = EVENT_CODES['mouse_move']
+MOUSE_SCROLL = EVENT_CODES['mouse_scroll']
+
+# Name id 0 means "no key/button" (mouse moves and scrolls)
+NO_NAME = 0
+
+
+def coordinate(value):
+    """Pointer positions are kept as floats; whole ones are exported as ints"""
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def event_data(code, x, y, dx, dy, name):
+    """Rebuild the legacy 'data' dict for one event"""
+    x, y = coordinate(x), coordinate(y)
+    if code == KEYPRESS:
+        return {'key': name, 'action': 'press'}
+    if code == KEYRELEASE:
+        return {'key': name, 'action': 'release'}
+    if code == MOUSE_CLICK:
+        return {'x': x, 'y': y, 'button': name, 'action': 'click'}
+    if code == MOUSE_RELEASE:
+        return {'x': x, 'y': y, 'button': name, 'action': 'release'}
+    if code == MOUSE_MOVE:
+        return {'x': x, 'y': y}
+    return {'x': x, 'y': y, 'dx': dx, 'dy': dy}
+
+
+def export_event(wall_start, code, t, x, y, dx, dy, name, timestamp=None):
+    """Build the legacy event dict from raw fields (timestamp: wall_start + t)"""
+    if timestamp is None:
+        timestamp = wall_start + t
+    return {
+        'timestamp': timestamp,
+        'relative_time': t,
+        'datetime': datetime.fromtimestamp(timestamp).isoformat(),
+        'type': EVENT_TYPES[code],
+        'data': event_data(code, x, y, dx, dy, name)
+    }
+
+
+class EventStore:
+    """
+    Fixed-capacity ring buffer with one typed array per event field
+    Times are monotonic seconds relative to the session origin; wall clock
+    timestamps and ISO strings are only derived when exporting
+    """
+    
+    def __init__(self, capacity=10000, wall_start=0.0):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.wall_start = wall_start
+        
+        self.types = array('B', bytes(capacity))
+        self.times = array('d', bytes(8 * capacity))
+        # Doubles: some platforms report fractional (HiDPI) pointer positions
+        self.xs = array('d', bytes(8 * capacity))
+        self.ys = array('d', bytes(8 * capacity))
+        self.dxs = array('i', bytes(4 * capacity))
+        self.dys = array('i', bytes(4 * capacity))
+        self.name_ids = array('H', bytes(2 * capacity))
+        
+        # Interned key/button names, index 0 reserved for NO_NAME
+        self.names = [None]
+        self._name_ids = {}
+        
+        self.total = 0  # Events ever appended (including overwritten ones)
+        self._next = 0
+        self._lock = threading.Lock()
+    
+    def intern(self, name):
+        """Return the id for a key/button name, adding it if needed"""
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            with self._lock:
+                name_id = self._name_ids.get(name)
+                if name_id is None:
+                    name_id = len(self.names)
+                    self.names.append(name)
+                    self._name_ids[name] = name_id
+        return name_id
+    
+    def append(self, code, t, x=0, y=0, dx=0, dy=0, name_id=NO_NAME):
+        """Store one event, overwriting the oldest once full"""
+        with self._lock:
+            i = self._next
+            self.types[i] = code
+            self.times[i] = t
+            self.xs[i] = x
+            self.ys[i] = y
+            self.dxs[i] = int(dx)
+            self.dys[i] = int(dy)
+            self.name_ids[i] = name_id
+            self._next = i + 1 if i + 1 < self.capacity else 0
+            self.total += 1
+    
+    def clear(self, wall_start=None):
+        """Drop all stored events (interned names are kept)"""
+        with self._lock:
+            self.total = 0
+            self._next = 0
+            if wall_start is not None:
+                self.wall_start = wall_start
+    
+    def __len__(self):
+        return min(self.total, self.capacity)
+    
+    def _slot(self, index):
+        """Map a logical index (0 = oldest) to a ring buffer slot"""
+        if self.total <= self.capacity:
+            return index
+        return (self._next + index) % self.capacity
+    
+    def row(self, index):
+        """Raw (code, t, x, y, dx, dy, name_id) tuple for a logical index"""
+        i = self._slot(index)
+        return (self.types[i], self.times[i], self.xs[i], self.ys[i],
+                self.dxs[i], self.dys[i], self.name_ids[i])
+    
+    def rows(self):
+        """Iterate raw rows from oldest to newest"""
+        for index in range(len(self)):
+            yield self.row(index)
+    
+    def to_dict(self, row):
+        """Export a raw row in the legacy event dict format"""
+        code, t, x, y, dx, dy, name_id = row
+        return export_event(self.wall_start, code, t, x, y, dx, dy, self.names[name_id])
+    
+    def view(self):
+        """Read-only sequence of legacy event dicts backed by this store"""
+        return EventView(self)
+
+
+class EventView(Sequence):
+    """Sequence view exposing stored events as legacy dicts on demand"""
+    
+    def __init__(self, store):
+        self.store = store
+    
+    def __len__(self):
+        return len(self.store)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("event index out of range")
+        return self.store.to_dict(self.store.row(index))
+    
+    def __iter__(self):
+        to_dict = self.store.to_dict
+        for row in self.store.rows():
+            yield to_dict(row)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Ingest Queue - Keeps work off the pynput listener threads
+Callbacks only push a raw event tuple; a consumer thread drains the queue in
+batches and does the statistics, storage and persistence
+"""
+
+import threading
+import time
+from collections import deque
+
+
+class IngestQueue:
+    """
+    Bounded queue between the listener threads and the ingest worker
+    The keyboard and mouse listeners push from two threads, so push() holds
+    a lock for its capacity check, append and drop count (uncontended most
+    of the time). The single consumer needs no lock: deque.popleft is
+    atomic in CPython. When the queue is full new events are dropped and
+    counted
+    """
+    
+    def __init__(self, capacity=65536):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.dropped = 0
+        self.high_water = 0
+        self._items = deque()
+        self._push_lock = threading.Lock()
+    
+    def push(self, item):
+        """Add an event (producer side). Returns False if it was dropped"""
+        with self._push_lock:
+            if len(self._items) >= self.capacity:
+                self.dropped += 1
+                return False
+            self._items.append(item)
+            return True
+    
+    def drain(self, max_items):
+        """Remove up to max_items events in FIFO order (consumer side)"""
+        depth = len(self._items)
+        if depth > self.high_water:
+            self.high_water = depth
+        
+        popleft = self._items.popleft
+        return [popleft() for _ in range(min(depth, max_items))]
+    
+    @property
+    def depth(self):
+        """Number of events waiting to be processed"""
+        return len(self._items)
+
+
+class IngestWorker(threading.Thread):
+    """Consumer thread that hands queued events to a batch handler"""
+    
+    def __init__(self, queue, handle_batch, batch_size=1024, idle_sleep=0.002):
+        super().__init__(name="InputTrackerIngest", daemon=True)
+        self.queue = queue
+        self.handle_batch = handle_batch
+        self.batch_size = batch_size
+        self.idle_sleep = idle_sleep
+        
+        self.processed = 0
+        self.batches = 0
+        self._stop_event = threading.Event()
+    
+    def run(self):
+        while not self._stop_event.is_set():
+            if not self._process_once():
+                time.sleep(self.idle_sleep)
+        
+        # Flush whatever the listeners pushed before they stopped
+        while self._process_once():
+            pass
+    
+    def _process_once(self):
+        """Process one batch, returning False when the queue was empty"""
+        batch = self.queue.drain(self.batch_size)
+        if not batch:
+            return False
+        
+        self.handle_batch(batch)
+        self.processed += len(batch)
+        self.batches += 1
+        return True
+    
+    def stop(self, timeout=None):
+        """Ask the worker to finish the queue and wait for it"""
+        self._stop_event.set()
+        self.join(timeout)
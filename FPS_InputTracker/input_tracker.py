@@ -4,35 +4,68 @@ Input Tracker - Advanced keypress and mouse logging tool for FPS analysis
 Captures precise timing data for performance analysis and gameplay review
 """
 
+import argparse
 import json
 import time
 import threading
 from datetime import datetime
 from pathlib import Path
-from collections import defaultdict, deque
-import statistics
+from collections import defaultdict
+
+from event_store import (
+    EventStore, EVENT_CODES, NO_NAME,
+    KEYPRESS, KEYRELEASE, MOUSE_CLICK, MOUSE_RELEASE, MOUSE_MOVE, MOUSE_SCROLL
+)
+from ingest_queue import IngestQueue, IngestWorker
+from session_stream import SessionStreamWriter, load_stream
+from mouse_path import MousePath
+from rolling_stats import SlidingWindowStats
+from live_publisher import LiveStatsPublisher
 
 try:
     from pynput import keyboard, mouse
     from pynput.keyboard import Key
     from pynput.mouse import Button
 except ImportError:
-    print("Error: pynput not installed. Install with: pip install pynput")
-    exit(1)
+    # Replay/benchmark runs drive the callbacks directly and don't need hooks
+    keyboard = mouse = Key = Button = None
+
+PYNPUT_MISSING = "Error: pynput not installed. Install with: pip install pynput"
+MOVE_LOG_INTERVAL = 0.1  # Seconds between mouse moves kept in the event log
 
 
 class InputTracker:
-    def __init__(self, log_file="input_log.json", max_events=10000):
+    def __init__(self, log_file="input_log.json", max_events=10000,
+                 async_ingest=False, queue_size=65536,
+                 stream_log=False, chunk_size=2048,
+                 full_rate_mouse=False, path_tolerance=0.0,
+                 stats_window=10.0):
         self.log_file = Path(log_file)
         self.max_events = max_events
-        self.events = deque(maxlen=max_events)
         self.session_start = time.time()
+        self._clock_start = time.perf_counter()
+        
+        # Columnar event storage; self.events is a legacy dict view over it
+        self.store = EventStore(max_events, wall_start=self.session_start)
+        self.events = self.store.view()
         self.running = False
         
         # Listeners
         self.keyboard_listener = None
         self.mouse_listener = None
         
+        # Async ingest: callbacks only enqueue, a worker thread does the rest
+        self.async_ingest = async_ingest
+        self.ingest_queue = IngestQueue(queue_size) if async_ingest else None
+        self.ingest_worker = None
+        self.submit_event = self._enqueue_event if async_ingest else self.record_event
+        
+        # Streaming mode: append events to an NDJSON file while running
+        self.stream_log = stream_log
+        self.stream_file = self.log_file.with_suffix('.ndjson')
+        self.chunk_size = chunk_size
+        self.stream_writer = None
+        
         # Statistics tracking
         self.stats = {
             'total_keypresses': 0,
@@ -40,41 +73,71 @@ class InputTracker:
             'total_mouse_moves': 0,
             'session_duration': 0,
             'key_frequencies': defaultdict(int),
-            'click_frequencies': defaultdict(int),
-            'movement_data': []
+            'click_frequencies': defaultdict(int)
         }
         
-        # Performance tracking
-        self.click_times = deque(maxlen=100)  # Last 100 clicks for CPS calculation
-        self.key_times = deque(maxlen=100)    # Last 100 keys for KPS calculation
+        # Mouse path: every logged move, or every move callback in full-rate
+        # mode, delta encoded and optionally simplified within path_tolerance px
+        self.full_rate_mouse = full_rate_mouse
+        self.mouse_path = MousePath(path_tolerance)
+        self._last_move_logged = None
+        
+        # Performance tracking (sliding windows over the last stats_window seconds)
+        self.stats_window = stats_window
+        self.click_window = SlidingWindowStats(stats_window)
+        self.key_window = SlidingWindowStats(stats_window)
         
         print(f"Input Tracker initialized. Logging to: {self.log_file}")
     
+    def _now(self):
+        """Monotonic seconds since the session started"""
+        return time.perf_counter() - self._clock_start
+    
     def log_event(self, event_type, data):
         """Log an input event with timestamp"""
-        timestamp = time.time()
-        event = {
-            'timestamp': timestamp,
-            'relative_time': timestamp - self.session_start,
-            'datetime': datetime.fromtimestamp(timestamp).isoformat(),
-            'type': event_type,
-            'data': data
-        }
-        
-        self.events.append(event)
+        self.submit_event(EVENT_CODES[event_type], self._now(),
+                          data.get('x', 0), data.get('y', 0),
+                          data.get('dx', 0), data.get('dy', 0),
+                          data.get('key', data.get('button')))
+    
+    def _enqueue_event(self, code, t, x=0, y=0, dx=0, dy=0, name=None):
+        """Hand a raw event to the ingest worker (async ingest mode)"""
+        self.ingest_queue.push((code, t, x, y, dx, dy, name))
+    
+    def _process_batch(self, batch):
+        """Apply a batch of queued events on the ingest worker thread"""
+        record_event = self.record_event
+        for event in batch:
+            record_event(*event)
+    
+    def record_event(self, code, t, x=0, y=0, dx=0, dy=0, name=None):
+        """Store a raw event in the columnar store and update statistics"""
+        if code == MOUSE_MOVE:
+            self.mouse_path.add(t, x, y)
+            
+            # Full-rate samples live in the path; the event log stays throttled
+            if self.full_rate_mouse:
+                last = self._last_move_logged
+                if last is not None and t - last <= MOVE_LOG_INTERVAL:
+                    return
+                self._last_move_logged = t
+        
+        name_id = self.store.intern(name) if name is not None else NO_NAME
+        self.store.append(code, t, x, y, dx, dy, name_id)
+        if self.stream_writer:
+            self.stream_writer.append((code, t, x, y, dx, dy, name))
         
         # Update statistics
-        if event_type == 'keypress':
+        if code == KEYPRESS:
             self.stats['total_keypresses'] += 1
-            self.stats['key_frequencies'][data.get('key', 'unknown')] += 1
-            self.key_times.append(timestamp)
-        elif event_type in ['mouse_click', 'mouse_release']:
+            self.stats['key_frequencies'][name or 'unknown'] += 1
+            self.key_window.add(t)
+        elif code == MOUSE_CLICK or code == MOUSE_RELEASE:
             self.stats['total_mouse_clicks'] += 1
-            self.stats['click_frequencies'][data.get('button', 'unknown')] += 1
-            self.click_times.append(timestamp)
-        elif event_type == 'mouse_move':
+            self.stats['click_frequencies'][name or 'unknown'] += 1
+            self.click_window.add(t)
+        elif code == MOUSE_MOVE:
             self.stats['total_mouse_moves'] += 1
-            self.stats['movement_data'].append((data.get('x', 0), data.get('y', 0)))
     
     def on_key_press(self, key):
         """Handle keyboard press events"""
@@ -83,10 +146,7 @@ class InputTracker:
         except AttributeError:
             key_name = str(key)
         
-        self.log_event('keypress', {
-            'key': key_name,
-            'action': 'press'
-        })
+        self.submit_event(KEYPRESS, self._now(), name=key_name)
     
     def on_key_release(self, key):
         """Handle keyboard release events"""
@@ -95,56 +155,64 @@ class InputTracker:
         except AttributeError:
             key_name = str(key)
         
-        self.log_event('keyrelease', {
-            'key': key_name,
-            'action': 'release'
-        })
+        self.submit_event(KEYRELEASE, self._now(), name=key_name)
         
         # Stop tracking on ESC key
-        if key == Key.esc:
+        if Key is not None and key == Key.esc:
             print("\nESC pressed - stopping tracker...")
             return False
     
     def on_mouse_click(self, x, y, button, pressed):
         """Handle mouse click events"""
-        action = 'click' if pressed else 'release'
-        event_type = 'mouse_click' if pressed else 'mouse_release'
-        
-        self.log_event(event_type, {
-            'x': x,
-            'y': y,
-            'button': str(button),
-            'action': action
-        })
+        code = MOUSE_CLICK if pressed else MOUSE_RELEASE
+        self.submit_event(code, self._now(), x, y, name=str(button))
     
     def on_mouse_move(self, x, y):
-        """Handle mouse movement events (throttled)"""
+        """Handle mouse movement events (throttled unless full_rate_mouse)"""
+        current_time = self._now()
+        if self.full_rate_mouse:
+            self.submit_event(MOUSE_MOVE, current_time, x, y)
+            return
+        
         # Throttle mouse movement logging to avoid spam
-        current_time = time.time()
-        if not hasattr(self, '_last_mouse_log') or current_time - self._last_mouse_log > 0.1:
-            self.log_event('mouse_move', {
-                'x': x,
-                'y': y
-            })
+        if not hasattr(self, '_last_mouse_log') or current_time - self._last_mouse_log > MOVE_LOG_INTERVAL:
+            self.submit_event(MOUSE_MOVE, current_time, x, y)
             self._last_mouse_log = current_time
     
     def on_mouse_scroll(self, x, y, dx, dy):
         """Handle mouse scroll events"""
-        self.log_event('mouse_scroll', {
-            'x': x,
-            'y': y,
-            'dx': dx,
-            'dy': dy
-        })
+        self.submit_event(MOUSE_SCROLL, self._now(), x, y, dx, dy)
     
-    def start_tracking(self):
-        """Start input tracking"""
+    def start_tracking(self, listen=True):
+        """Start input tracking (listen=False skips the OS hooks, for replay)"""
         if self.running:
             print("Tracker is already running!")
             return
+        if listen and keyboard is None:
+            print(PYNPUT_MISSING)
+            return
         
         self.running = True
         self.session_start = time.time()
+        self._clock_start = time.perf_counter()
+        self.store.wall_start = self.session_start
+        
+        if self.stream_log:
+            # Without async ingest, append() runs on the pynput callback
+            # threads: write and fsync chunks on the writer's own thread
+            self.stream_writer = SessionStreamWriter(self.stream_file, self.session_start,
+                                                     chunk_size=self.chunk_size,
+                                                     background=not self.async_ingest)
+            self.stream_writer.open()
+            if self.full_rate_mouse:
+                self.mouse_path.on_keep = self.stream_writer.append_path
+        
+        if self.async_ingest:
+            self.ingest_worker = IngestWorker(self.ingest_queue, self._process_batch)
+            self.ingest_worker.start()
+        
+        if not listen:
+            return
         
         # Start keyboard listener
         self.keyboard_listener = keyboard.Listener(
@@ -177,46 +245,66 @@ class InputTracker:
             self.keyboard_listener.stop()
         if self.mouse_listener:
             self.mouse_listener.stop()
+        if self.ingest_worker:
+            self.ingest_worker.stop()
         
         self.stats['session_duration'] = time.time() - self.session_start
         print("\n🛑 Input tracking stopped!")
     
     def get_performance_stats(self):
         """Calculate performance statistics"""
-        current_time = time.time()
-        
-        # Calculate CPS (Clicks Per Second) - last 10 seconds
-        recent_clicks = [t for t in self.click_times if current_time - t <= 10]
-        cps = len(recent_clicks) / min(10, current_time - self.session_start) if recent_clicks else 0
-        
-        # Calculate KPS (Keys Per Second) - last 10 seconds
-        recent_keys = [t for t in self.key_times if current_time - t <= 10]
-        kps = len(recent_keys) / min(10, current_time - self.session_start) if recent_keys else 0
+        now = self._now()
         
-        # Calculate average response time (time between key presses)
-        avg_key_interval = 0
-        if len(self.key_times) > 1:
-            intervals = [self.key_times[i] - self.key_times[i-1] for i in range(1, len(self.key_times))]
-            avg_key_interval = statistics.mean(intervals) * 1000  # Convert to milliseconds
+        # CPS/KPS and key intervals over the sliding window
+        clicks = self.click_window.snapshot(now, elapsed=now)
+        keys = self.key_window.snapshot(now, elapsed=now)
         
         return {
-            'cps': round(cps, 2),
-            'kps': round(kps, 2),
-            'avg_key_interval_ms': round(avg_key_interval, 2),
+            'cps': round(clicks['rate'], 2),
+            'kps': round(keys['rate'], 2),
+            'avg_key_interval_ms': round(keys['interval_mean_ms'], 2),
+            'key_interval_std_ms': round(keys['interval_std_ms'], 2),
+            'key_interval_p50_ms': round(keys['interval_p50_ms'], 2),
+            'key_interval_p95_ms': round(keys['interval_p95_ms'], 2),
+            'key_interval_p99_ms': round(keys['interval_p99_ms'], 2),
+            'avg_click_interval_ms': round(clicks['interval_mean_ms'], 2),
+            'click_interval_p95_ms': round(clicks['interval_p95_ms'], 2),
             'total_events': len(self.events),
-            'session_duration': round(current_time - self.session_start, 2)
+            'session_duration': round(now, 2)
+        }
+    
+    def get_ingest_stats(self):
+        """Queue depth and drop counters for async ingest mode"""
+        if not self.async_ingest:
+            return None
+        
+        worker = self.ingest_worker
+        return {
+            'queue_depth': self.ingest_queue.depth,
+            'queue_high_water': self.ingest_queue.high_water,
+            'queue_capacity': self.ingest_queue.capacity,
+            'dropped_events': self.ingest_queue.dropped,
+            'processed_events': worker.processed if worker else 0,
+            'batches': worker.batches if worker else 0
         }
     
     def print_live_stats(self):
         """Print live performance statistics"""
         perf_stats = self.get_performance_stats()
+        ingest_stats = self.get_ingest_stats()
+        
+        queue_info = ""
+        if ingest_stats:
+            queue_info = (f" | Queue: {ingest_stats['queue_depth']:4d}"
+                          f" | Dropped: {ingest_stats['dropped_events']}")
         
         print(f"\r📊 Live Stats: "
               f"CPS: {perf_stats['cps']:5.1f} | "
               f"KPS: {perf_stats['kps']:5.1f} | "
               f"Avg Interval: {perf_stats['avg_key_interval_ms']:6.1f}ms | "
               f"Events: {perf_stats['total_events']:5d} | "
-              f"Time: {perf_stats['session_duration']:6.1f}s", 
+              f"Time: {perf_stats['session_duration']:6.1f}s"
+              f"{queue_info}",
               end='', flush=True)
     
     def save_session(self):
@@ -228,14 +316,33 @@ class InputTracker:
                 'total_events': len(self.events)
             },
             'statistics': dict(self.stats),
-            'performance': self.get_performance_stats(),
-            'events': list(self.events)
+            'performance': self.get_performance_stats()
         }
         
         # Convert defaultdict to regular dict for JSON serialization
         session_data['statistics']['key_frequencies'] = dict(self.stats['key_frequencies'])
         session_data['statistics']['click_frequencies'] = dict(self.stats['click_frequencies'])
         
+        if self.stream_writer:
+            # The path samples are already in the stream; the footer only sums them up
+            self.mouse_path.finish()
+            session_data['mouse_path'] = self.mouse_path.summary()
+            self.finish_stream(session_data)
+            return
+        
+        session_data['mouse_path'] = self.mouse_path.to_dict()
+        
+        if self.log_file.suffix == '.itsa':
+            try:
+                from session_archive import save_store
+                writer = save_store(self.log_file, self.store, meta=session_data)
+                print(f"\n💾 Session archived to {self.log_file} "
+                      f"({writer.events_written} events in {len(writer.chunks)} chunks)")
+            except Exception as e:
+                print(f"\n❌ Error archiving session: {e}")
+            return
+        
+        session_data['events'] = list(self.events)
         try:
             with open(self.log_file, 'w') as f:
                 json.dump(session_data, f, indent=2)
@@ -243,11 +350,36 @@ class InputTracker:
         except Exception as e:
             print(f"\n❌ Error saving session: {e}")
     
+    def finish_stream(self, session_data):
+        """Flush the streaming log and write its footer"""
+        writer = self.stream_writer
+        self.mouse_path.on_keep = None
+        try:
+            writer.flush()
+            session_data['session_info']['total_events'] = writer.events_written
+            writer.close(session_data)
+            print(f"\n💾 Session streamed to {self.stream_file} "
+                  f"({writer.events_written} events in {len(writer.chunks)} chunks)")
+        except Exception as e:
+            print(f"\n❌ Error finishing session stream: {e}")
+        finally:
+            self.stream_writer = None
+    
     def load_session(self, file_path):
         """Load a previous session for analysis"""
         try:
-            with open(file_path, 'r') as f:
-                data = json.load(f)
+            if Path(file_path).suffix == '.ndjson':
+                data = load_stream(file_path)
+            elif Path(file_path).suffix == '.itsb':
+                from session_binary import BinarySession
+                data = BinarySession(file_path).to_session_data()
+            elif Path(file_path).suffix == '.itsa':
+                from session_archive import SessionArchive
+                with SessionArchive(file_path) as archive:
+                    data = archive.to_session_data()
+            else:
+                with open(file_path, 'r') as f:
+                    data = json.load(f)
             print(f"📂 Loaded session from {file_path}")
             return data
         except Exception as e:
@@ -275,11 +407,19 @@ class InputTracker:
         print(f"🖱️  Total Mouse Clicks: {stats.get('total_mouse_clicks', 0)}")
         print(f"📍 Total Mouse Moves: {stats.get('total_mouse_moves', 0)}")
         
+        mouse_path = session_data.get('mouse_path')
+        if mouse_path and mouse_path.get('samples_seen'):
+            print(f"🧭 Mouse Path: {mouse_path['points']} points kept "
+                  f"from {mouse_path['samples_seen']} samples")
+        
         if perf:
             print(f"\n🎯 PERFORMANCE METRICS")
             print(f"   CPS (Clicks/sec): {perf.get('cps', 0)}")
             print(f"   KPS (Keys/sec): {perf.get('kps', 0)}")
             print(f"   Avg Key Interval: {perf.get('avg_key_interval_ms', 0):.1f}ms")
+            if 'key_interval_p95_ms' in perf:
+                print(f"   Key Interval p50/p95: {perf['key_interval_p50_ms']:.1f}ms / "
+                      f"{perf['key_interval_p95_ms']:.1f}ms")
         
         # Most used keys
         key_freq = stats.get('key_frequencies', {})
@@ -296,10 +436,39 @@ class InputTracker:
             for button, count in click_freq.items():
                 print(f"   {button}: {count} clicks")
     
-    def run_with_live_display(self):
-        """Run tracker with live statistics display"""
+    def detailed_analysis(self, session_data=None):
+        """Vectorized analysis of raw events (key holds, flicks, strafes...)"""
+        try:
+            from session_analysis import analyze_session_data, analyze_tracker, print_analysis
+        except ImportError as e:
+            # numpy is optional: the summary from analyze_session() still stands
+            print(f"\nℹ️  Skipping detailed analysis: {e}")
+            return None
+        
+        if session_data is None:
+            results = analyze_tracker(self)
+        elif session_data.get('events'):
+            results = analyze_session_data(session_data)
+        else:
+            return None
+        
+        print_analysis(results)
+        return results
+    
+    def run_with_live_display(self, publish_port=None, publish_rate=10.0):
+        """Run tracker with live statistics display (optionally published for overlays)"""
         self.start_tracking()
         
+        publisher = None
+        if publish_port is not None:
+            publisher = LiveStatsPublisher(self, port=publish_port, rate=publish_rate)
+            try:
+                publisher.start()
+                print(f"📡 Publishing live stats at http://127.0.0.1:{publisher.port}/stats")
+            except OSError as e:
+                print(f"❌ Could not start live stats publisher: {e}")
+                publisher = None
+        
         try:
             while self.running:
                 time.sleep(1)
@@ -307,12 +476,30 @@ class InputTracker:
         except KeyboardInterrupt:
             pass
         finally:
+            if publisher:
+                publisher.stop()
             self.stop_tracking()
             self.save_session()
             self.analyze_session()
+            self.detailed_analysis()
 
 
 def main():
+    parser = argparse.ArgumentParser(description="FPS Input Tracker")
+    parser.add_argument('--async-ingest', action='store_true',
+                        help="process events on a worker thread instead of the listener threads")
+    parser.add_argument('--stream', action='store_true',
+                        help="append events to a crash-safe .ndjson log while tracking")
+    parser.add_argument('--full-rate-mouse', action='store_true',
+                        help="keep every mouse move callback in the mouse path")
+    parser.add_argument('--path-tolerance', type=float, default=0.0,
+                        help="mouse path simplification tolerance in px (default: 0, keep all)")
+    args = parser.parse_args()
+    
+    if keyboard is None:
+        print(PYNPUT_MISSING)
+        exit(1)
+    
     print("🎮 FPS Input Tracker")
     print("=" * 30)
     
@@ -321,7 +508,9 @@ def main():
     if not log_file:
         log_file = "input_log.json"
     
-    tracker = InputTracker(log_file)
+    tracker = InputTracker(log_file, async_ingest=args.async_ingest, stream_log=args.stream,
+                           full_rate_mouse=args.full_rate_mouse,
+                           path_tolerance=args.path_tolerance)
     
     print("\nChoose an option:")
     print("1. Start new tracking session")
@@ -333,8 +522,9 @@ def main():
     if choice == "1":
         print(f"\nStarting tracking session...")
         print("Tip: Keep this window visible to see live stats!")
+        port = input("Overlay stats port (blank to skip, e.g. 8765): ").strip()
         input("Press Enter to begin tracking...")
-        tracker.run_with_live_display()
+        tracker.run_with_live_display(publish_port=int(port) if port.isdigit() else None)
     
     elif choice == "2":
         file_path = input("Enter path to log file: ").strip()
@@ -342,6 +532,7 @@ def main():
             session_data = tracker.load_session(file_path)
             if session_data:
                 tracker.analyze_session(session_data)
+                tracker.detailed_analysis(session_data)
         else:
             print("File not found!")
     
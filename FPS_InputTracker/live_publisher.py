@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Live Publisher - Push live tracker stats to stream overlays
+Serves Server-Sent Events (and a plain JSON snapshot) on a local HTTP port,
+with optional UDP fan-out for local tools. Each snapshot is encoded once
+per tick and the same bytes are written to every subscriber
+
+Endpoints:
+    GET /stats        text/event-stream, one "data: {...}" frame per tick
+    GET /stats.json   latest snapshot
+
+Overlay usage (OBS browser source):
+    cs2_tournament_overlay.html?stats=http://127.0.0.1:8765/stats
+"""
+
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MAX_RATE = 60.0
+KEEPALIVE_INTERVAL = 15.0
+
+
+class LiveStatsPublisher:
+    """Samples a tracker at a fixed rate and fans snapshots out to subscribers"""
+    
+    def __init__(self, tracker, host='127.0.0.1', port=8765, rate=10.0, udp_targets=()):
+        self.tracker = tracker
+        self.host = host
+        self.port = port
+        self.rate = min(max(rate, 0.1), MAX_RATE)
+        self.udp_targets = list(udp_targets)
+        
+        self.version = 0
+        self.subscribers = 0
+        self._payload = b'{}'
+        self._frame = b''
+        self._changed = threading.Condition()
+        self._running = False
+        self._server = None
+        self._threads = []
+        self._udp_socket = None
+    
+    def start(self):
+        """Start the HTTP server and the sampling thread"""
+        if self._running:
+            return
+        
+        publisher = self
+        
+        class Handler(StatsRequestHandler):
+            pass
+        Handler.publisher = publisher
+        
+        # Raises OSError if the port is taken; nothing is running yet then,
+        # so start() can be retried
+        server = ThreadingHTTPServer((self.host, self.port), Handler)
+        if self.udp_targets:
+            try:
+                self._udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            except OSError:
+                server.server_close()
+                raise
+        server.daemon_threads = True
+        self._server = server
+        self.port = server.server_address[1]
+        self._running = True
+        
+        self._threads = [
+            threading.Thread(target=self._server.serve_forever, name="LiveStatsHTTP", daemon=True),
+            threading.Thread(target=self._sample_loop, name="LiveStatsSampler", daemon=True)
+        ]
+        for thread in self._threads:
+            thread.start()
+    
+    def stop(self):
+        """Stop sampling, close subscriber streams and the server"""
+        if not self._running:
+            return
+        self._running = False
+        with self._changed:
+            self._changed.notify_all()
+        
+        self._server.shutdown()
+        self._server.server_close()
+        for thread in self._threads:
+            thread.join(timeout=2)
+        if self._udp_socket:
+            self._udp_socket.close()
+    
+    def snapshot(self):
+        """Stats dict published to subscribers"""
+        snapshot = self.tracker.get_performance_stats()
+        ingest = self.tracker.get_ingest_stats()
+        if ingest:
+            snapshot['queue_depth'] = ingest['queue_depth']
+            snapshot['dropped_events'] = ingest['dropped_events']
+        snapshot['seq'] = self.version + 1
+        return snapshot
+    
+    def publish(self, snapshot):
+        """Encode a snapshot once and wake every subscriber"""
+        payload = json.dumps(snapshot, separators=(',', ':')).encode('utf-8')
+        frame = b'data: ' + payload + b'\n\n'
+        
+        with self._changed:
+            self._payload = payload
+            self._frame = frame
+            self.version += 1
+            self._changed.notify_all()
+        
+        for target in self.udp_targets:
+            try:
+                self._udp_socket.sendto(payload, target)
+            except OSError:
+                pass
+    
+    def _sample_loop(self):
+        interval = 1.0 / self.rate
+        next_tick = time.perf_counter()
+        while self._running:
+            self.publish(self.snapshot())
+            next_tick += interval
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # Fell behind (e.g. machine under load): skip missed ticks
+                next_tick = time.perf_counter()
+    
+    def wait_for_frame(self, seen_version, timeout):
+        """Block until a frame newer than seen_version exists (or timeout)"""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != seen_version or not self._running,
+                                   timeout)
+            return self.version, self._frame
+    
+    def track_subscriber(self, delta):
+        with self._changed:
+            self.subscribers += delta
+    
+    @property
+    def running(self):
+        return self._running
+    
+    @property
+    def latest_payload(self):
+        return self._payload
+
+
+class StatsRequestHandler(BaseHTTPRequestHandler):
+    """Serves /stats (SSE) and /stats.json for one publisher"""
+    
+    publisher = None
+    
+    def _headers(self, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Access-Control-Allow-Origin', '*')
+    
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if path == '/stats.json':
+            payload = self.publisher.latest_payload
+            self._headers('application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        elif path == '/stats':
+            self._stream()
+        else:
+            self.send_error(404)
+    
+    def _stream(self):
+        publisher = self.publisher
+        self._headers('text/event-stream')
+        self.end_headers()
+        
+        publisher.track_subscriber(1)
+        try:
+            seen = -1
+            while publisher.running:
+                version, frame = publisher.wait_for_frame(seen, KEEPALIVE_INTERVAL)
+                # Slow clients just skip to the newest frame
+                self.wfile.write(frame if version != seen else b': keepalive\n\n')
+                self.wfile.flush()
+                seen = version
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            publisher.track_subscriber(-1)
+    
+    def log_message(self, format, *args):
+        # Keep the live stats line in the terminal clean
+        pass
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Mouse Path - Full-rate mouse movement capture with on-the-fly compression
+Samples are delta encoded (microseconds, pixels) and can be simplified with
+an error bound, so memory grows with path complexity, not polling rate
+"""
+
+import math
+from array import array
+
+
+class MousePath:
+    """
+    Delta-encoded mouse path with optional opening-window simplification
+    
+    With tolerance > 0 a sample is only kept when dropping it would move some
+    skipped sample further than `tolerance` pixels from the straight,
+    constant-speed segment between the kept samples around it. Timing is part
+    of the check, so flick speed profiles survive the simplification
+    
+    `on_keep`, if set, is called with every kept (t_us, x, y) sample, e.g. to
+    write the path to a crash-safe log as it is recorded
+    """
+    
+    def __init__(self, tolerance=0.0, max_window=256, on_keep=None):
+        self.tolerance = tolerance
+        self.max_window = max_window
+        self.on_keep = on_keep
+        
+        # Kept samples: first one absolute, the rest as deltas
+        self.start = None           # (t_us, x, y)
+        self.dt_us = array('Q')  # 64-bit: gaps between moves can exceed 71 minutes
+        self.dxs = array('i')
+        self.dys = array('i')
+        self.samples_seen = 0
+        
+        self._last_kept = None      # (t_us, x, y)
+        self._pending = []          # Samples after _last_kept, newest last
+    
+    def __len__(self):
+        """Number of samples stored (including the latest one)"""
+        if self.start is None:
+            return 0
+        return 1 + len(self.dt_us) + (1 if self._pending else 0)
+    
+    def add(self, t, x, y):
+        """Add a sample; t is in seconds on a monotonic clock"""
+        sample = (int(round(t * 1e6)), int(x), int(y))
+        self.samples_seen += 1
+        
+        if self.start is None:
+            self.start = sample
+            self._last_kept = sample
+            if self.on_keep:
+                self.on_keep(sample)
+            return
+        
+        if self.tolerance <= 0:
+            self._keep(sample)
+            return
+        
+        if self._pending and (len(self._pending) >= self.max_window or
+                              not self._segment_fits(sample)):
+            # The segment can't be extended any further: keep its end point
+            self._keep(self._pending[-1])
+            self._pending = []
+        self._pending.append(sample)
+    
+    def _segment_fits(self, end):
+        """True if every pending sample lies within tolerance of last_kept->end"""
+        t0, x0, y0 = self._last_kept
+        t1, x1, y1 = end
+        span = t1 - t0
+        if span <= 0:
+            return False
+        
+        tolerance = self.tolerance
+        for t, x, y in self._pending:
+            ratio = (t - t0) / span
+            if math.hypot(x0 + (x1 - x0) * ratio - x, y0 + (y1 - y0) * ratio - y) > tolerance:
+                return False
+        return True
+    
+    def _keep(self, sample):
+        t, x, y = sample
+        last_t, last_x, last_y = self._last_kept
+        self.dt_us.append(max(t - last_t, 0))
+        self.dxs.append(x - last_x)
+        self.dys.append(y - last_y)
+        self._last_kept = sample
+        if self.on_keep:
+            self.on_keep(sample)
+    
+    def finish(self):
+        """Keep the newest sample too (end of recording), so on_keep sees the whole path"""
+        if self._pending:
+            self._keep(self._pending[-1])
+            self._pending = []
+    
+    def summary(self):
+        """to_dict() without the samples, for logs that store them elsewhere"""
+        return {
+            'encoding': 'delta',
+            'tolerance': self.tolerance,
+            'samples_seen': self.samples_seen,
+            'points': len(self)
+        }
+    
+    def points(self):
+        """Decode the path as a list of (t_seconds, x, y) tuples"""
+        if self.start is None:
+            return []
+        
+        t, x, y = self.start
+        points = [(t / 1e6, x, y)]
+        for dt, dx, dy in zip(self.dt_us, self.dxs, self.dys):
+            t += dt
+            x += dx
+            y += dy
+            points.append((t / 1e6, x, y))
+        
+        # The newest sample is always part of the path
+        if self._pending:
+            t, x, y = self._pending[-1]
+            points.append((t / 1e6, x, y))
+        return points
+    
+    def to_dict(self):
+        """JSON-friendly delta encoding of the path"""
+        if self.start is None:
+            return {'encoding': 'delta', 'samples_seen': 0, 'points': 0}
+        
+        dt_us, dxs, dys = self.dt_us.tolist(), self.dxs.tolist(), self.dys.tolist()
+        if self._pending:
+            t, x, y = self._pending[-1]
+            last_t, last_x, last_y = self._last_kept
+            dt_us.append(t - last_t)
+            dxs.append(x - last_x)
+            dys.append(y - last_y)
+        
+        return {
+            'encoding': 'delta',
+            'tolerance': self.tolerance,
+            'samples_seen': self.samples_seen,
+            'points': len(dt_us) + 1,
+            'start': list(self.start),
+            'dt_us': dt_us,
+            'dx': dxs,
+            'dy': dys
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a path from to_dict() output"""
+        path = cls(tolerance=data.get('tolerance', 0.0))
+        path.samples_seen = data.get('samples_seen', 0)
+        if data.get('start') is None:
+            return path
+        
+        path.start = tuple(data['start'])
+        path.dt_us = array('Q', data['dt_us'])
+        path.dxs = array('i', data['dx'])
+        path.dys = array('i', data['dy'])
+        t, x, y = path.start
+        path._last_kept = (t + sum(path.dt_us), x + sum(path.dxs), y + sum(path.dys))
+        return path
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Replay & Benchmark - Drive InputTracker without OS hooks
+Feeds recorded or synthetic event streams straight into the on_* callbacks
+at a fixed rate (up to tens of kHz) and reports throughput, per-callback
+latency percentiles and memory growth, so ingestion regressions can be
+caught without a desktop session
+
+Usage:
+    python replay_bench.py                          # default benchmark suite
+    python replay_bench.py --rate 20000 --events 200000
+    python replay_bench.py --replay session.ndjson --speed 1.0
+    python replay_bench.py --save baseline.json
+    python replay_bench.py --baseline baseline.json --tolerance 0.2
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from array import array
+from pathlib import Path
+
+from input_tracker import InputTracker
+from session_stream import load_stream
+
+
+class ReplayKey:
+    """Stand-in for a pynput key: printable keys have .char, others a name"""
+    
+    def __init__(self, char=None, name=None):
+        self.char = char
+        self.name = name
+    
+    def __str__(self):
+        return self.name or self.char
+
+
+MOVEMENT_KEYS = [ReplayKey(c) for c in 'wasd']
+OTHER_KEYS = [ReplayKey(c) for c in 'qerfgc12345'] + [ReplayKey(name='Key.space'),
+                                                    ReplayKey(name='Key.shift')]
+BUTTONS = ['Button.left', 'Button.right']
+
+# Default synthetic mix: mostly mouse moves, like a real 1000 Hz mouse
+DEFAULT_MIX = {'move': 0.80, 'key': 0.12, 'click': 0.06, 'scroll': 0.02}
+
+
+def synthetic_events(count, seed=0, mix=None):
+    """
+    Deterministic stream of (t, callback, args) tuples
+    t is a nominal time (1 ms apart); callback is an on_* method name
+    """
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    kinds = list(mix)
+    weights = [mix[k] for k in kinds]
+    
+    events = []
+    x, y = 960, 540
+    held_keys = []
+    t = 0.0
+    while len(events) < count:
+        t += 0.001
+        kind = rng.choices(kinds, weights)[0]
+        if kind == 'move':
+            x += rng.randint(-8, 8)
+            y += rng.randint(-4, 4)
+            events.append((t, 'on_mouse_move', (x, y)))
+        elif kind == 'key':
+            if held_keys and rng.random() < 0.5:
+                events.append((t, 'on_key_release', (held_keys.pop(0),)))
+            else:
+                key = rng.choice(MOVEMENT_KEYS if rng.random() < 0.7 else OTHER_KEYS)
+                held_keys.append(key)
+                events.append((t, 'on_key_press', (key,)))
+        elif kind == 'click':
+            button = rng.choice(BUTTONS)
+            events.append((t, 'on_mouse_click', (x, y, button, True)))
+            events.append((t + 0.0001, 'on_mouse_click', (x, y, button, False)))
+        else:
+            events.append((t, 'on_mouse_scroll', (x, y, 0, rng.choice((-1, 1)))))
+    return events[:count]
+
+
+def recorded_events(path):
+    """Convert a saved session (JSON/NDJSON/binary) into a replay stream"""
+    path = Path(path)
+    if path.suffix == '.ndjson':
+        events = load_stream(path)['events']
+    elif path.suffix == '.itsb':
+        from session_binary import BinarySession
+        events = BinarySession(path).events()
+    else:
+        with open(path, 'r') as f:
+            events = json.load(f)['events']
+    
+    keys = {}
+    stream = []
+    for event in events:
+        data = event['data']
+        t = event['relative_time']
+        event_type = event['type']
+        if event_type in ('keypress', 'keyrelease'):
+            name = data['key']
+            if name not in keys:
+                keys[name] = ReplayKey(char=name) if len(name) == 1 else ReplayKey(name=name)
+            callback = 'on_key_press' if event_type == 'keypress' else 'on_key_release'
+            stream.append((t, callback, (keys[name],)))
+        elif event_type in ('mouse_click', 'mouse_release'):
+            stream.append((t, 'on_mouse_click',
+                           (data['x'], data['y'], data['button'], event_type == 'mouse_click')))
+        elif event_type == 'mouse_move':
+            stream.append((t, 'on_mouse_move', (data['x'], data['y'])))
+        elif event_type == 'mouse_scroll':
+            stream.append((t, 'on_mouse_scroll', (data['x'], data['y'], data['dx'], data['dy'])))
+    return stream
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(int(fraction * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+class ReplayDriver:
+    """
+    Calls tracker callbacks from a single thread, like a pynput listener
+    rate: events per second (None = as fast as possible)
+    speed: follow the stream's own timestamps scaled by this factor
+    """
+    
+    def __init__(self, tracker, rate=None, speed=None):
+        self.tracker = tracker
+        self.rate = rate
+        self.speed = speed
+    
+    def _schedule(self, events):
+        if self.rate:
+            interval = 1.0 / self.rate
+            return [i * interval for i in range(len(events))]
+        if self.speed:
+            origin = events[0][0] if events else 0.0
+            return [(t - origin) / self.speed for t, _, _ in events]
+        return None
+    
+    def run(self, events):
+        """Replay events, returning throughput and latency statistics"""
+        schedule = self._schedule(events)
+        callbacks = {name: getattr(self.tracker, name) for name in
+                     ('on_key_press', 'on_key_release', 'on_mouse_click',
+                      'on_mouse_move', 'on_mouse_scroll')}
+        latencies = array('q', bytes(8 * len(events)))
+        late = 0
+        clock = time.perf_counter_ns
+        
+        start = time.perf_counter()
+        for i, (_, name, args) in enumerate(events):
+            if schedule is not None:
+                due = start + schedule[i]
+                remaining = due - time.perf_counter()
+                if remaining > 0.002:
+                    time.sleep(remaining - 0.001)
+                while time.perf_counter() < due:
+                    pass
+                if time.perf_counter() - due > 0.001:
+                    late += 1
+            
+            before = clock()
+            callbacks[name](*args)
+            latencies[i] = clock() - before
+        elapsed = time.perf_counter() - start
+        
+        ordered = sorted(latencies)
+        count = len(events)
+        return {
+            'events': count,
+            'elapsed_s': round(elapsed, 4),
+            'throughput_eps': round(count / elapsed, 1) if elapsed > 0 else 0,
+            'late_events': late,
+            'latency_us': {
+                'mean': round(sum(ordered) / count / 1000, 2) if count else 0,
+                'p50': round(percentile(ordered, 0.50) / 1000, 2),
+                'p95': round(percentile(ordered, 0.95) / 1000, 2),
+                'p99': round(percentile(ordered, 0.99) / 1000, 2),
+                'max': round(ordered[-1] / 1000, 2) if ordered else 0
+            }
+        }
+
+
+# name -> InputTracker keyword arguments
+SCENARIOS = {
+    'sync': {},
+    'sync+stream': {'stream_log': True},
+    'async': {'async_ingest': True},
+    'async+stream': {'async_ingest': True, 'stream_log': True},
+    'full-rate-mouse': {'async_ingest': True, 'full_rate_mouse': True, 'path_tolerance': 1.0},
+}
+
+
+def _replay_once(name, events, rate=None, speed=None, trace_memory=False):
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        tracker = InputTracker(Path(tmp) / 'bench.json', **SCENARIOS[name])
+        if trace_memory:
+            tracemalloc.start()
+        
+        tracker.start_tracking(listen=False)
+        result = ReplayDriver(tracker, rate=rate, speed=speed).run(events)
+        
+        # Include the time for the async worker to catch up
+        drain_start = time.perf_counter()
+        tracker.stop_tracking()
+        result['drain_s'] = round(time.perf_counter() - drain_start, 4)
+        
+        if trace_memory:
+            result['memory'] = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        
+        ingest = tracker.get_ingest_stats()
+        result['dropped_events'] = ingest['dropped_events'] if ingest else 0
+        if tracker.stream_writer:
+            tracker.save_session()
+    return result
+
+
+def run_scenario(name, events, rate=None, speed=None, measure_memory=True, repeat=1):
+    """
+    Run one tracker configuration over an event stream, keeping the fastest
+    of `repeat` runs. Memory is measured in a separate pass so tracemalloc
+    doesn't skew latency
+    """
+    runs = [_replay_once(name, events, rate, speed) for _ in range(max(repeat, 1))]
+    result = min(runs, key=lambda r: r['elapsed_s'] + r['drain_s'])
+    total = result['elapsed_s'] + result['drain_s']
+    result['ingest_eps'] = round(len(events) / total, 1) if total > 0 else 0
+    
+    if measure_memory:
+        current, peak = _replay_once(name, events, rate, speed, trace_memory=True)['memory']
+        result['memory_kb'] = round(current / 1024, 1)
+        result['memory_peak_kb'] = round(peak / 1024, 1)
+        result['bytes_per_event'] = round(current / max(len(events), 1), 1)
+    
+    result['scenario'] = name
+    return result
+
+
+def compare_to_baseline(results, baseline, tolerance, compare_throughput=True):
+    """
+    List regressions in throughput and p99 latency beyond tolerance
+    Throughput is only meaningful when neither run was rate limited
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if compare_throughput and result['throughput_eps'] < base['throughput_eps'] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {result['throughput_eps']} eps "
+                               f"< baseline {base['throughput_eps']} eps")
+        if result['latency_us']['p99'] > base['latency_us']['p99'] * (1 + tolerance):
+            regressions.append(f"{name}: p99 latency {result['latency_us']['p99']} us "
+                               f"> baseline {base['latency_us']['p99']} us")
+    return regressions
+
+
+def print_results(results):
+    print(f"{'scenario':<18}{'events/s':>12}{'ingest/s':>12}{'p50 us':>9}"
+          f"{'p95 us':>9}{'p99 us':>9}{'max us':>10}{'mem KB':>10}{'dropped':>9}")
+    print("-" * 98)
+    for name, r in results.items():
+        lat = r['latency_us']
+        print(f"{name:<18}{r['throughput_eps']:>12,.0f}{r['ingest_eps']:>12,.0f}"
+              f"{lat['p50']:>9.2f}{lat['p95']:>9.2f}{lat['p99']:>9.2f}{lat['max']:>10.1f}"
+              f"{r.get('memory_kb', 0):>10.1f}{r.get('dropped_events', 0):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay events into InputTracker and benchmark it")
+    parser.add_argument('--events', type=int, default=100000, help="synthetic events per run")
+    parser.add_argument('--rate', type=float, default=None,
+                        help="events per second (default: as fast as possible)")
+    parser.add_argument('--replay', help="replay a recorded session instead of synthetic input")
+    parser.add_argument('--speed', type=float, default=None,
+                        help="with --replay, follow recorded timing scaled by this factor")
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS),
+                        help="scenario(s) to run (default: all)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help="runs per scenario, best is kept")
+    parser.add_argument('--no-memory', action='store_true', help="skip tracemalloc")
+    parser.add_argument('--save', help="write results as JSON (e.g. a new baseline)")
+    parser.add_argument('--baseline', help="compare against a saved results file")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="allowed regression vs baseline (fraction, default 0.2)")
+    args = parser.parse_args()
+    
+    events = recorded_events(args.replay) if args.replay else synthetic_events(args.events, args.seed)
+    print(f"🎬 Replaying {len(events)} events "
+          f"({'max rate' if not (args.rate or args.speed) else args.rate or f'{args.speed}x'})")
+    
+    results = {}
+    for name in args.scenario or SCENARIOS:
+        results[name] = run_scenario(name, events, rate=args.rate, speed=args.speed,
+                                     measure_memory=not args.no_memory, repeat=args.repeat)
+    print_results(results)
+    
+    config = {'events': len(events), 'rate': args.rate, 'speed': args.speed,
+              'replay': args.replay, 'seed': args.seed}
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'config': config, 'results': results}, f, indent=2)
+        print(f"\n💾 Results saved to {args.save}")
+    
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        if baseline['config'] != config:
+            print("\n⚠️  Baseline was recorded with different settings")
+        paced = any(c['rate'] or c['speed'] for c in (config, baseline['config']))
+        regressions = compare_to_baseline(results, baseline['results'], args.tolerance,
+                                          compare_throughput=not paced)
+        if regressions:
+            print("\n❌ Regressions detected:")
+            for regression in regressions:
+                print(f"   {regression}")
+            return 1
+        print(f"\n✅ Within {args.tolerance:.0%} of baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
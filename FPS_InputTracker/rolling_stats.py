@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Rolling Stats - Incremental sliding-window rate and interval statistics
+Every update is amortized O(1), so live CPS/KPS stay cheap and accurate no
+matter how fast inputs arrive
+"""
+
+import math
+import threading
+from collections import deque
+
+# Interval histogram: log-spaced bins from 0.1 ms to ~10 s, 5% wide
+HIST_MIN = 1e-4
+HIST_RATIO = 1.05
+HIST_BINS = int(math.log(1e5) / math.log(HIST_RATIO)) + 2
+
+
+def _bin_index(interval):
+    if interval <= HIST_MIN:
+        return 0
+    return min(int(math.log(interval / HIST_MIN) / math.log(HIST_RATIO)) + 1, HIST_BINS - 1)
+
+
+def _bin_value(index):
+    """Representative interval (geometric middle) of a histogram bin"""
+    if index == 0:
+        return HIST_MIN
+    return HIST_MIN * HIST_RATIO ** (index - 0.5)
+
+
+class SlidingWindowStats:
+    """
+    Event rate plus mean, variance and percentiles of inter-event intervals
+    over the trailing `window` seconds
+    
+    Running sums give the mean/variance and a fixed log-spaced histogram
+    gives percentiles (to within one 5% bin); evicting old events undoes their
+    contribution instead of rescanning the window
+    """
+    
+    def __init__(self, window=10.0):
+        self.window = window
+        self.total = 0
+        
+        self._times = deque()
+        self._intervals = deque()   # (end_time, interval, bin)
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._histogram = [0] * HIST_BINS
+        self._last = None
+        self._lock = threading.Lock()
+    
+    def add(self, t):
+        """Record an event at time t (seconds, non-decreasing)"""
+        with self._lock:
+            if self._last is not None:
+                interval = t - self._last
+                index = _bin_index(interval)
+                self._intervals.append((t, interval, index))
+                self._sum += interval
+                self._sum_sq += interval * interval
+                self._histogram[index] += 1
+            self._last = t
+            self._times.append(t)
+            self.total += 1
+            self._evict(t)
+    
+    def _evict(self, now):
+        cutoff = now - self.window
+        times = self._times
+        while times and times[0] < cutoff:
+            times.popleft()
+        
+        intervals = self._intervals
+        while intervals and intervals[0][0] < cutoff:
+            _, interval, index = intervals.popleft()
+            self._sum -= interval
+            self._sum_sq -= interval * interval
+            self._histogram[index] -= 1
+        
+        if not intervals:
+            # Reset to avoid accumulating floating point drift
+            self._sum = 0.0
+            self._sum_sq = 0.0
+    
+    def _percentile(self, fraction, count):
+        target = max(1, math.ceil(fraction * count))
+        seen = 0
+        for index, bin_count in enumerate(self._histogram):
+            seen += bin_count
+            if seen >= target:
+                return _bin_value(index)
+        return 0.0
+    
+    def snapshot(self, now, elapsed=None):
+        """
+        Window statistics as of `now`. Intervals are in milliseconds; the
+        rate divides by min(window, elapsed) so short sessions aren't diluted
+        """
+        with self._lock:
+            self._evict(now)
+            count = len(self._times)
+            span = self.window if elapsed is None else min(self.window, elapsed)
+            rate = count / span if count and span > 0 else 0
+            
+            intervals = len(self._intervals)
+            mean = std = p50 = p95 = p99 = 0.0
+            if intervals:
+                mean = self._sum / intervals
+                variance = max(self._sum_sq / intervals - mean * mean, 0.0)
+                std = math.sqrt(variance)
+                p50 = self._percentile(0.50, intervals)
+                p95 = self._percentile(0.95, intervals)
+                p99 = self._percentile(0.99, intervals)
+        
+        return {
+            'count': count,
+            'rate': rate,
+            'interval_mean_ms': mean * 1000,
+            'interval_std_ms': std * 1000,
+            'interval_p50_ms': p50 * 1000,
+            'interval_p95_ms': p95 * 1000,
+            'interval_p99_ms': p99 * 1000
+        }
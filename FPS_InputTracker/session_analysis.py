@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Session Analysis - Vectorized analysis engine for recorded sessions
+Works on the raw event columns (binary, NDJSON or JSON logs) with NumPy array
+operations only, so multi-million event sessions analyze in under a second
+"""
+
+import json
+import sys
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError as e:
+    # Raised, not exit(): the tracker imports this lazily and works without numpy
+    raise ImportError("numpy is required for the vectorized session analysis. "
+                      "Install with: pip install numpy") from e
+
+from event_store import KEYPRESS, KEYRELEASE, MOUSE_CLICK, MOUSE_MOVE
+from session_archive import SessionArchive
+from session_binary import BinarySession, records_from_events, records_from_store
+from session_stream import load_stream
+
+# Analysis defaults
+FLICK_MIN_VELOCITY = 2000.0     # px/s to count as part of a flick
+FLICK_MIN_DISTANCE = 40.0       # px travelled for a flick to count
+COUNTER_STRAFE_WINDOW = 0.15    # s between releasing a key and pressing its opposite
+STRAFE_PAIRS = (('a', 'd'), ('w', 's'))
+
+
+def summarize(values, scale=1.0, digits=2):
+    """Count/mean/median/p95/max of an array (optionally rescaled)"""
+    values = np.asarray(values, dtype=np.float64) * scale
+    if values.size == 0:
+        return {'count': 0}
+    median, p95 = np.percentile(values, [50, 95])
+    return {
+        'count': int(values.size),
+        'mean': round(float(values.mean()), digits),
+        'median': round(float(median), digits),
+        'p95': round(float(p95), digits),
+        'max': round(float(values.max()), digits)
+    }
+
+
+def session_columns(records):
+    """Contiguous per-field arrays from a record array or mapped view"""
+    return {field: np.ascontiguousarray(records[field])
+            for field in ('t', 'type', 'name', 'x', 'y')}
+
+
+def normalized_name_ids(names):
+    """Lookup array mapping each name id to the id of its lowercase form"""
+    canonical = {}
+    lookup = np.zeros(max(len(names), 1), dtype=np.int64)
+    for name_id, name in enumerate(names):
+        key = name.lower() if isinstance(name, str) else name
+        lookup[name_id] = canonical.setdefault(key, name_id)
+    return lookup
+
+
+def key_holds(cols, names):
+    """
+    Pair each key press with the next release of the same key
+    Auto-repeat presses are folded into the first press of the hold
+    """
+    types = cols['type']
+    kb = np.nonzero((types == KEYPRESS) | (types == KEYRELEASE))[0]
+    if kb.size == 0:
+        return {'overall': {'count': 0}, 'per_key': {}}
+    
+    keys = normalized_name_ids(names)[cols['name'][kb]]
+    times = cols['t'][kb]
+    order = np.lexsort((times, keys))
+    keys, times = keys[order], times[order]
+    is_press = types[kb][order] == KEYPRESS
+    
+    # A hold starts at a press not preceded by a press of the same key
+    same_key_before = np.concatenate(([False], keys[1:] == keys[:-1]))
+    press_before = np.concatenate(([False], is_press[:-1]))
+    starts = is_press & ~(same_key_before & press_before)
+    
+    # Index of the next release at or after each position
+    n = keys.size
+    release_idx = np.where(~is_press, np.arange(n), n)
+    next_release = np.minimum.accumulate(release_idx[::-1])[::-1]
+    
+    start_idx = np.nonzero(starts)[0]
+    end_idx = next_release[start_idx]
+    valid = end_idx < n
+    start_idx, end_idx = start_idx[valid], end_idx[valid]
+    valid = keys[end_idx] == keys[start_idx]
+    start_idx, end_idx = start_idx[valid], end_idx[valid]
+    
+    durations = times[end_idx] - times[start_idx]
+    hold_keys = keys[start_idx]
+    
+    per_key = {}
+    for key_id in np.unique(hold_keys):
+        per_key[names[key_id]] = summarize(durations[hold_keys == key_id], 1000)
+    
+    return {'overall': summarize(durations, 1000), 'per_key': per_key}
+
+
+def path_arrays(mouse_path):
+    """Decode a saved MousePath dict into (t, x, y) arrays"""
+    t0, x0, y0 = mouse_path['start']
+    t = np.concatenate(([t0], t0 + np.cumsum(mouse_path['dt_us'], dtype=np.int64))) / 1e6
+    x = np.concatenate(([x0], x0 + np.cumsum(mouse_path['dx'], dtype=np.int64)))
+    y = np.concatenate(([y0], y0 + np.cumsum(mouse_path['dy'], dtype=np.int64)))
+    return t, x.astype(np.float64), y.astype(np.float64)
+
+
+def mouse_samples(cols, mouse_path=None):
+    """Best available mouse samples: the full-rate path, else logged moves"""
+    if mouse_path and mouse_path.get('start') is not None:
+        return path_arrays(mouse_path)
+    moves = cols['type'] == MOUSE_MOVE
+    return (cols['t'][moves], cols['x'][moves].astype(np.float64),
+            cols['y'][moves].astype(np.float64))
+
+
+def mouse_kinematics(t, x, y, min_velocity=FLICK_MIN_VELOCITY, min_distance=FLICK_MIN_DISTANCE):
+    """Velocity/acceleration profile and flick detection"""
+    if t.size < 3:
+        return {'samples': int(t.size), 'velocity': {'count': 0},
+                'acceleration': {'count': 0}, 'flicks': {'count': 0}}
+    
+    dt = np.diff(t)
+    step = np.hypot(np.diff(x), np.diff(y))
+    moving = dt > 0
+    dt, step = dt[moving], step[moving]
+    seg_t = t[1:][moving]
+    
+    velocity = step / dt
+    accel = np.diff(velocity) / np.maximum(np.diff(seg_t), 1e-6)
+    
+    # Flicks: runs of consecutive fast segments
+    fast = velocity >= min_velocity
+    edges = np.diff(np.concatenate(([0], fast.astype(np.int8), [0])))
+    run_starts = np.nonzero(edges == 1)[0]
+    run_ends = np.nonzero(edges == -1)[0]
+    
+    travelled = np.concatenate(([0.0], np.cumsum(step)))
+    distance = travelled[run_ends] - travelled[run_starts]
+    keep = distance >= min_distance
+    run_starts, run_ends, distance = run_starts[keep], run_ends[keep], distance[keep]
+    
+    elapsed = np.concatenate(([0.0], np.cumsum(dt)))
+    duration = elapsed[run_ends] - elapsed[run_starts]
+    peaks = np.empty(0)
+    if run_starts.size:
+        bounds = np.ravel(np.column_stack((run_starts, run_ends)))
+        peaks = np.maximum.reduceat(np.append(velocity, 0.0), bounds)[::2]
+    
+    return {
+        'samples': int(t.size),
+        'distance_px': round(float(step.sum()), 1),
+        'velocity': summarize(velocity, digits=1),
+        'acceleration': summarize(np.abs(accel), digits=1),
+        'flicks': {
+            'count': int(run_starts.size),
+            'distance_px': summarize(distance, digits=1),
+            'duration_ms': summarize(duration, 1000),
+            'peak_velocity': summarize(peaks, digits=1)
+        }
+    }
+
+
+def counter_strafes(cols, names, window=COUNTER_STRAFE_WINDOW, pairs=STRAFE_PAIRS):
+    """
+    Time from releasing a movement key to pressing the opposite one
+    Negative values mean the opposite key went down before the release
+    """
+    lookup = normalized_name_ids(names)
+    ids = {name.lower(): lookup[i] for i, name in enumerate(names) if isinstance(name, str)}
+    types = cols['type']
+    is_release = types == KEYRELEASE
+    is_press = types == KEYPRESS
+    keys = lookup[cols['name']]
+    
+    gaps = []
+    for first, second in pairs:
+        for released, pressed in ((first, second), (second, first)):
+            if released not in ids or pressed not in ids:
+                continue
+            release_t = cols['t'][is_release & (keys == ids[released])]
+            press_t = cols['t'][is_press & (keys == ids[pressed])]
+            if release_t.size == 0 or press_t.size == 0:
+                continue
+            
+            # Nearest opposite press to each release
+            padded = np.concatenate(([-np.inf], press_t, [np.inf]))
+            idx = np.searchsorted(press_t, release_t)
+            before, after = padded[idx], padded[idx + 1]
+            nearest = np.where(np.abs(after - release_t) < np.abs(before - release_t), after, before)
+            gap = nearest - release_t
+            gaps.append(gap[np.abs(gap) <= window])
+    
+    gaps = np.concatenate(gaps) if gaps else np.empty(0)
+    result = summarize(gaps, 1000)
+    if gaps.size:
+        result['overlapping'] = int((gaps < 0).sum())
+    return result
+
+
+def click_to_move(cols, t_mouse):
+    """Delay after each click until the next mouse movement sample"""
+    clicks = cols['t'][cols['type'] == MOUSE_CLICK]
+    if clicks.size == 0 or t_mouse.size == 0:
+        return {'click_to_move_ms': {'count': 0}, 'move_to_click_ms': {'count': 0}}
+    
+    t_mouse = np.sort(t_mouse)
+    idx = np.searchsorted(t_mouse, clicks, side='right')
+    has_next = idx < t_mouse.size
+    has_prev = idx > 0
+    
+    to_move = t_mouse[idx[has_next]] - clicks[has_next]
+    since_move = clicks[has_prev] - t_mouse[idx[has_prev] - 1]
+    return {
+        'click_to_move_ms': summarize(to_move, 1000),
+        'move_to_click_ms': summarize(since_move, 1000)
+    }
+
+
+def analyze_records(records, names, mouse_path=None):
+    """Run every analysis over a record array and return structured results"""
+    cols = session_columns(records)
+    t_mouse, x_mouse, y_mouse = mouse_samples(cols, mouse_path)
+    duration = float(cols['t'][-1] - cols['t'][0]) if cols['t'].size else 0.0
+    
+    return {
+        'events': int(cols['t'].size),
+        'duration_s': round(duration, 3),
+        'key_holds': key_holds(cols, names),
+        'mouse': mouse_kinematics(t_mouse, x_mouse, y_mouse),
+        'counter_strafe_ms': counter_strafes(cols, names),
+        'clicks': click_to_move(cols, t_mouse)
+    }
+
+
+def analyze_session_data(session_data):
+    """Analyze a loaded session dict (JSON/NDJSON/binary)"""
+    events = session_data.get('events', [])
+    if hasattr(events, 'session'):
+        # Binary view: analyze the mapped records directly
+        session = events.session
+        records, names = session.records[events.lo:events.hi], session.names
+    else:
+        records, names = records_from_events(events)
+    return analyze_records(records, names, session_data.get('mouse_path'))
+
+
+def analyze_tracker(tracker):
+    """Analyze the events currently held by an InputTracker"""
+    records, names = records_from_store(tracker.store)
+    return analyze_records(records, names, tracker.mouse_path.to_dict())
+
+
+def analyze_file(path):
+    """Load any supported session file and analyze it"""
+    path = Path(path)
+    if path.suffix == '.itsb':
+        with BinarySession(path) as session:
+            return analyze_records(session.records, session.names,
+                                   session.meta.get('mouse_path'))
+    
+    if path.suffix == '.itsa':
+        with SessionArchive(path) as archive:
+            records, names = archive.records()
+            return analyze_records(records, names, archive.meta.get('mouse_path'))
+    
+    if path.suffix == '.ndjson':
+        session_data = load_stream(path)
+    else:
+        with open(path, 'r') as f:
+            session_data = json.load(f)
+    return analyze_session_data(session_data)
+
+
+def print_analysis(results):
+    """Pretty-print analyze_* results"""
+    print("\n" + "="*60)
+    print("🔬 DETAILED ANALYSIS")
+    print("="*60)
+    
+    holds = results['key_holds']['overall']
+    if holds['count']:
+        print(f"⌨️  Key holds: {holds['count']} | mean {holds['mean']}ms | "
+              f"median {holds['median']}ms | p95 {holds['p95']}ms")
+    
+    mouse = results['mouse']
+    if mouse['velocity']['count']:
+        print(f"🖱️  Mouse velocity: mean {mouse['velocity']['mean']} px/s | "
+              f"p95 {mouse['velocity']['p95']} px/s | distance {mouse['distance_px']} px")
+        flicks = mouse['flicks']
+        if flicks['count']:
+            print(f"⚡ Flicks: {flicks['count']} | mean duration {flicks['duration_ms']['mean']}ms | "
+                  f"mean peak {flicks['peak_velocity']['mean']} px/s")
+    
+    strafes = results['counter_strafe_ms']
+    if strafes['count']:
+        print(f"🏃 Counter-strafes: {strafes['count']} | mean {strafes['mean']}ms | "
+              f"overlapping {strafes['overlapping']}")
+    
+    clicks = results['clicks']['move_to_click_ms']
+    if clicks['count']:
+        print(f"🎯 Move-to-click: median {clicks['median']}ms | "
+              f"click-to-move median {results['clicks']['click_to_move_ms'].get('median', 0)}ms")
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: session_analysis.py <session.json|.ndjson|.itsb|.itsa> [--json]")
+        return 1
+    
+    results = analyze_file(sys.argv[1])
+    if '--json' in sys.argv:
+        print(json.dumps(results, indent=2))
+    else:
+        print_analysis(results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,583 @@
+#!/usr/bin/env python3
+"""
+Session Archive - Compressed, chunk-indexed long-term session storage
+Events are grouped into time buckets, stored column by column and
+compressed chunk by chunk, so a season of sessions takes a fraction of the
+JSON size and reading one round only decompresses the chunks it overlaps
+
+File layout (little endian):
+    header    HEADER_STRUCT: magic, version, wall start
+    chunks    compressed column blocks, one per time bucket
+    footer    UTF-8 JSON: codec, chunk index, key/button names, session meta
+    trailer   TRAILER_STRUCT: footer offset, footer length, magic
+
+Chunk columns: type (u8), time, x and y (f64 bits XOR'd with the previous
+value), timestamp (f64 bits XOR'd with wall start + time), dx/dy (f64),
+name id (u16), then a JSON block with the original dicts of the few events
+the columns can't rebuild exactly (e.g. a datetime written in another
+timezone), so migrating a log loses nothing
+
+Usage:
+    python session_archive.py migrate sessions/ [--bucket 10] [--remove]
+    python session_archive.py info session.itsa
+    python session_archive.py window session.itsa 120 180
+"""
+
+import argparse
+import json
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+from event_store import EVENT_CODES, NO_NAME, coordinate, export_event
+from session_stream import STREAM_FORMAT, iter_stream, load_stream
+
+MAGIC = b'ITSA'
+FORMAT_VERSION = 2
+HEADER_STRUCT = struct.Struct('<4sHd')
+TRAILER_STRUCT = struct.Struct('<QQ4s')
+CHUNK_COUNT = struct.Struct('<I')
+ORIGINALS_LENGTH = struct.Struct('<I')
+
+DEFAULT_BUCKET_SECONDS = 10.0
+MAX_CHUNK_EVENTS = 65536
+MIGRATE_SUFFIXES = ('.json', '.ndjson')
+
+# Column typecodes, in the order they are stored in a chunk
+COLUMNS = ('B', 'Q', 'Q', 'Q', 'Q', 'd', 'd', 'H')
+LITTLE_ENDIAN = sys.byteorder == 'little'
+
+
+def available_codecs():
+    """Codec names usable here, fastest first (zlib always works)"""
+    codecs = []
+    if zstandard is not None:
+        codecs.append('zstd')
+    if lz4_frame is not None:
+        codecs.append('lz4')
+    codecs.append('zlib')
+    return codecs
+
+
+def compress(codec, data):
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    if codec == 'lz4':
+        return lz4_frame.compress(data)
+    return zlib.compress(data, 6)
+
+
+def decompress(codec, data):
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ValueError("Archive uses zstd: pip install zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == 'lz4':
+        if lz4_frame is None:
+            raise ValueError("Archive uses lz4: pip install lz4")
+        return lz4_frame.decompress(data)
+    if codec == 'zlib':
+        return zlib.decompress(data)
+    raise ValueError(f"Unknown codec: {codec}")
+
+
+def _float_bits(values):
+    """float64 values as their raw 64-bit patterns"""
+    return array('Q', array('d', values).tobytes())
+
+
+def _xor_previous(bits):
+    """
+    XOR each bit pattern with the one before it; neighbouring values share
+    their high bits, so the result is mostly zeros and compresses well
+    """
+    previous = 0
+    encoded = array('Q')
+    for value in bits:
+        encoded.append(value ^ previous)
+        previous = value
+    return encoded
+
+
+def _unxor_previous(encoded):
+    """float64 values back from _xor_previous() output"""
+    previous = 0
+    bits = array('Q')
+    for value in encoded:
+        previous ^= value
+        bits.append(previous)
+    return array('d', bits.tobytes())
+
+
+def encode_chunk(rows, wall_start, stamps, originals=None):
+    """
+    Column block for raw (code, t, x, y, dx, dy, name_id) rows, their wall
+    clock timestamps and {row index: event dict} originals
+    """
+    types, times, timestamps, xs, ys, dxs, dys, names = (array(code) for code in COLUMNS)
+    for code, t, x, y, dx, dy, name_id in rows:
+        types.append(code)
+        dxs.append(dx)
+        dys.append(dy)
+        names.append(name_id)
+    
+    time_bits = _float_bits([row[1] for row in rows])
+    times = _xor_previous(time_bits)
+    # Timestamps normally equal wall start + t, making this column all zeros
+    expected = _float_bits([wall_start + row[1] for row in rows])
+    timestamps = array('Q', (bits ^ expected_bits for bits, expected_bits
+                             in zip(_float_bits(stamps), expected)))
+    xs = _xor_previous(_float_bits([row[2] for row in rows]))
+    ys = _xor_previous(_float_bits([row[3] for row in rows]))
+    
+    parts = [CHUNK_COUNT.pack(len(rows))]
+    for column in (types, times, timestamps, xs, ys, dxs, dys, names):
+        if not LITTLE_ENDIAN:
+            column.byteswap()
+        parts.append(column.tobytes())
+    
+    originals_bytes = json.dumps(originals, default=str).encode('utf-8') if originals else b''
+    parts.append(ORIGINALS_LENGTH.pack(len(originals_bytes)))
+    parts.append(originals_bytes)
+    return b''.join(parts)
+
+
+def decode_chunk(data, wall_start):
+    """(rows, timestamps, originals) from encode_chunk() output"""
+    (count,) = CHUNK_COUNT.unpack_from(data, 0)
+    offset = CHUNK_COUNT.size
+    columns = []
+    for code in COLUMNS:
+        column = array(code)
+        size = column.itemsize * count
+        column.frombytes(data[offset:offset + size])
+        if not LITTLE_ENDIAN:
+            column.byteswap()
+        columns.append(column)
+        offset += size
+    types, times, timestamps, xs, ys, dxs, dys, names = columns
+    
+    times = _unxor_previous(times)
+    expected = _float_bits([wall_start + t for t in times])
+    stamps = array('d', array('Q', (bits ^ expected_bits for bits, expected_bits
+                                    in zip(timestamps, expected))).tobytes())
+    xs = _unxor_previous(xs)
+    ys = _unxor_previous(ys)
+    
+    (length,) = ORIGINALS_LENGTH.unpack_from(data, offset)
+    offset += ORIGINALS_LENGTH.size
+    originals = {int(i): event for i, event
+                 in json.loads(data[offset:offset + length]).items()} if length else {}
+    
+    rows = [(types[i], times[i], coordinate(xs[i]), coordinate(ys[i]),
+             coordinate(dxs[i]), coordinate(dys[i]), names[i]) for i in range(count)]
+    return rows, stamps, originals
+
+
+class SessionArchiveWriter:
+    """
+    Writes events to an archive chunk by chunk
+    
+    A chunk is closed when an event falls into the next `bucket_seconds`
+    bucket or the chunk reaches MAX_CHUNK_EVENTS, and is compressed and
+    written straight away. The chunk index goes into the footer on close()
+    """
+    
+    def __init__(self, path, wall_start, bucket_seconds=DEFAULT_BUCKET_SECONDS, codec=None):
+        self.path = Path(path)
+        self.wall_start = wall_start
+        self.bucket_seconds = bucket_seconds
+        self.codec = codec or available_codecs()[0]
+        if self.codec not in available_codecs():
+            raise ValueError(f"Codec not available: {self.codec}")
+        
+        self.names = [None]
+        self._name_ids = {None: NO_NAME}
+        self.chunks = []
+        self.events_written = 0
+        self._rows = []
+        self._stamps = []
+        self._originals = {}
+        self._bucket = None
+        self._file = open(self.path, 'wb')
+        self._file.write(HEADER_STRUCT.pack(MAGIC, FORMAT_VERSION, wall_start))
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, *exc_info):
+        # close() writes the footer; after an error the partial file is removed
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+    
+    def name_id(self, name):
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = self._name_ids[name] = len(self.names)
+            self.names.append(name)
+        return name_id
+    
+    def append(self, code, t, x=0, y=0, dx=0, dy=0, name=None, timestamp=None):
+        """
+        Add one raw event; name is the key/button name (or None) and
+        timestamp its wall clock time (default: wall start + t)
+        """
+        bucket = int(t // self.bucket_seconds)
+        if self._rows and (bucket != self._bucket or len(self._rows) >= MAX_CHUNK_EVENTS):
+            self._flush_chunk()
+        self._bucket = bucket
+        self._rows.append((code, t, x, y, dx, dy, self.name_id(name)))
+        self._stamps.append(self.wall_start + t if timestamp is None else timestamp)
+    
+    def append_event(self, event):
+        """Add one legacy event dict, keeping it whole if the columns can't rebuild it"""
+        code = EVENT_CODES[event['type']]
+        data = event.get('data', {})
+        t = event['relative_time']
+        timestamp = event.get('timestamp', self.wall_start + t)
+        fields = (data.get('x', 0), data.get('y', 0), data.get('dx', 0), data.get('dy', 0),
+                  data.get('key', data.get('button')))
+        self.append(code, t, *fields, timestamp=timestamp)
+        if export_event(self.wall_start, code, t, *fields, timestamp=timestamp) != event:
+            self._originals[len(self._rows) - 1] = event
+    
+    def discard(self):
+        """Close and delete an unfinished archive"""
+        self._file.close()
+        self.path.unlink(missing_ok=True)
+    
+    def _flush_chunk(self):
+        raw = encode_chunk(self._rows, self.wall_start, self._stamps, self._originals)
+        block = compress(self.codec, raw)
+        times = [row[1] for row in self._rows]
+        self.chunks.append({
+            'start': min(times),
+            'end': max(times),
+            'offset': self._file.tell(),
+            'length': len(block),
+            'raw_length': len(raw),
+            'events': len(self._rows)
+        })
+        self._file.write(block)
+        self.events_written += len(self._rows)
+        self._rows = []
+        self._stamps = []
+        self._originals = {}
+    
+    def close(self, meta=None):
+        """Write the last chunk, the footer and the trailer"""
+        if self._file.closed:
+            return
+        if self._rows:
+            self._flush_chunk()
+        footer = {
+            'codec': self.codec,
+            'bucket_seconds': self.bucket_seconds,
+            'total_events': self.events_written,
+            'chunks': sorted(self.chunks, key=lambda chunk: chunk['start']),
+            'names': self.names,
+            'meta': meta or {}
+        }
+        footer_bytes = json.dumps(footer, default=str).encode('utf-8')
+        offset = self._file.tell()
+        self._file.write(footer_bytes)
+        self._file.write(TRAILER_STRUCT.pack(offset, len(footer_bytes), MAGIC))
+        self._file.close()
+
+
+class SessionArchive:
+    """
+    Read access to an archive; only the chunks a query overlaps are read
+    and decompressed (counted in chunks_read)
+    """
+    
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        magic, version, self.wall_start = HEADER_STRUCT.unpack(self._file.read(HEADER_STRUCT.size))
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a session archive")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported archive version {version}")
+        
+        self._file.seek(-TRAILER_STRUCT.size, 2)
+        offset, length, magic = TRAILER_STRUCT.unpack(self._file.read(TRAILER_STRUCT.size))
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} has no footer (incomplete archive)")
+        self._file.seek(offset)
+        footer = json.loads(self._file.read(length))
+        
+        self.codec = footer['codec']
+        self.bucket_seconds = footer['bucket_seconds']
+        self.total_events = footer['total_events']
+        self.chunks = footer['chunks']
+        self.names = footer['names']
+        self.meta = footer['meta']
+        self.chunks_read = 0
+        self._chunk_starts = [chunk['start'] for chunk in self.chunks]
+    
+    def __len__(self):
+        return self.total_events
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def close(self):
+        self._file.close()
+    
+    def chunks_for(self, start=None, end=None):
+        """Index entries of the chunks that may hold events with start <= t < end"""
+        hi = len(self.chunks) if end is None else bisect_left(self._chunk_starts, end)
+        return [chunk for chunk in self.chunks[:hi]
+                if start is None or chunk['end'] >= start]
+    
+    def read_chunk(self, chunk):
+        """(rows, timestamps, originals) of one chunk"""
+        self._file.seek(chunk['offset'])
+        self.chunks_read += 1
+        return decode_chunk(decompress(self.codec, self._file.read(chunk['length'])),
+                            self.wall_start)
+    
+    def rows(self, start=None, end=None):
+        """Raw (code, t, x, y, dx, dy, name_id) rows with start <= t < end, in time order"""
+        return [row for row, _, _ in self._entries(start, end)]
+    
+    def events(self, start=None, end=None):
+        """Legacy event dicts for a time range"""
+        wall_start, names = self.wall_start, self.names
+        return [original or export_event(wall_start, code, t, x, y, dx, dy, names[name_id],
+                                         timestamp=timestamp)
+                for (code, t, x, y, dx, dy, name_id), timestamp, original
+                in self._entries(start, end)]
+    
+    def _entries(self, start, end):
+        """(row, timestamp, original event or None) with start <= t < end, in time order"""
+        entries = []
+        for chunk in self.chunks_for(start, end):
+            rows, stamps, originals = self.read_chunk(chunk)
+            entries.extend((row, stamps[i], originals.get(i)) for i, row in enumerate(rows)
+                           if (start is None or row[1] >= start) and (end is None or row[1] < end))
+        entries.sort(key=lambda entry: entry[0][1])
+        return entries
+    
+    def records(self, start=None, end=None):
+        """(record array, names) in the session_binary layout, for the vectorized analysis"""
+        from session_binary import RECORD_DTYPE
+        import numpy as np
+        
+        rows = self.rows(start, end)
+        records = np.zeros(len(rows), dtype=RECORD_DTYPE)
+        if rows:
+            columns = list(zip(*rows))
+            for field, values in zip(('type', 't', 'x', 'y', 'dx', 'dy', 'name'), columns):
+                records[field] = values
+        return records, self.names
+    
+    def to_session_data(self):
+        """Session dict compatible with load_session/analyze_session"""
+        session_data = dict(self.meta)
+        session_data['events'] = self.events()
+        return session_data
+    
+    def info(self):
+        raw = sum(chunk['raw_length'] for chunk in self.chunks)
+        stored = sum(chunk['length'] for chunk in self.chunks)
+        return {
+            'events': self.total_events,
+            'chunks': len(self.chunks),
+            'codec': self.codec,
+            'bucket_seconds': self.bucket_seconds,
+            'start': self.chunks[0]['start'] if self.chunks else None,
+            'end': max(chunk['end'] for chunk in self.chunks) if self.chunks else None,
+            'raw_bytes': raw,
+            'compressed_bytes': stored,
+            'file_bytes': self.path.stat().st_size
+        }
+
+
+def write_archive(path, events, wall_start, meta=None,
+                  bucket_seconds=DEFAULT_BUCKET_SECONDS, codec=None):
+    """Archive a list of legacy event dicts (a failed write leaves no file behind)"""
+    with SessionArchiveWriter(path, wall_start, bucket_seconds, codec) as writer:
+        for event in events:
+            writer.append_event(event)
+        writer.close(meta)
+    return writer
+
+
+def save_store(path, store, meta=None, bucket_seconds=DEFAULT_BUCKET_SECONDS, codec=None):
+    """Archive the events currently held by an EventStore"""
+    with SessionArchiveWriter(path, store.wall_start, bucket_seconds, codec) as writer:
+        for code, t, x, y, dx, dy, name_id in store.rows():
+            writer.append(code, t, x, y, dx, dy, store.names[name_id])
+        writer.close(meta)
+    return writer
+
+
+def load_session_log(src):
+    """
+    Session dict from a JSON log or NDJSON stream; raises ValueError for
+    files that aren't tracker sessions (reports, other JSON)
+    """
+    src = Path(src)
+    if src.suffix == '.ndjson':
+        first = next(iter_stream(src), None)
+        if first is None or first[0] != 'header' or first[1].get('format') != STREAM_FORMAT:
+            raise ValueError("not a session stream (no stream header)")
+        return load_stream(src)
+    
+    with open(src, 'r') as f:
+        session_data = json.load(f)
+    if (not isinstance(session_data, dict) or not isinstance(session_data.get('events'), list)
+            or not ('session_info' in session_data or 'statistics' in session_data)):
+        raise ValueError("not a session log (needs an events list and session_info/statistics)")
+    return session_data
+
+
+def convert_session(src, dst=None, bucket_seconds=DEFAULT_BUCKET_SECONDS, codec=None):
+    """
+    Convert a JSON (or NDJSON stream) session log to an archive; an existing
+    archive is never overwritten (FileExistsError)
+    Returns the archive path and the session dict it was built from
+    """
+    src = Path(src)
+    dst = Path(dst) if dst else src.with_suffix('.itsa')
+    if dst.exists():
+        raise FileExistsError(f"{dst} already exists")
+    
+    session_data = load_session_log(src)
+    events = session_data['events']
+    wall_start = 0.0
+    if events:
+        wall_start = events[0]['timestamp'] - events[0]['relative_time']
+    
+    meta = {key: value for key, value in session_data.items() if key != 'events'}
+    write_archive(dst, events, wall_start, meta, bucket_seconds, codec)
+    return dst, session_data
+
+
+def json_roundtrip(value):
+    """`value` as it reads back from JSON (tuples become lists, etc.)"""
+    return json.loads(json.dumps(value, default=str))
+
+
+def find_logs(paths):
+    """JSON/NDJSON session logs among files and directories (recursively)"""
+    found = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            found.extend(sorted(p for p in path.rglob('*')
+                                if p.is_file() and p.suffix in MIGRATE_SUFFIXES
+                                and not p.name.startswith('.')))
+        elif path.suffix in MIGRATE_SUFFIXES:
+            found.append(path)
+    return found
+
+
+def migrate(paths, bucket_seconds=DEFAULT_BUCKET_SECONDS, codec=None, remove=False):
+    """
+    Convert every log found; originals are only removed once the archive
+    reads back the same session, event for event
+    """
+    total_before = total_after = failures = 0
+    
+    # x.json and x.ndjson would both become x.itsa: convert neither
+    sources = {}
+    for src in find_logs(paths):
+        sources.setdefault(src.with_suffix('.itsa'), []).append(src)
+    
+    for dst, srcs in sources.items():
+        if len(srcs) > 1:
+            failures += len(srcs)
+            print(f"❌ {', '.join(map(str, srcs))}: would all be archived to {dst.name}; skipped")
+            continue
+        src = srcs[0]
+        
+        created = False
+        try:
+            dst, session_data = convert_session(src, dst, bucket_seconds, codec)
+            created = True
+            with SessionArchive(dst) as archive:
+                if archive.to_session_data() != json_roundtrip(session_data):
+                    raise ValueError("archive does not read back the same session")
+        except Exception as e:
+            failures += 1
+            if created:
+                dst.unlink(missing_ok=True)
+            print(f"❌ {src}: {e}")
+            continue
+        
+        count = len(session_data.get('events', []))
+        
+        before, after = src.stat().st_size, dst.stat().st_size
+        total_before += before
+        total_after += after
+        print(f"💾 {src} -> {dst.name}: {count} events, {before / 1024:.0f} KB -> "
+              f"{after / 1024:.0f} KB ({before / max(after, 1):.1f}x)")
+        if remove:
+            src.unlink()
+    
+    if total_after:
+        print(f"\n📦 {total_before / 1024 ** 2:.1f} MB -> {total_after / 1024 ** 2:.1f} MB "
+              f"({total_before / total_after:.1f}x smaller)")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compressed session archives")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    migrate_parser = commands.add_parser('migrate', help="convert JSON/NDJSON logs to .itsa")
+    migrate_parser.add_argument('paths', nargs='+', help="session files or directories")
+    migrate_parser.add_argument('--bucket', type=float, default=DEFAULT_BUCKET_SECONDS,
+                                help="seconds of events per chunk")
+    migrate_parser.add_argument('--codec', choices=available_codecs(),
+                                help="default: fastest available")
+    migrate_parser.add_argument('--remove', action='store_true',
+                                help="delete each original once its archive checks out")
+    
+    info_parser = commands.add_parser('info', help="archive summary")
+    info_parser.add_argument('archive')
+    
+    window_parser = commands.add_parser('window', help="stats for a time window")
+    window_parser.add_argument('archive')
+    window_parser.add_argument('start', type=float, help="relative seconds")
+    window_parser.add_argument('end', type=float, help="relative seconds")
+    args = parser.parse_args()
+    
+    if args.command == 'migrate':
+        return 1 if migrate(args.paths, args.bucket, args.codec, args.remove) else 0
+    
+    with SessionArchive(args.archive) as archive:
+        if args.command == 'info':
+            print(json.dumps(archive.info(), indent=2))
+            return 0
+        
+        from session_binary import records_stats
+        records, names = archive.records(args.start, args.end)
+        stats = records_stats(records, names)
+        stats['chunks_read'] = f"{archive.chunks_read}/{len(archive.chunks)}"
+        print(json.dumps(stats, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Binary Session Format - Memory-mapped, fixed-width session files
+Lets analysis tools seek to a time range and work on a slice of a long
+session without parsing the whole log
+
+File layout (little endian):
+    header    64 bytes, see HEADER_STRUCT
+    records   count * 48 bytes, RECORD_DTYPE, sorted by time
+    index     float64 start time of every INDEX_STRIDE-th record
+    meta      UTF-8 JSON: key/button names, session_info, statistics, performance
+"""
+
+import json
+import mmap
+import struct
+import sys
+from collections.abc import Sequence
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImportError("numpy is required for binary session files. Install with: pip install numpy") from e
+
+from event_store import (
+    EVENT_CODES, EVENT_TYPES, NO_NAME, MOUSE_CLICK, MOUSE_MOVE, KEYPRESS, coordinate, export_event
+)
+from session_stream import load_stream
+
+MAGIC = b'ITSB'
+FORMAT_VERSION = 2
+INDEX_STRIDE = 4096
+
+# magic, version, record size, index stride, record count, wall start,
+# index offset, index count, meta offset, meta length
+HEADER_STRUCT = struct.Struct('<4sHHIQdQQQQ')
+HEADER_SIZE = 64
+
+# Positions and deltas are float64 like the EventStore columns, so
+# sub-pixel coordinates survive the round trip
+RECORD_DTYPE = np.dtype([
+    ('t', '<f8'),
+    ('x', '<f8'),
+    ('y', '<f8'),
+    ('dx', '<f8'),
+    ('dy', '<f8'),
+    ('name', '<u2'),
+    ('type', 'u1'),
+    ('pad', 'u1'),
+    ('reserved', '<u4'),
+])
+
+
+def records_from_events(events):
+    """Build a record array and name table from legacy event dicts"""
+    records = np.zeros(len(events), dtype=RECORD_DTYPE)
+    names = [None]
+    name_ids = {}
+    
+    for i, event in enumerate(events):
+        data = event.get('data', {})
+        name = data.get('key', data.get('button'))
+        name_id = NO_NAME
+        if name is not None:
+            name_id = name_ids.get(name)
+            if name_id is None:
+                name_id = name_ids[name] = len(names)
+                names.append(name)
+        
+        records[i] = (event['relative_time'], data.get('x', 0), data.get('y', 0),
+                      data.get('dx', 0), data.get('dy', 0), name_id,
+                      EVENT_CODES[event['type']], 0, 0)
+    
+    # Sessions are written in arrival order; make sure the time index holds
+    order = np.argsort(records['t'], kind='stable')
+    return records[order], names
+
+
+def records_from_store(store):
+    """Build a record array from an EventStore (oldest event first)"""
+    count = len(store)
+    records = np.zeros(count, dtype=RECORD_DTYPE)
+    rows = list(store.rows())
+    if rows:
+        columns = list(zip(*rows))
+        records['type'] = columns[0]
+        records['t'] = columns[1]
+        records['x'] = columns[2]
+        records['y'] = columns[3]
+        records['dx'] = columns[4]
+        records['dy'] = columns[5]
+        records['name'] = columns[6]
+    return records, list(store.names)
+
+
+def write_binary_session(path, records, names, wall_start, meta=None):
+    """Write a record array, its time index and metadata to path"""
+    records = np.ascontiguousarray(records, dtype=RECORD_DTYPE)
+    index = np.ascontiguousarray(records['t'][::INDEX_STRIDE], dtype='<f8')
+    
+    meta = dict(meta or {})
+    meta['names'] = names
+    meta_bytes = json.dumps(meta, default=str).encode('utf-8')
+    
+    index_offset = HEADER_SIZE + records.nbytes
+    meta_offset = index_offset + index.nbytes
+    header = HEADER_STRUCT.pack(MAGIC, FORMAT_VERSION, RECORD_DTYPE.itemsize, INDEX_STRIDE,
+                                len(records), wall_start, index_offset, len(index),
+                                meta_offset, len(meta_bytes))
+    
+    with open(path, 'wb') as f:
+        f.write(header.ljust(HEADER_SIZE, b'\0'))
+        f.write(records.tobytes())
+        f.write(index.tobytes())
+        f.write(meta_bytes)
+
+
+def save_store(path, store, meta=None):
+    """Write the events currently held by an EventStore"""
+    records, names = records_from_store(store)
+    write_binary_session(path, records, names, store.wall_start, meta)
+
+
+def convert_json_session(src, dst=None):
+    """Convert a JSON (or NDJSON stream) session log to the binary format"""
+    src = Path(src)
+    dst = Path(dst) if dst else src.with_suffix('.itsb')
+    
+    if src.suffix == '.ndjson':
+        session_data = load_stream(src)
+    else:
+        with open(src, 'r') as f:
+            session_data = json.load(f)
+    
+    events = session_data.get('events', [])
+    records, names = records_from_events(events)
+    
+    wall_start = 0.0
+    if events:
+        wall_start = events[0]['timestamp'] - events[0]['relative_time']
+    
+    meta = {key: value for key, value in session_data.items() if key != 'events'}
+    write_binary_session(dst, records, names, wall_start, meta)
+    return dst
+
+
+class BinarySession:
+    """
+    Read-only memory-mapped view of a binary session file
+    records, columns and slices are zero-copy numpy views into the map
+    """
+    
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        (magic, version, record_size, self.index_stride, count, self.wall_start,
+         index_offset, index_count, meta_offset, meta_length) = \
+            HEADER_STRUCT.unpack_from(self._map, 0)
+        
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a binary session file")
+        if version != FORMAT_VERSION or record_size != RECORD_DTYPE.itemsize:
+            raise ValueError(f"Unsupported session format version {version}")
+        
+        self.records = np.frombuffer(self._map, dtype=RECORD_DTYPE,
+                                     count=count, offset=HEADER_SIZE)
+        self.index = np.frombuffer(self._map, dtype='<f8',
+                                   count=index_count, offset=index_offset)
+        
+        self.meta = json.loads(bytes(self._map[meta_offset:meta_offset + meta_length]))
+        self.names = self.meta.get('names', [None])
+    
+    def __len__(self):
+        return len(self.records)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def close(self):
+        """Release the memory map (views taken from it become invalid)"""
+        self.records = None
+        self.index = None
+        try:
+            self._map.close()
+        except BufferError:
+            # A caller still holds a view; the map closes when it is released
+            pass
+        self._file.close()
+    
+    def column(self, name):
+        """Zero-copy view of one record field"""
+        return self.records[name]
+    
+    def locate(self, start=None, end=None):
+        """Return the record range [lo, hi) with start <= t < end"""
+        times = self.records['t']
+        lo, hi = 0, len(times)
+        
+        # The index narrows the search to a couple of pages of records
+        if start is not None:
+            block = max(int(np.searchsorted(self.index, start, side='left')) - 1, 0)
+            base = block * self.index_stride
+            window = times[base:base + self.index_stride + 1]
+            lo = base + int(np.searchsorted(window, start, side='left'))
+        if end is not None:
+            block = max(int(np.searchsorted(self.index, end, side='left')) - 1, 0)
+            base = block * self.index_stride
+            window = times[base:base + self.index_stride + 1]
+            hi = base + int(np.searchsorted(window, end, side='left'))
+        return lo, max(lo, hi)
+    
+    def time_slice(self, start=None, end=None):
+        """Zero-copy view of the records between two relative times"""
+        lo, hi = self.locate(start, end)
+        return self.records[lo:hi]
+    
+    def slice_stats(self, start=None, end=None):
+        """Aggregate counts and rates over a time range"""
+        view = self.time_slice(start, end)
+        return records_stats(view, self.names)
+    
+    def events(self, start=None, end=None):
+        """Legacy event dicts for a time range, built on demand"""
+        lo, hi = self.locate(start, end)
+        return BinaryEventView(self, lo, hi)
+    
+    def to_session_data(self):
+        """Session dict compatible with load_session/analyze_session"""
+        session_data = {key: value for key, value in self.meta.items() if key != 'names'}
+        session_data['events'] = self.events()
+        return session_data
+
+
+class BinaryEventView(Sequence):
+    """Sequence of legacy event dicts over a range of binary records"""
+    
+    def __init__(self, session, lo, hi):
+        self.session = session
+        self.lo = lo
+        self.hi = hi
+    
+    def __len__(self):
+        return self.hi - self.lo
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("event index out of range")
+        
+        record = self.session.records[self.lo + index]
+        return export_event(self.session.wall_start, int(record['type']), float(record['t']),
+                            coordinate(record['x']), coordinate(record['y']),
+                            coordinate(record['dx']), coordinate(record['dy']),
+                            self.session.names[record['name']])
+
+
+def records_stats(records, names):
+    """Vectorized summary statistics over a record array or view"""
+    if len(records) == 0:
+        return {'events': 0, 'duration': 0.0}
+    
+    types = records['type']
+    counts = np.bincount(types, minlength=len(EVENT_TYPES))
+    times = records['t']
+    duration = float(times[-1] - times[0])
+    
+    moves = records[types == MOUSE_MOVE]
+    distance = 0.0
+    if len(moves) > 1:
+        distance = float(np.hypot(np.diff(moves['x']), np.diff(moves['y'])).sum())
+    
+    key_ids, key_counts = np.unique(records['name'][types == KEYPRESS], return_counts=True)
+    key_frequencies = {names[i]: int(c) for i, c in zip(key_ids, key_counts)}
+    
+    clicks = int(counts[MOUSE_CLICK])
+    keys = int(counts[KEYPRESS])
+    return {
+        'events': int(len(records)),
+        'start': float(times[0]),
+        'end': float(times[-1]),
+        'duration': duration,
+        'counts': {EVENT_TYPES[i]: int(c) for i, c in enumerate(counts)},
+        'cps': round(clicks / duration, 2) if duration > 0 else 0,
+        'kps': round(keys / duration, 2) if duration > 0 else 0,
+        'mouse_distance': round(distance, 1),
+        'key_frequencies': key_frequencies
+    }
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ('convert', 'stats'):
+        print("Usage:")
+        print("  session_binary.py convert <session.json|.ndjson> [out.itsb]")
+        print("  session_binary.py stats <session.itsb> [start_s] [end_s]")
+        return 1
+    
+    if sys.argv[1] == 'convert':
+        dst = convert_json_session(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None)
+        print(f"💾 Converted {sys.argv[2]} -> {dst}")
+        return 0
+    
+    start = float(sys.argv[3]) if len(sys.argv) > 3 else None
+    end = float(sys.argv[4]) if len(sys.argv) > 4 else None
+    with BinarySession(sys.argv[2]) as session:
+        print(json.dumps(session.slice_stats(start, end), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
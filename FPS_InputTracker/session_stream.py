@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Session Stream - Append-only NDJSON session log with chunked flushes
+Events are written to disk in fixed-size chunks while the session runs, so a
+crash only loses the chunk in memory and long sessions are fully recorded
+
+File layout (one JSON object per line):
+    {"header": {...}}        written when the stream is opened
+    {<event>}                legacy event dicts, appended chunk by chunk
+    {"path": [[t_us, x, y], ...]}  full-rate mouse path samples, per chunk
+    {"footer": {...}}        statistics + chunk index, written at stop
+"""
+
+import json
+import os
+import queue
+import threading
+from collections import defaultdict
+from datetime import datetime
+
+from event_store import export_event
+from mouse_path import MousePath
+
+STREAM_FORMAT = "input-tracker-ndjson"
+STREAM_VERSION = 1
+
+# The footer sums the session up; events and path samples are in the chunks
+FOOTER_FIELDS = ('session_info', 'statistics', 'performance', 'mouse_path')
+PATH_SAMPLE_FIELDS = ('start', 'dt_us', 'dx', 'dy')
+
+
+class SessionStreamWriter:
+    """
+    Buffers raw events and appends them to an NDJSON file in chunks
+    
+    With background=True full chunks are handed to a writer thread, so the
+    thread calling append() (e.g. a pynput callback) never waits on the
+    serialization, write and fsync
+    """
+    
+    def __init__(self, path, wall_start, chunk_size=2048, fsync=True, background=False):
+        self.path = path
+        self.wall_start = wall_start
+        self.chunk_size = chunk_size
+        self.fsync = fsync
+        self.background = background
+        
+        self.events_written = 0
+        self.path_samples_written = 0
+        self.chunks = []  # Index of flushed chunks for the footer
+        self._buffer = []
+        self._path_buffer = []
+        self._file = None
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._error = None
+    
+    def open(self):
+        """Create the file and write the header line"""
+        self._file = open(self.path, 'w', encoding='utf-8')
+        header = {
+            'format': STREAM_FORMAT,
+            'version': STREAM_VERSION,
+            'start_time': datetime.fromtimestamp(self.wall_start).isoformat(),
+            'start_timestamp': self.wall_start,
+            'chunk_size': self.chunk_size
+        }
+        self._write_lines([json.dumps({'header': header})])
+        
+        if self.background:
+            self._queue = queue.Queue()
+            self._thread = threading.Thread(target=self._writer_loop, daemon=True,
+                                            name="session-stream-writer")
+            self._thread.start()
+    
+    def append(self, row):
+        """Queue a raw (code, t, x, y, dx, dy, name) event for writing"""
+        with self._lock:
+            self._buffer.append(row)
+            if len(self._buffer) >= self.chunk_size:
+                self._flush_chunk()
+    
+    def append_path(self, sample):
+        """Queue a kept (t_us, x, y) mouse path sample for writing"""
+        with self._lock:
+            self._path_buffer.append(sample)
+            if len(self._path_buffer) >= self.chunk_size:
+                self._flush_chunk()
+    
+    def flush(self):
+        """Write any buffered events as a (possibly short) chunk"""
+        with self._lock:
+            self._flush_chunk()
+        if self._queue is not None:
+            self._queue.join()
+    
+    def close(self, footer=None):
+        """
+        Flush the last chunk and write the footer: the FOOTER_FIELDS of
+        `footer` (mouse_path without its samples) and the chunk index
+        """
+        with self._lock:
+            if self._file is None:
+                return
+            self._flush_chunk()
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = self._queue = None
+        
+        with self._lock:
+            if self._error is not None:
+                self._file.close()
+                self._file = None
+                raise self._error
+            
+            footer = {key: value for key, value in (footer or {}).items() if key in FOOTER_FIELDS}
+            if 'mouse_path' in footer:
+                footer['mouse_path'] = {key: value for key, value in footer['mouse_path'].items()
+                                        if key not in PATH_SAMPLE_FIELDS}
+            footer['total_events'] = self.events_written
+            footer['chunks'] = self.chunks
+            self._write_lines([json.dumps({'footer': footer}, default=str)])
+            self._file.close()
+            self._file = None
+    
+    def _flush_chunk(self):
+        """Write (or hand off) the buffered chunk; called with the lock held"""
+        if not (self._buffer or self._path_buffer) or self._file is None:
+            return
+        
+        rows, samples = self._buffer, self._path_buffer
+        self._buffer = []
+        self._path_buffer = []
+        if self._queue is not None:
+            self._queue.put((rows, samples))
+        else:
+            self._write_chunk(rows, samples)
+    
+    def _writer_loop(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                if self._error is None:
+                    self._write_chunk(*item)
+            except OSError as e:
+                # Reported by close(); later chunks are dropped
+                self._error = e
+            finally:
+                self._queue.task_done()
+    
+    def _write_chunk(self, rows, samples):
+        wall_start = self.wall_start
+        lines = [json.dumps(export_event(wall_start, *row), separators=(',', ':'))
+                 for row in rows]
+        
+        if lines:
+            self.chunks.append({
+                'offset': self._file.tell(),
+                'events': len(lines),
+                'start': rows[0][1],
+                'end': rows[-1][1]
+            })
+        if samples:
+            lines.append(json.dumps({'path': samples}, separators=(',', ':')))
+        self._write_lines(lines)
+        self.events_written += len(rows)
+        self.path_samples_written += len(samples)
+    
+    def _write_lines(self, lines):
+        self._file.write('\n'.join(lines))
+        self._file.write('\n')
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+
+def iter_stream(path):
+    """
+    Yield (kind, obj) pairs from a stream file, kind being
+    'header', 'event', 'path' or 'footer'. A truncated last line is skipped
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                obj = json.loads(line)
+            except json.JSONDecodeError:
+                # Partial line from a crash mid-write
+                continue
+            if 'header' in obj:
+                yield 'header', obj['header']
+            elif 'footer' in obj:
+                yield 'footer', obj['footer']
+            elif 'path' in obj:
+                yield 'path', obj['path']
+            else:
+                yield 'event', obj
+
+
+def rebuild_statistics(events):
+    """Recompute the summary statistics block from raw events"""
+    stats = {
+        'total_keypresses': 0,
+        'total_mouse_clicks': 0,
+        'total_mouse_moves': 0,
+        'session_duration': events[-1]['relative_time'] if events else 0,
+        'key_frequencies': defaultdict(int),
+        'click_frequencies': defaultdict(int)
+    }
+    
+    for event in events:
+        event_type = event['type']
+        data = event['data']
+        if event_type == 'keypress':
+            stats['total_keypresses'] += 1
+            stats['key_frequencies'][data.get('key', 'unknown')] += 1
+        elif event_type in ['mouse_click', 'mouse_release']:
+            stats['total_mouse_clicks'] += 1
+            stats['click_frequencies'][data.get('button', 'unknown')] += 1
+        elif event_type == 'mouse_move':
+            stats['total_mouse_moves'] += 1
+    
+    stats['key_frequencies'] = dict(stats['key_frequencies'])
+    stats['click_frequencies'] = dict(stats['click_frequencies'])
+    return stats
+
+
+def load_stream(path):
+    """
+    Load a stream file into the same shape save_session writes
+    The full-rate mouse path is rebuilt from the streamed path samples, and
+    sessions without a footer (crashed) get statistics rebuilt from events
+    """
+    header, footer, events, path_samples = {}, None, [], []
+    for kind, obj in iter_stream(path):
+        if kind == 'event':
+            events.append(obj)
+        elif kind == 'path':
+            path_samples.extend(obj)
+        elif kind == 'header':
+            header = obj
+        else:
+            footer = obj
+    
+    if footer is None:
+        statistics = rebuild_statistics(events)
+        session_data = {
+            'session_info': {
+                'start_time': header.get('start_time'),
+                'duration': statistics['session_duration'],
+                'total_events': len(events),
+                'recovered': True
+            },
+            'statistics': statistics
+        }
+    else:
+        session_data = {key: value for key, value in footer.items()
+                        if key not in ('chunks', 'total_events')}
+    
+    if path_samples:
+        # Samples were already simplified when recorded, keep them all
+        mouse_path = MousePath()
+        for t_us, x, y in path_samples:
+            mouse_path.add(t_us / 1_000_000, x, y)
+        path_data = mouse_path.to_dict()
+        # The footer's summary has the recording tolerance and sample count
+        summary = session_data.get('mouse_path') or {}
+        path_data.update({key: summary[key] for key in ('tolerance', 'samples_seen') if key in summary})
+        session_data['mouse_path'] = path_data
+    session_data['events'] = events
+    return session_data
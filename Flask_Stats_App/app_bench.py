@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+App Benchmark - Load test the stats app on synthetic match histories
+Fills a throwaway match database with generated matches (thousands to
+millions), then measures per-route latency through the Flask test client,
+throughput under concurrent clients on a local threaded server, snapshot
+build time/memory and how calculate_team_stats scales with history size
+
+Usage:
+    python app_bench.py                              # 1k, 10k and 100k matches
+    python app_bench.py --sizes 1000000 --window 20000
+    python app_bench.py --clients 16 --duration 10
+    python app_bench.py --save baseline.json
+    python app_bench.py --baseline baseline.json --tolerance 0.2
+"""
+
+import argparse
+import importlib
+import json
+import logging
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from werkzeug.serving import make_server
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; peak RSS is skipped there
+    resource = None
+
+HERE = Path(__file__).resolve().parent
+
+# Routes hit in every run; the conditional variant resends the ETag it got
+ROUTES = ['/', '/teams', '/matches', '/matches?page=2', '/api/matches',
+          '/api/matches?limit=100', '/api/matches?game=CS2&limit=100',
+          '/api/matches?team=Cloud9&limit=100', '/api/teams', '/api/ratings']
+CONDITIONAL_ROUTES = ['/api/matches', '/teams']
+
+# Matches generated and stored per batch, so a million-match history
+# never has to sit in memory at once
+BATCH_SIZE = 50000
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(int(fraction * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def latency_summary(timings):
+    """p50/p95/p99/max in milliseconds from durations in seconds"""
+    ordered = sorted(timings)
+    return {name: round(percentile(ordered, fraction) * 1000, 3)
+            for name, fraction in (('p50', 0.50), ('p95', 0.95), ('p99', 0.99), ('max', 1.0))}
+
+
+def template_folder(workdir):
+    """The app's templates/ folder, or one split out of flask_templates.html"""
+    if (HERE / 'templates').is_dir():
+        return str(HERE / 'templates')
+    target = Path(workdir) / 'templates'
+    target.mkdir(exist_ok=True)
+    source = (HERE / 'flask_templates.html').read_text()
+    for name, body in re.findall(r'<!-- templates/(\S+) -->\n(.*?)(?=<!-- templates/|\Z)',
+                                 source, re.S):
+        (target / name).write_text(body)
+    return str(target)
+
+
+def load_app(size, window, days, workdir, seed):
+    """
+    A fresh copy of the app backed by a database of `size` generated matches.
+    The app is re-imported so module-level state (store, repository,
+    caches) starts empty, and MOCK_MATCHES=0 keeps refreshes from adding
+    matches while the benchmark runs
+    """
+    os.environ['MATCH_DB'] = str(Path(workdir) / f'bench_{size}.db')
+    os.environ['MAX_MATCHES'] = str(window)
+    os.environ['MOCK_MATCHES'] = '0'
+    os.environ.setdefault('DATA_TTL', '3600')
+
+    if 'esports_stats_app' in sys.modules:
+        app_module = importlib.reload(sys.modules['esports_stats_app'])
+    else:
+        app_module = importlib.import_module('esports_stats_app')
+    app_module.app.template_folder = template_folder(workdir)
+
+    random.seed(seed)
+    start = time.perf_counter()
+    for offset in range(0, size, BATCH_SIZE):
+        batch = app_module.generate_mock_matches(min(BATCH_SIZE, size - offset), days)
+        for match in batch:
+            match['id'] += offset
+        app_module.store.upsert_matches(batch)
+    return app_module, time.perf_counter() - start
+
+
+def bench_snapshot(app_module, measure_memory=True):
+    """Time (and trace memory of) the first snapshot build: load, index, ratings"""
+    if measure_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    snapshot = app_module.repository.get()
+    seconds = time.perf_counter() - start
+    result = {'build_ms': round(seconds * 1000, 1), 'matches': len(snapshot.matches)}
+    if measure_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result['peak_kb'] = round(peak / 1024, 1)
+    return result
+
+
+def bench_team_stats(app_module, sizes):
+    """calculate_team_stats over the newest n matches, for each n in sizes"""
+    timings = {}
+    for n in sizes:
+        matches = app_module.store.recent(n)
+        start = time.perf_counter()
+        app_module.calculate_team_stats(matches)
+        timings[str(len(matches))] = round((time.perf_counter() - start) * 1000, 2)
+    return timings
+
+
+def bench_routes(app_module, requests_per_route):
+    """Sequential requests per route through the test client"""
+    client = app_module.app.test_client()
+    results = {}
+    routes = [(path, False) for path in ROUTES] + [(path, True) for path in CONDITIONAL_ROUTES]
+    for path, conditional in routes:
+        headers = {}
+        if conditional:
+            etag = client.get(path).headers.get('ETag')
+            headers = {'If-None-Match': etag} if etag else {}
+        client.get(path, headers=headers)  # warm the payload cache
+
+        timings, statuses = [], set()
+        start = time.perf_counter()
+        for _ in range(requests_per_route):
+            t0 = time.perf_counter()
+            response = client.get(path, headers=headers)
+            response.get_data()
+            timings.append(time.perf_counter() - t0)
+            statuses.add(response.status_code)
+        elapsed = time.perf_counter() - start
+
+        name = f"{path} (304)" if conditional else path
+        results[name] = {'rps': round(requests_per_route / elapsed, 1),
+                         'latency_ms': latency_summary(timings),
+                         'status': sorted(statuses)}
+    return results
+
+
+def bench_concurrent(app_module, clients, duration):
+    """Threaded local server hit by `clients` threads cycling through ROUTES"""
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)  # no per-request log lines
+    server = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    deadline = time.perf_counter() + duration
+
+    def client(worker):
+        timings, errors = [], 0
+        i = worker
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            try:
+                with urllib.request.urlopen(base + ROUTES[i % len(ROUTES)], timeout=30) as response:
+                    response.read()
+            except (urllib.error.URLError, OSError):
+                errors += 1
+            timings.append(time.perf_counter() - t0)
+            i += 1
+        return timings, errors
+
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            outcomes = list(pool.map(client, range(clients)))
+        elapsed = time.perf_counter() - start
+    finally:
+        server.shutdown()
+        server_thread.join()
+
+    timings = [t for worker_timings, _ in outcomes for t in worker_timings]
+    return {'clients': clients,
+            'requests': len(timings),
+            'errors': sum(errors for _, errors in outcomes),
+            'rps': round(len(timings) / elapsed, 1),
+            'latency_ms': latency_summary(timings)}
+
+
+def run_size(size, args, workdir):
+    print(f"\n📦 {size:,} matches (window {args.window:,})")
+    app_module, ingest_seconds = load_app(size, args.window, args.days, workdir, args.seed)
+    print(f"   stored in {ingest_seconds:.1f}s")
+
+    result = {'ingest_s': round(ingest_seconds, 2)}
+    result['snapshot'] = bench_snapshot(app_module, measure_memory=not args.no_memory)
+    steps = sorted({min(n, size) for n in (1000, 10000, 100000, args.window, size)})
+    result['team_stats_ms'] = bench_team_stats(app_module, steps)
+    result['routes'] = bench_routes(app_module, args.requests)
+    if args.clients:
+        result['concurrent'] = bench_concurrent(app_module, args.clients, args.duration)
+    app_module.store.close()
+    return result
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """List regressions in throughput and p99 latency beyond tolerance"""
+    regressions = []
+    for size, result in results.items():
+        base = baseline.get(size)
+        if not base:
+            continue
+        checks = [(f"{size} {path}", r, base['routes'].get(path))
+                  for path, r in result['routes'].items()]
+        if 'concurrent' in result:
+            checks.append((f"{size} concurrent", result['concurrent'], base.get('concurrent')))
+        for name, r, b in checks:
+            if not b:
+                continue
+            if r['rps'] < b['rps'] * (1 - tolerance):
+                regressions.append(f"{name}: {r['rps']} req/s < baseline {b['rps']} req/s")
+            if r['latency_ms']['p99'] > b['latency_ms']['p99'] * (1 + tolerance):
+                regressions.append(f"{name}: p99 {r['latency_ms']['p99']} ms "
+                                   f"> baseline {b['latency_ms']['p99']} ms")
+    return regressions
+
+
+def print_results(results):
+    for size, r in results.items():
+        snapshot = r['snapshot']
+        print(f"\n📊 {int(size):,} matches: snapshot {snapshot['build_ms']:.0f} ms for "
+              f"{snapshot['matches']:,} matches"
+              + (f", peak {snapshot['peak_kb'] / 1024:.1f} MB" if 'peak_kb' in snapshot else ''))
+        print("   calculate_team_stats: " + ", ".join(
+            f"{int(n):,} → {ms:.1f} ms" for n, ms in r['team_stats_ms'].items()))
+        print(f"   {'route':<38}{'req/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'status':>10}")
+        print("   " + "-" * 85)
+        for path, route in r['routes'].items():
+            lat = route['latency_ms']
+            print(f"   {path:<38}{route['rps']:>10,.0f}{lat['p50']:>9.2f}{lat['p95']:>9.2f}"
+                  f"{lat['p99']:>9.2f}{','.join(map(str, route['status'])):>10}")
+        if 'concurrent' in r:
+            c = r['concurrent']
+            lat = c['latency_ms']
+            print(f"   {c['clients']} clients: {c['rps']:,.0f} req/s over {c['requests']:,} requests, "
+                  f"p50 {lat['p50']:.1f} / p95 {lat['p95']:.1f} / p99 {lat['p99']:.1f} ms, "
+                  f"{c['errors']} errors")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test and benchmark the stats app")
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help="comma-separated match history sizes")
+    parser.add_argument('--window', type=int, default=5000,
+                        help="newest matches held in the snapshot (MAX_MATCHES)")
+    parser.add_argument('--days', type=int, default=365, help="days the history is spread over")
+    parser.add_argument('--requests', type=int, default=200, help="sequential requests per route")
+    parser.add_argument('--clients', type=int, default=8,
+                        help="concurrent clients against a local server (0 to skip)")
+    parser.add_argument('--duration', type=float, default=5.0, help="seconds of concurrent load")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', action='store_true', help="skip tracemalloc")
+    parser.add_argument('--save', help="write results as JSON (e.g. a new baseline)")
+    parser.add_argument('--baseline', help="compare against a saved results file")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="allowed regression vs baseline (fraction, default 0.2)")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    print(f"🏁 Benchmarking {len(ROUTES) + len(CONDITIONAL_ROUTES)} routes on "
+          f"{', '.join(f'{size:,}' for size in sizes)} matches")
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='app_bench_') as workdir:
+        for size in sizes:
+            results[str(size)] = run_size(size, args, workdir)
+    print_results(results)
+    if resource is not None:
+        # ru_maxrss is in KB on Linux
+        print(f"\n🧠 Peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+    config = {'sizes': sizes, 'window': args.window, 'days': args.days,
+              'requests': args.requests, 'clients': args.clients, 'seed': args.seed}
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'config': config, 'results': results}, f, indent=2)
+        print(f"\n💾 Results saved to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        if baseline['config'] != config:
+            print("\n⚠️  Baseline was recorded with different settings")
+        regressions = compare_to_baseline(results, baseline['results'], args.tolerance)
+        if regressions:
+            print("\n❌ Regressions detected:")
+            for regression in regressions:
+                print(f"   {regression}")
+            return 1
+        print(f"\n✅ Within {args.tolerance:.0%} of baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
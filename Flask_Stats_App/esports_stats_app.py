@@ -1,19 +1,30 @@
-from flask import Flask, render_template, jsonify
+from flask import Flask, render_template, jsonify, request, Response, stream_with_context
 import requests
 from datetime import datetime, timedelta
 import json
 import random
+import os
+import logging
+import time
+
+from match_repository import MatchRepository
+from team_stats_index import TeamStatsIndex
+from match_store import MatchStore, decode_match_cursor, match_cursor, decode_team_cursor, team_cursor
+from payload_cache import PayloadCache, payload_response
+from ratings import RatingEngine
+from snapshot_share import SnapshotPublisher, SharedSnapshot, SharedSnapshotReader
 
 app = Flask(__name__)
 
 # Mock data generator for demonstration
-def generate_mock_matches():
-    """Generate mock match data - replace this with actual scraping logic"""
+def generate_mock_matches(count=20, days=30):
+    """Generate `count` mock matches spread over the last `days` days - replace this with actual scraping logic"""
     teams = ["Team Liquid", "Cloud9", "TSM", "G2 Esports", "Fnatic", "100 Thieves", "NRG", "Sentinels"]
     games = ["Valorant", "CS2", "League of Legends", "Rocket League"]
     
+    today = datetime.now()
     matches = []
-    for i in range(20):
+    for i in range(count):
         team1, team2 = random.sample(teams, 2)
         game = random.choice(games)
         
@@ -31,7 +42,7 @@ def generate_mock_matches():
         
         match = {
             'id': i + 1,
-            'date': (datetime.now() - timedelta(days=random.randint(0, 30))).strftime('%Y-%m-%d'),
+            'date': (today - timedelta(days=random.randint(0, days))).strftime('%Y-%m-%d'),
             'game': game,
             'team1': team1,
             'team2': team2,
@@ -89,46 +100,256 @@ def scrape_match_data():
     - Or official game APIs
     """
     # For now, return mock data
-    return generate_mock_matches()
+    return generate_mock_matches(int(os.environ.get('MOCK_MATCHES', 20)))
+
+# Persistent match history; pages query it instead of holding it all in memory
+store = MatchStore(os.environ.get('MATCH_DB', 'matches.db'))
+MAX_MATCHES = int(os.environ.get('MAX_MATCHES', 5000))
+MATCHES_PER_PAGE = 50
+MAX_API_LIMIT = 500
+
+def load_matches():
+    """Store freshly scraped matches, then load the newest ones"""
+    store.upsert_matches(scrape_match_data())
+    return store.recent(MAX_MATCHES)
+
+def match_filters(args):
+    """Match filters from query string arguments"""
+    return {key: args.get(key) for key in ('game', 'team', 'tournament', 'start', 'end')
+            if args.get(key)}
+
+def api_limit(args):
+    return min(max(args.get('limit', MATCHES_PER_PAGE, type=int), 1), MAX_API_LIMIT)
+
+def ndjson_response(rows):
+    """Stream rows as newline-delimited JSON, one line per row as it's produced"""
+    def generate():
+        for row in rows:
+            yield json.dumps(row, default=str) + '\n'
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+# Shared match data: requests read the current snapshot, a background
+# worker (or the first stale read) refreshes it every DATA_TTL seconds.
+# APP_ROLE picks how processes share it:
+# - standalone (default): this process scrapes and serves
+# - refresher: scrapes and publishes snapshots to SNAPSHOT_FILE, serves nothing
+# - worker: serves whatever the refresher last published, never scrapes.
+#   Workers keep no team index; filtered team stats are queried from the store
+APP_ROLE = os.environ.get('APP_ROLE', 'standalone')
+SNAPSHOT_FILE = os.environ.get('SNAPSHOT_FILE', 'match_snapshot.bin')
+DATA_TTL = int(os.environ.get('DATA_TTL', 300))
+team_index = TeamStatsIndex() if APP_ROLE != 'worker' else None
+rating_engine = RatingEngine()
+if APP_ROLE == 'worker':
+    repository = SharedSnapshotReader(SNAPSHOT_FILE, ttl=DATA_TTL)
+else:
+    repository = MatchRepository(load_matches,
+                                 index=team_index,
+                                 ratings=rating_engine,
+                                 history=store,
+                                 ttl=DATA_TTL,
+                                 max_matches=MAX_MATCHES,
+                                 publisher=SnapshotPublisher(SNAPSHOT_FILE)
+                                 if APP_ROLE == 'refresher' else None)
+
+# Pages and default API bodies are rendered once per snapshot version
+payloads = PayloadCache()
+
+def cached_response(name, build, mimetype='text/html'):
+    """Serve build(snapshot) from the payload cache, with ETag/304 and compression"""
+    snapshot = repository.get()
+    payload = payloads.get(name, snapshot, lambda: build(snapshot), mimetype)
+    return payload_response(payloads, payload, request, Response)
+
+def section_response(section):
+    """A snapshot section as the default JSON body of its API route"""
+    snapshot = repository.get()
+    if isinstance(snapshot, SharedSnapshot):
+        # Served straight from the published file
+        return payload_response(payloads, snapshot.payload(section), request, Response)
+    return cached_response(f'api_{section}',
+                           lambda snapshot: app.json.dumps(getattr(snapshot, section)),
+                           'application/json')
 
 # Routes
 @app.route('/')
 def index():
-    matches = scrape_match_data()
-    team_stats = calculate_team_stats(matches)
-    recent_matches = matches[:10]  # Show 10 most recent matches
-    
-    return render_template('index.html', 
-                         matches=recent_matches, 
-                         team_stats=team_stats)
+    def render(snapshot):
+        recent_matches = snapshot.matches[:10]  # Show 10 most recent matches
+        return render_template('index.html', 
+                             matches=recent_matches, 
+                             team_stats=snapshot.team_stats)
+    return cached_response('index', render)
+
+def team_ratings(snapshot):
+    """team -> {game: rating} from the snapshot's rating table"""
+    by_team = {}
+    for game, table in snapshot.ratings.items():
+        for row in table:
+            by_team.setdefault(row['team'], {})[game] = row['rating']
+    return by_team
 
 @app.route('/teams')
 def teams():
-    matches = scrape_match_data()
-    team_stats = calculate_team_stats(matches)
-    
-    # Sort teams by win rate
-    sorted_teams = sorted(team_stats.values(), 
-                         key=lambda x: x['win_rate'], 
-                         reverse=True)
-    
-    return render_template('teams.html', teams=sorted_teams)
+    def render(snapshot):
+        # Leaderboard is kept sorted by win rate as matches come in
+        ratings = team_ratings(snapshot)
+        teams = [dict(team, ratings=ratings.get(team['name'], {}))
+                 for team in snapshot.leaderboard]
+        return render_template('teams.html', teams=teams)
+    return cached_response('teams', render)
+
+def render_matches_page(filters, page):
+    # Fetch one extra row to know whether there is a next page
+    rows = store.query(limit=MATCHES_PER_PAGE + 1,
+                       offset=(page - 1) * MATCHES_PER_PAGE, **filters)
+    return render_template('matches.html',
+                         matches=rows[:MATCHES_PER_PAGE],
+                         page=page,
+                         has_next=len(rows) > MATCHES_PER_PAGE,
+                         filters=filters)
 
 @app.route('/matches')
 def matches():
-    all_matches = scrape_match_data()
-    return render_template('matches.html', matches=all_matches)
+    if not request.args:
+        return cached_response('matches', lambda snapshot: render_matches_page({}, 1))
+    
+    repository.get()  # Make sure the store has been loaded
+    filters = match_filters(request.args)
+    page = max(request.args.get('page', 1, type=int), 1)
+    return render_matches_page(filters, page)
 
 @app.route('/api/matches')
 def api_matches():
-    matches = scrape_match_data()
-    return jsonify(matches)
+    """
+    No parameters: the full recent match list (legacy format)
+    Filters: game, team, tournament, start, end (YYYY-MM-DD, inclusive)
+    Paging: limit + cursor (from next_cursor), or format=ndjson to stream all
+    """
+    if not request.args:
+        return section_response('matches')
+    
+    repository.get()
+    filters = match_filters(request.args)
+    if request.args.get('format') == 'ndjson':
+        return ndjson_response(store.iter_matches(**filters))
+    
+    after = None
+    if request.args.get('cursor'):
+        try:
+            after = decode_match_cursor(request.args['cursor'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    
+    limit = api_limit(request.args)
+    rows = store.query(limit=limit + 1, after=after, **filters)
+    page = rows[:limit]
+    return jsonify({
+        'matches': page,
+        'next_cursor': match_cursor(page[-1]) if len(rows) > limit else None
+    })
 
 @app.route('/api/teams')
 def api_teams():
-    matches = scrape_match_data()
-    team_stats = calculate_team_stats(matches)
-    return jsonify(team_stats)
+    """
+    No parameters: stats for every team (legacy format)
+    Filters: game, team, tournament, start, end; teams come back ranked by win rate
+    Paging: limit + cursor (from next_cursor), or format=ndjson to stream all
+    """
+    if not request.args:
+        return section_response('team_stats')
+    
+    repository.get()
+    filters = match_filters(request.args)
+    if team_index is not None and not any(filters.get(key) for key in ('tournament', 'start', 'end')):
+        ranked = team_index.ranked(filters.get('game'))
+    else:
+        # The index keeps whole-history leaderboards; the store ranks the rest
+        ranked = store.ranked_teams(game=filters.get('game'), tournament=filters.get('tournament'),
+                                    start=filters.get('start'), end=filters.get('end'))
+    if filters.get('team'):
+        ranked = [stats for stats in ranked if stats['name'] == filters['team']]
+    if request.args.get('format') == 'ndjson':
+        return ndjson_response(ranked)
+    
+    if request.args.get('cursor'):
+        try:
+            win_rate, name = decode_team_cursor(request.args['cursor'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        # Keyset: teams after the cursor in (-win_rate, name) order
+        ranked = [stats for stats in ranked if (-stats['win_rate'], stats['name']) > (-win_rate, name)]
+    
+    limit = api_limit(request.args)
+    page = ranked[:limit]
+    return jsonify({
+        'teams': page,
+        'next_cursor': team_cursor(page[-1]) if len(ranked) > limit else None
+    })
+
+@app.route('/api/teams/<team_name>')
+def api_team(team_name):
+    repository.get()
+    game = request.args.get('game')
+    start = request.args.get('start')
+    end = request.args.get('end')
+    
+    if team_index is None or start or end:
+        if game:
+            stats = store.team_stats(team_name, game=game, start=start, end=end)
+        else:
+            stats = store.team_breakdown(team_name, start=start, end=end)
+    elif game:
+        stats = team_index.stats(team_name, game)
+    else:
+        stats = team_index.breakdown(team_name)
+    if stats is None:
+        return jsonify({'error': f"Unknown team: {team_name}"}), 404
+    return jsonify(stats)
+
+@app.route('/api/ratings')
+def api_ratings():
+    """Per-game Elo ratings, highest first; ?game= for a single game"""
+    game = request.args.get('game')
+    if not game:
+        return section_response('ratings')
+    
+    snapshot = repository.get()
+    if game not in snapshot.ratings:
+        return jsonify({'error': f"No ratings for game: {game}"}), 404
+    return jsonify(snapshot.ratings[game])
+
+@app.route('/api/metrics')
+def api_metrics():
+    metrics = repository.get_metrics()
+    metrics['payloads'] = dict(payloads.metrics)
+    if APP_ROLE != 'worker':
+        # Workers never rate anything; the refresher's engine does
+        metrics['ratings'] = dict(rating_engine.stats)
+    return jsonify(metrics)
+
+@app.before_request
+def start_refresher():
+    """
+    Start background refreshing in the process that serves requests, however
+    it was started (app.run, its reloader's child, gunicorn workers...)
+    """
+    repository.start()
+
+def run_refresher():
+    """Refresh and publish snapshots until interrupted (APP_ROLE=refresher)"""
+    logging.basicConfig(level=logging.INFO)
+    repository.start()
+    print(f"🔄 Publishing match snapshots to {SNAPSHOT_FILE} every "
+          f"{repository.refresh_interval:.0f}s (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        repository.stop()
 
 if __name__ == '__main__':
+    if APP_ROLE == 'refresher':
+        run_refresher()
+        raise SystemExit
     app.run(debug=True)
@@ -0,0 +1,158 @@
+# match_parser.py - Fast extraction of match rows from scraped pages
+import codecs
+import logging
+import re
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:
+    # lxml is in requirements.txt, but fall back to BeautifulSoup without it
+    etree = lxml_html = None
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('lxml', 'bs4-lxml', 'bs4')
+DEFAULT_ENCODING = 'utf-8'
+# The HTML spec requires a <meta charset> within the first 1024 bytes
+CHARSET_META = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?([\w.:-]+)""", re.IGNORECASE)
+
+
+def _class_test(class_name):
+    """XPath predicate for "has CSS class" (same matching as BeautifulSoup's class_=)"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+
+
+def page_encoding(content):
+    """Encoding declared by a page's <meta charset>, else UTF-8"""
+    found = CHARSET_META.search(content, 0, 1024)
+    if found:
+        try:
+            return codecs.lookup(found.group(1).decode('ascii')).name
+        except LookupError:
+            pass
+    return DEFAULT_ENCODING
+
+
+def _class_token(class_name):
+    """Regex matching a class attribute value that has `class_name` as one of its classes"""
+    return re.compile(rf"(?:^|\s){re.escape(class_name)}(?:\s|$)")
+
+
+def _class_attribute(class_name):
+    """Regex (on raw page bytes) for a quoted class attribute holding `class_name`"""
+    token = re.escape(class_name.encode())
+    return re.compile(rb"""class\s*=\s*["'](?:[^"']*\s)?""" + token + rb"""[\s"']""", re.IGNORECASE)
+
+
+class MatchListParser:
+    """
+    Pulls one dict per match row out of a page
+
+    - `row_class`: CSS class of each match element
+    - `fields`: output key -> CSS class of a descendant, or (class, n) for
+      the n-th (1-based) descendant with that class
+    - Only the part of the page from the first match row onwards (up to
+      `end_marker`, if given) is parsed; headers and navigation are skipped
+
+    XPath expressions are compiled once per parser, not once per page
+    """
+
+    def __init__(self, row_class, fields, row_tag='*', end_marker=None, backend=None):
+        self.row_class = row_class
+        self.row_tag = row_tag
+        self.fields = {key: spec if isinstance(spec, tuple) else (spec, 1)
+                       for key, spec in fields.items()}
+        self.end_marker = end_marker.encode() if isinstance(end_marker, str) else end_marker
+        self.backend = backend or ('lxml' if etree is not None else 'bs4')
+        # Exact class token, so e.g. "match" doesn't match class="match-filter"
+        # and "match-item" matches class="wf-module-item match-item"
+        self._start_marker = _class_attribute(row_class)
+        self._row_class_token = _class_token(row_class)
+
+        if etree is not None:
+            self._rows_xpath = etree.XPath(f"//{row_tag}[{_class_test(row_class)}]")
+            self._field_xpaths = {
+                key: etree.XPath(f"string((.//*[{_class_test(cls)}])[{n}])")
+                for key, (cls, n) in self.fields.items()
+            }
+
+    def subtree(self, content):
+        """
+        The slice of the page holding the match list: from the tag that opens
+        the first row to `end_marker`. Falls back to the whole page
+        """
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        found = self._start_marker.search(content)
+        if found is None:
+            return content
+        start = content.rfind(b'<', 0, found.start())
+        end = content.find(self.end_marker, start) if self.end_marker else -1
+        return content[start:end] if end > 0 else content[start:]
+
+    def parse(self, content, backend=None, subtree=True):
+        """List of {field: text} dicts; rows missing a field are skipped"""
+        backend = backend or self.backend
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        # Sniffed before slicing: the subtree no longer has the <meta charset>
+        encoding = page_encoding(content)
+        if subtree:
+            content = self.subtree(content)
+        if backend == 'lxml':
+            rows = self._parse_lxml(content, encoding)
+        else:
+            rows = self._parse_soup(content, 'lxml' if backend == 'bs4-lxml' else 'html.parser',
+                                    encoding)
+
+        matches = []
+        for row in rows:
+            missing = [key for key, value in row.items() if not value]
+            if missing:
+                logger.error(f"Error parsing match: missing {', '.join(missing)}")
+                continue
+            matches.append(row)
+        return matches
+
+    def _parse_lxml(self, content, encoding):
+        if not content.strip():
+            return []
+        # HTMLParser recovers from the unclosed tags left by slicing the page
+        parser = lxml_html.HTMLParser(recover=True, encoding=encoding)
+        root = lxml_html.fromstring(content, parser=parser)
+        rows = []
+        for element in self._rows_xpath(root):
+            rows.append({key: xpath(element).strip()
+                         for key, xpath in self._field_xpaths.items()})
+        return rows
+
+    def _parse_soup(self, content, features, encoding):
+        # SoupStrainer keeps only the match rows in the tree. A regex, since
+        # newer bs4 versions match a plain class_ string against the whole
+        # attribute, missing rows like class="match a-reset"
+        only_rows = SoupStrainer(None if self.row_tag == '*' else self.row_tag,
+                                 class_=self._row_class_token)
+        soup = BeautifulSoup(content, features, parse_only=only_rows, from_encoding=encoding)
+        rows = []
+        for element in soup.find_all(class_=self.row_class):
+            row = {}
+            for key, (cls, n) in self.fields.items():
+                found = element.find_all(class_=cls, limit=n)
+                row[key] = found[n - 1].get_text().strip() if len(found) >= n else ''
+            rows.append(row)
+        return rows
+
+
+# Parsers for the scrapers in scraper.py (selectors may need updating when
+# the sites change their markup)
+HLTV_MATCHES = MatchListParser('match', {'team1': 'team1', 'team2': 'team2', 'score': 'score'},
+                               row_tag='div')
+VLR_MATCHES = MatchListParser('match-item', {
+    'team1': ('match-item-vs-team-name', 1),
+    'team2': ('match-item-vs-team-name', 2),
+    'score1': ('match-item-vs-team-score', 1),
+    'score2': ('match-item-vs-team-score', 2)
+}, row_tag='a')
@@ -0,0 +1,206 @@
+# match_repository.py - Shared in-process match data with background refresh
+import logging
+import threading
+import time
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# Immutable view of the data at one point in time. Routes read a snapshot
+# and never modify it; refreshes build a new one and swap the reference.
+MatchSnapshot = namedtuple('MatchSnapshot', ['version', 'matches', 'team_stats',
+                                             'leaderboard', 'ratings', 'built_at'])
+
+
+class MatchRepository:
+    """
+    Holds the current match snapshot for every request to share
+
+    - `loader` returns the full match list (scraping, file, database...)
+    - `index` (a TeamStatsIndex) is synced with each new match list, so team
+      stats and the leaderboard only change by the matches that changed
+    - `ratings` (a RatingEngine) is synced the same way for per-game Elo
+    - With a `history` (a MatchStore) both are synced from the full store
+      instead, so stats and ratings don't depend on which matches fit in memory
+    - Snapshots older than `ttl` seconds are stale: they are still served,
+      but trigger a refresh in the background (stale-while-revalidate)
+    - Only the newest `max_matches` matches are kept in memory
+    - `publisher` (a SnapshotPublisher) is handed every new snapshot, for
+      worker processes to read
+    """
+
+    def __init__(self, loader, index=None, ratings=None, ttl=300, max_matches=5000,
+                 refresh_interval=None, publisher=None, history=None):
+        self.loader = loader
+        self.index = index
+        self.ratings = ratings
+        self.history = history
+        self.ttl = ttl
+        self.max_matches = max_matches
+        self.refresh_interval = refresh_interval or ttl / 2
+        self.publisher = publisher
+
+        self._snapshot = None
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._worker = None
+        self._start_lock = threading.Lock()
+
+        self.metrics = {
+            'hits': 0,
+            'misses': 0,
+            'stale_hits': 0,
+            'refreshes': 0,
+            'refresh_errors': 0,
+            'publish_errors': 0,
+            'evicted_matches': 0,
+            'index_changes': 0,
+            'last_refresh_seconds': 0,
+            'last_error': None
+        }
+
+    def get(self):
+        """Current snapshot; only loads inline when there is nothing to serve yet"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.metrics['misses'] += 1
+            return self._load_first()
+
+        if self._is_stale(snapshot):
+            self.metrics['stale_hits'] += 1
+            self.refresh_async()
+        else:
+            self.metrics['hits'] += 1
+        return snapshot
+
+    def refresh(self, wait=False):
+        """
+        Load matches and publish a new snapshot. Concurrent callers share one
+        refresh: with wait=False they return immediately if one is running
+        """
+        if not self._refresh_lock.acquire(blocking=wait):
+            return self._snapshot
+        try:
+            return self._build_snapshot()
+        except Exception as e:
+            self.metrics['refresh_errors'] += 1
+            self.metrics['last_error'] = str(e)
+            logger.error(f"Error refreshing match data: {e}")
+            if self._snapshot is None:
+                raise
+            return self._snapshot
+        finally:
+            self._refresh_lock.release()
+
+    def _load_first(self):
+        with self._refresh_lock:
+            # Another request may have loaded it while we waited
+            if self._snapshot is not None:
+                return self._snapshot
+        return self.refresh(wait=True)
+
+    def refresh_async(self):
+        """Refresh in a background thread unless one is already running"""
+        if self._refresh_lock.locked():
+            return
+        threading.Thread(target=self.refresh, name="MatchRefresh", daemon=True).start()
+
+    def _is_stale(self, snapshot):
+        return time.time() - snapshot.built_at > self.ttl
+
+    def _build_snapshot(self):
+        start = time.perf_counter()
+        matches = sorted(self.loader(), key=lambda m: m.get('date', ''), reverse=True)
+
+        if len(matches) > self.max_matches:
+            self.metrics['evicted_matches'] += len(matches) - self.max_matches
+            matches = matches[:self.max_matches]
+
+        team_stats, leaderboard = {}, ()
+        if self.index is not None:
+            if self.history is not None:
+                self.metrics['index_changes'] += self.index.sync_store(self.history)
+            else:
+                self.metrics['index_changes'] += self.index.sync(matches)
+            team_stats = self.index.team_stats()
+            leaderboard = tuple(self.index.leaderboard())
+        
+        ratings = {}
+        if self.ratings is not None:
+            if self.history is not None:
+                self.ratings.sync_store(self.history)
+            else:
+                self.ratings.sync(matches)
+            ratings = self.ratings.table()
+
+        previous = self._snapshot
+        snapshot = MatchSnapshot(
+            version=previous.version + 1 if previous else 1,
+            matches=tuple(matches),
+            team_stats=team_stats,
+            leaderboard=leaderboard,
+            ratings=ratings,
+            built_at=time.time()
+        )
+        self._snapshot = snapshot
+
+        if self.publisher is not None:
+            try:
+                self.publisher.publish(snapshot)
+            except OSError as e:
+                # Workers keep serving the previous file
+                self.metrics['publish_errors'] += 1
+                self.metrics['last_error'] = str(e)
+                logger.error(f"Error publishing snapshot: {e}")
+
+        self.metrics['refreshes'] += 1
+        self.metrics['last_refresh_seconds'] = round(time.perf_counter() - start, 4)
+        return snapshot
+
+    def start(self):
+        """
+        Start the background refresher (loads the first snapshot right away).
+        Cheap once running, and safe to call from every request: a process
+        forked after start() (gunicorn --preload) gets its own refresher
+        """
+        if self._worker and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker and self._worker.is_alive():
+                return
+            self._stop.clear()
+            self._worker = threading.Thread(target=self._run, name="MatchRefresher", daemon=True)
+            self._worker.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._worker:
+            self._worker.join(timeout=5)
+            self._worker = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            snapshot = self._snapshot
+            age = time.time() - snapshot.built_at if snapshot else None
+            if age is None or age >= self.refresh_interval:
+                self.refresh(wait=True)
+                age = 0
+            self._stop.wait(self.refresh_interval - age)
+
+    def get_metrics(self):
+        """Counters plus the age and size of the current snapshot"""
+        snapshot = self._snapshot
+        lookups = self.metrics['hits'] + self.metrics['misses'] + self.metrics['stale_hits']
+        metrics = dict(self.metrics)
+        metrics.update({
+            'hit_rate': round((lookups - self.metrics['misses']) / lookups, 4) if lookups else 0,
+            'version': snapshot.version if snapshot else 0,
+            'matches': len(snapshot.matches) if snapshot else 0,
+            'snapshot_age_seconds': round(time.time() - snapshot.built_at, 2) if snapshot else None,
+            'stale': self._is_stale(snapshot) if snapshot else True,
+            'ttl': self.ttl,
+            'refresher_running': bool(self._worker and self._worker.is_alive())
+        })
+        if self.publisher is not None:
+            metrics['publisher'] = dict(self.publisher.metrics)
+        return metrics
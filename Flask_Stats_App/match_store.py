@@ -0,0 +1,309 @@
+# match_store.py - SQLite-backed persistent match storage
+import base64
+import json
+import logging
+import sqlite3
+import sys
+import threading
+import time
+
+from team_stats_index import match_key, totals_stats
+
+logger = logging.getLogger(__name__)
+
+# Columns stored directly; any other match fields go into `extra` as JSON
+MATCH_COLUMNS = ('date', 'game', 'team1', 'team2', 'score1', 'score2',
+                 'winner', 'duration', 'tournament')
+
+# match_id has no declared type so ids keep their original type (int or str)
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    source      TEXT NOT NULL DEFAULT '',
+    match_id    NOT NULL,
+    date        TEXT NOT NULL DEFAULT '',
+    game        TEXT,
+    team1       TEXT,
+    team2       TEXT,
+    score1      INTEGER,
+    score2      INTEGER,
+    winner      TEXT,
+    duration    TEXT,
+    tournament  TEXT,
+    extra       TEXT,
+    updated_at  REAL,
+    PRIMARY KEY (source, match_id)
+);
+CREATE INDEX IF NOT EXISTS idx_matches_date ON matches (date);
+CREATE INDEX IF NOT EXISTS idx_matches_game_date ON matches (game, date);
+CREATE INDEX IF NOT EXISTS idx_matches_team1_date ON matches (team1, date);
+CREATE INDEX IF NOT EXISTS idx_matches_team2_date ON matches (team2, date);
+CREATE INDEX IF NOT EXISTS idx_matches_tournament_date ON matches (tournament, date);
+CREATE INDEX IF NOT EXISTS idx_matches_updated_at ON matches (updated_at);
+-- Databases from before dates were normalized
+UPDATE matches SET date = '' WHERE date IS NULL;
+"""
+
+ORDER_BY = "ORDER BY date DESC, source DESC, match_id DESC"
+
+
+def encode_cursor(values):
+    """Opaque, URL-safe pagination cursor from a list of values"""
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Values from encode_cursor(); raises ValueError for malformed cursors"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(values, list):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return values
+
+
+def match_cursor(match):
+    """Cursor pointing just after `match` in newest-first order"""
+    return encode_cursor([match.get('date') or '', match.get('source') or '', match['id']])
+
+
+def decode_match_cursor(cursor):
+    """
+    (date, source, id) from match_cursor(); raises ValueError unless the
+    cursor has exactly those values with the right types (ids derived from
+    content are strings, so either an int or a str is accepted for the id)
+    """
+    values = decode_cursor(cursor)
+    if len(values) != 3:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    date, source, match_id = values
+    if (not isinstance(date, str) or not isinstance(source, str)
+            or isinstance(match_id, bool) or not isinstance(match_id, (int, str))):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return values
+
+
+def team_cursor(stats):
+    """Cursor pointing just after a team in win-rate order"""
+    return encode_cursor([stats['win_rate'], stats['name']])
+
+
+def decode_team_cursor(cursor):
+    """(win_rate, name) from team_cursor(); raises ValueError for anything else"""
+    values = decode_cursor(cursor)
+    if len(values) != 2:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    win_rate, name = values
+    if isinstance(win_rate, bool) or not isinstance(win_rate, (int, float)) or not isinstance(name, str):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return values
+
+
+def _match_id(match):
+    """The match's own id, or a stable id derived from its content"""
+    if match.get('id') is not None:
+        return match['id']
+    return '|'.join(str(part) for part in match_key(match)[1:])
+
+
+class MatchStore:
+    """
+    Persistent match history in SQLite
+
+    Matches are upserted on (source, match_id), and reads are filtered,
+    paginated queries on indexed columns, so the full history never has to
+    be loaded into memory. Each thread gets its own connection
+    """
+
+    def __init__(self, path='matches.db'):
+        self.path = str(path)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self.connection().executescript(SCHEMA)
+
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def upsert_matches(self, matches):
+        """Insert new matches and update changed ones; returns rows written"""
+        now = time.time()
+        rows = []
+        for match in matches:
+            extra = {k: v for k, v in match.items()
+                     if k not in MATCH_COLUMNS and k not in ('id', 'source')}
+            values = {column: match.get(column) for column in MATCH_COLUMNS}
+            # Keyset cursors compare dates, so a missing one is stored as ''
+            values['date'] = values['date'] or ''
+            rows.append((match.get('source') or '', _match_id(match), *values.values(),
+                         json.dumps(extra, default=str) if extra else None, now))
+
+        columns = ', '.join(MATCH_COLUMNS)
+        updates = ', '.join(f"{c} = excluded.{c}" for c in MATCH_COLUMNS + ('extra', 'updated_at'))
+        changed = ' OR '.join(f"{c} IS NOT excluded.{c}" for c in MATCH_COLUMNS + ('extra',))
+        sql = (f"INSERT INTO matches (source, match_id, {columns}, extra, updated_at) "
+               f"VALUES ({', '.join('?' * (len(MATCH_COLUMNS) + 4))}) "
+               f"ON CONFLICT (source, match_id) DO UPDATE SET {updates} WHERE {changed}")
+
+        conn = self.connection()
+        with self._write_lock, conn:
+            before = conn.total_changes
+            conn.executemany(sql, rows)
+            written = conn.total_changes - before
+        if written:
+            logger.info(f"Stored {written} new/updated matches")
+        return written
+
+    def _where(self, game=None, team=None, tournament=None, start=None, end=None, source=None,
+               after=None):
+        clauses, params = [], []
+        if after:
+            # Keyset pagination: rows strictly after the cursor in ORDER_BY order
+            clauses.append("(date, source, match_id) < (?, ?, ?)")
+            params.extend(after)
+        if game:
+            clauses.append("game = ?")
+            params.append(game)
+        if team:
+            clauses.append("(team1 = ? OR team2 = ?)")
+            params.extend([team, team])
+        if tournament:
+            clauses.append("tournament = ?")
+            params.append(tournament)
+        if start:
+            clauses.append("date >= ?")
+            params.append(start)
+        if end:
+            clauses.append("date <= ?")
+            params.append(end)
+        if source is not None:
+            clauses.append("source = ?")
+            params.append(source)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    @staticmethod
+    def _row_to_match(row):
+        match = {'id': row['match_id']}
+        for column in MATCH_COLUMNS:
+            match[column] = row[column]
+        if row['source']:
+            match['source'] = row['source']
+        if row['extra']:
+            match.update(json.loads(row['extra']))
+        return match
+
+    def query(self, limit=50, offset=0, **filters):
+        """
+        Newest-first matches matching the filters, one page at a time. Pass
+        after=decode_match_cursor(...) for keyset pagination instead of an offset
+        """
+        where, params = self._where(**filters)
+        sql = f"SELECT * FROM matches{where} {ORDER_BY} LIMIT ? OFFSET ?"
+        rows = self.connection().execute(sql, params + [limit, offset])
+        return [self._row_to_match(row) for row in rows]
+
+    def count(self, **filters):
+        where, params = self._where(**filters)
+        return self.connection().execute(f"SELECT COUNT(*) FROM matches{where}", params).fetchone()[0]
+
+    def team_totals(self, team=None, **filters):
+        """{team: {game: (played, wins)}} over the matches matching the filters"""
+        where, params = self._where(**filters)
+        sql = (f"SELECT team, game, COUNT(*) AS played, SUM(winner = team) AS wins FROM ("
+               f"SELECT team1 AS team, game, winner FROM matches{where} UNION ALL "
+               f"SELECT team2 AS team, game, winner FROM matches{where})")
+        params = params * 2
+        if team is not None:
+            sql += " WHERE team = ?"
+            params.append(team)
+        totals = {}
+        for row in self.connection().execute(sql + " GROUP BY team, game", params):
+            totals.setdefault(row['team'], {})[row['game']] = (row['played'], row['wins'])
+        return totals
+
+    def ranked_teams(self, **filters):
+        """Teams ranked by win rate (ties by name), like TeamStatsIndex.ranked()"""
+        stats = [totals_stats(team, games) for team, games in self.team_totals(**filters).items()]
+        return sorted(stats, key=lambda s: (-s['win_rate'], s['name']))
+
+    def _team_games(self, team, filters):
+        """The team's {game: (played, wins)}, or None if it has no matches at all"""
+        games = self.team_totals(team=team, **filters).get(team, {})
+        if not games and not self.count(team=team):
+            return None
+        return games
+
+    def team_stats(self, team, **filters):
+        """One team's stats (like TeamStatsIndex.stats()), or None for unknown teams"""
+        games = self._team_games(team, filters)
+        return None if games is None else totals_stats(team, games)
+
+    def team_breakdown(self, team, **filters):
+        """A team's stats overall and per game (like TeamStatsIndex.breakdown())"""
+        games = self._team_games(team, filters)
+        if games is None:
+            return None
+        overall = totals_stats(team, games)
+        overall['by_game'] = {game: totals_stats(team, {game: counts})
+                              for game, counts in games.items()}
+        return overall
+
+    def recent(self, limit=5000):
+        """The newest `limit` matches"""
+        return self.query(limit=limit)
+
+    def iter_matches(self, batch_size=1000, **filters):
+        """Stream matching rows without loading them all at once"""
+        where, params = self._where(**filters)
+        cursor = self.connection().execute(f"SELECT * FROM matches{where} {ORDER_BY}", params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield self._row_to_match(row)
+
+    def updated_since(self, since=None):
+        """
+        Matches inserted or changed at or after `since` (an updated_at
+        time; None for all), plus the newest updated_at among them
+        """
+        sql = "SELECT * FROM matches"
+        params = []
+        if since is not None:
+            sql += " WHERE updated_at >= ?"
+            params.append(since)
+        rows = self.connection().execute(sql, params).fetchall()
+        latest = max((row['updated_at'] for row in rows), default=since)
+        return [self._row_to_match(row) for row in rows], latest
+    
+    def import_json(self, filename):
+        """Upsert every match from a matches.json file"""
+        with open(filename, 'r') as f:
+            return self.upsert_matches(json.load(f))
+
+
+if __name__ == '__main__':
+    # python match_store.py import matches.json [matches.db]
+    if len(sys.argv) < 3 or sys.argv[1] != 'import':
+        print("Usage: python match_store.py import <matches.json> [database]")
+        sys.exit(1)
+
+    logging.basicConfig(level=logging.INFO)
+    store = MatchStore(sys.argv[3] if len(sys.argv) > 3 else 'matches.db')
+    written = store.import_json(sys.argv[2])
+    print(f"Imported {written} matches ({store.count()} total in {store.path})")
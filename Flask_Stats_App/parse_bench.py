@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Parse Benchmark - Compare HTML parsing backends on match list pages
+
+Usage:
+    python parse_bench.py                      # the pages saved in fixtures/
+    python parse_bench.py page.html ...        # other saved pages (parsed as
+                                               # HLTV unless the name contains "vlr")
+    python parse_bench.py --synthetic          # generated pages, any --rows
+
+fixtures/ holds match list pages with the sites' markup: multi-class rows,
+classes that share a row class's prefix ahead of the list, non-ASCII team
+names and a few hundred KB of head/nav/footer around the rows
+
+Each page is parsed with every backend, on the whole page and on the match
+list subtree only, and every variant must find the same rows
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from match_parser import BACKENDS, HLTV_MATCHES, VLR_MATCHES
+
+FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures'
+
+
+def synthetic_page(kind, rows, seed=0):
+    """A page shaped like a real one: a bulky head/nav, then the match list"""
+    rng = random.Random(seed)
+    teams = ["Team Liquid", "Cloud9", "G2 Esports", "Fnatic", "NRG", "Sentinels", "FaZe", "NaVi"]
+    head = ''.join(f'<link rel="stylesheet" href="/css/{i}.css"><script>var x{i} = {i};</script>'
+                   for i in range(300))
+    nav = ''.join(f'<li class="nav-item"><a href="/page/{i}">Page {i}</a></li>' for i in range(500))
+
+    parts = [f'<!DOCTYPE html><html><head><title>Matches</title>{head}</head><body>'
+             f'<nav><ul>{nav}</ul></nav><div class="results">']
+    for i in range(rows):
+        team1, team2 = rng.sample(teams, 2)
+        if kind == 'vlr':
+            parts.append(
+                f'<a class="match-item" href="/{i}"><div class="match-item-time">{i % 24}:00</div>'
+                f'<div class="match-item-vs"><div class="match-item-vs-team">'
+                f'<div class="match-item-vs-team-name"><div class="text-of">{team1}</div></div>'
+                f'<div class="match-item-vs-team-score">{rng.randint(0, 2)}</div></div>'
+                f'<div class="match-item-vs-team"><div class="match-item-vs-team-name">'
+                f'<div class="text-of">{team2}</div></div>'
+                f'<div class="match-item-vs-team-score">{rng.randint(0, 2)}</div></div></div></a>')
+        else:
+            parts.append(
+                f'<div class="match"><a href="/matches/{i}"><div class="team1"> {team1} </div>'
+                f'<div class="score">{rng.randint(0, 16)} - {rng.randint(0, 16)}</div>'
+                f'<div class="team2"> {team2} </div><div class="event">Event {i % 7}</div></a></div>')
+    parts.append('</div><footer>' + 'Footer text. ' * 2000 + '</footer></body></html>')
+    return ''.join(parts).encode('utf-8')
+
+
+def legacy_parse(parser, content):
+    """The original approach: full html.parser tree, then find/find_all per field"""
+    soup = BeautifulSoup(content, 'html.parser')
+    rows = []
+    for element in soup.find_all(class_=parser.row_class):
+        row = {}
+        for key, (cls, n) in parser.fields.items():
+            found = element.find_all(class_=cls, limit=n)
+            row[key] = found[n - 1].get_text().strip() if len(found) >= n else ''
+        rows.append(row)
+    return rows
+
+
+def time_call(func, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def bench_page(name, parser, content, repeat):
+    print(f"\n📄 {name} ({len(content) / 1024:.0f} KB)")
+    baseline, expected = time_call(lambda: legacy_parse(parser, content), repeat)
+    print(f"   {'bs4 html.parser (original)':<30} {baseline * 1000:8.2f} ms  "
+          f"{len(expected):5d} rows   1.0x")
+
+    results = {'bytes': len(content), 'rows': len(expected), 'original_ms': baseline * 1000}
+    for backend in BACKENDS:
+        for subtree in (False, True):
+            label = f"{backend}{' + subtree' if subtree else ''}"
+            seconds, rows = time_call(lambda: parser.parse(content, backend, subtree), repeat)
+            ok = rows == expected
+            print(f"   {label:<30} {seconds * 1000:8.2f} ms  {len(rows):5d} rows "
+                  f"{baseline / seconds:5.1f}x{'' if ok else '  ❌ rows differ'}")
+            results[label] = seconds * 1000
+            if not ok:
+                results['mismatch'] = True
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark match list parsing backends")
+    parser.add_argument('fixtures', nargs='*', help=f"saved HTML pages (default: {FIXTURES_DIR}/*.html)")
+    parser.add_argument('--synthetic', action='store_true', help="benchmark generated pages instead")
+    parser.add_argument('--rows', type=int, default=100, help="match rows per synthetic page")
+    parser.add_argument('--repeat', type=int, default=5, help="runs per variant (median is kept)")
+    args = parser.parse_args()
+
+    pages = []
+    if args.synthetic:
+        pages.append(('synthetic hltv', HLTV_MATCHES, synthetic_page('hltv', args.rows)))
+        pages.append(('synthetic vlr', VLR_MATCHES, synthetic_page('vlr', args.rows)))
+    else:
+        for path in map(Path, args.fixtures or sorted(FIXTURES_DIR.glob('*.html'))):
+            page_parser = VLR_MATCHES if 'vlr' in path.name.lower() else HLTV_MATCHES
+            pages.append((path.name, page_parser, path.read_bytes()))
+    if not pages:
+        print(f"No pages to benchmark (no fixtures in {FIXTURES_DIR}; try --synthetic)")
+        return 1
+
+    print("⏱️  Parse benchmark (median of "
+          f"{args.repeat} runs, speedup vs the original BeautifulSoup parse)")
+    mismatches = 0
+    for name, page_parser, content in pages:
+        mismatches += bool(bench_page(name, page_parser, content, args.repeat).get('mismatch'))
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
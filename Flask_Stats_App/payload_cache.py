@@ -0,0 +1,122 @@
+# payload_cache.py - Response bodies built once per snapshot version
+import gzip
+import hashlib
+import threading
+from collections import namedtuple
+from email.utils import formatdate
+
+try:
+    import brotli
+except ImportError:
+    # Optional: brotli bodies are only offered when the package is installed
+    brotli = None
+
+# Bodies smaller than this aren't worth compressing
+MIN_COMPRESS_SIZE = 512
+
+# Memory-mapped bodies are written out in pieces of this size
+STREAM_CHUNK_SIZE = 64 * 1024
+
+Payload = namedtuple('Payload', ['body', 'mimetype', 'etag', 'last_modified', 'encoded'])
+
+
+def body_etag(body):
+    return hashlib.sha1(body).hexdigest()[:20]
+
+
+def encode_body(body):
+    """Compressed variants of a body: {content encoding: bytes}"""
+    encoded = {}
+    if len(body) >= MIN_COMPRESS_SIZE:
+        encoded['gzip'] = gzip.compress(body, compresslevel=6, mtime=0)
+        if brotli is not None:
+            encoded['br'] = brotli.compress(body, quality=5)
+    return encoded
+
+
+def iter_chunks(view):
+    for start in range(0, len(view), STREAM_CHUNK_SIZE):
+        yield bytes(view[start:start + STREAM_CHUNK_SIZE])
+
+
+class PayloadCache:
+    """
+    Rendered/serialized bodies per (name, snapshot version)
+
+    The first request after a refresh builds a body and its compressed
+    variants; every later request for that version reuses the bytes. The
+    ETag is a hash of the body, so a refresh that changes nothing keeps the
+    same ETag and Last-Modified and clients keep getting 304s
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.metrics = {'builds': 0, 'hits': 0, 'not_modified': 0}
+
+    def get(self, name, snapshot, build, mimetype='application/json'):
+        """Cached payload for this snapshot, calling build() -> str/bytes on a miss"""
+        entry = self._entries.get(name)
+        if entry and entry[0] == snapshot.version:
+            self.metrics['hits'] += 1
+            return entry[1]
+
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry and entry[0] == snapshot.version:
+                self.metrics['hits'] += 1
+                return entry[1]
+
+            body = build()
+            if isinstance(body, str):
+                body = body.encode('utf-8')
+            etag = body_etag(body)
+
+            # Unchanged content keeps its original Last-Modified
+            previous = entry[1] if entry else None
+            if previous and previous.etag == etag:
+                last_modified = previous.last_modified
+            else:
+                last_modified = int(snapshot.built_at)
+
+            payload = Payload(body, mimetype, etag, last_modified, encode_body(body))
+            self._entries[name] = (snapshot.version, payload)
+            self.metrics['builds'] += 1
+            return payload
+
+
+def payload_response(cache, payload, request, response_class):
+    """
+    Response for a cached payload: 304 if the client's copy is current.
+    Bodies may be bytes or memoryviews (streamed without a full copy)
+    """
+    headers = {
+        'ETag': f'W/"{payload.etag}"',
+        'Last-Modified': formatdate(payload.last_modified, usegmt=True),
+        'Cache-Control': 'no-cache',
+        'Vary': 'Accept-Encoding'
+    }
+
+    # If-None-Match wins over If-Modified-Since when both are sent
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains_weak(payload.etag)
+    else:
+        since = request.if_modified_since
+        not_modified = since is not None and since.timestamp() >= payload.last_modified
+    if not_modified:
+        cache.metrics['not_modified'] += 1
+        return response_class(status=304, headers=headers)
+
+    body = payload.body
+    for encoding in ('br', 'gzip'):
+        if encoding in payload.encoded and request.accept_encodings[encoding]:
+            body = payload.encoded[encoding]
+            headers['Content-Encoding'] = encoding
+            break
+
+    if isinstance(body, memoryview):
+        # A section of a shared snapshot: copied out a chunk at a time
+        headers['Content-Length'] = str(len(body))
+        body = iter_chunks(body)
+
+    return response_class(body, mimetype=payload.mimetype, headers=headers)
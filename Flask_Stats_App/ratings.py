@@ -0,0 +1,209 @@
+# ratings.py - Per-game Elo ratings from match history
+import threading
+
+try:
+    import numpy as np
+except ImportError:
+    # Batched recomputes fall back to a plain loop without numpy
+    np = None
+
+from team_stats_index import match_key
+
+BASE_RATING = 1500.0
+K_FACTOR = 32.0
+# More new matches than this at once are rated as a batch recompute
+INCREMENTAL_LIMIT = 500
+# Building layers is itself a Python loop over every match, so rating in
+# layers only beats rating match by match when layers are this big on
+# average (measured with 10^5 matches); few teams with many matches each
+# give long chains of tiny layers
+MIN_LAYER_SIZE = 4096
+
+
+def chronological_key(match):
+    """Order matches are rated in: date, then a stable tie-break"""
+    return (match['date'], str(match.get('source') or ''), str(match.get('id', '')))
+
+
+def expected_score(rating, opponent):
+    return 1.0 / (1.0 + 10 ** ((opponent - rating) / 400.0))
+
+
+def conflict_free_layers(pairs, size):
+    """
+    Split chronologically ordered (player_a, player_b) pairs into layers in
+    which no player appears twice. A pair goes one layer after the last
+    layer either player was in, so every player's matches stay in order and
+    a layer can be applied all at once with the same result as one by one
+    """
+    last = [-1] * size
+    layers = []
+    for i, (a, b) in enumerate(pairs):
+        layer = max(last[a], last[b]) + 1
+        last[a] = last[b] = layer
+        if layer == len(layers):
+            layers.append([])
+        layers[layer].append(i)
+    return layers
+
+
+class RatingEngine:
+    """
+    Elo ratings per game, updated as matches arrive
+
+    New matches dated after everything already rated are applied one by one.
+    Anything else (a correction, a removal, a late result for an earlier
+    date) changes history, so all ratings are recomputed from scratch: in
+    vectorized batches of conflict-free matches when those batches are big
+    enough to pay off (see MIN_LAYER_SIZE), otherwise match by match
+
+    sync_store() rates the whole history in a MatchStore, reading only the
+    rows upserted since the previous sync; sync() rates a given match list
+    """
+
+    def __init__(self, k_factor=K_FACTOR, base_rating=BASE_RATING):
+        self.k_factor = k_factor
+        self.base_rating = base_rating
+        self.ratings = {}    # game -> {team: rating}
+        self.played = {}     # game -> {team: matches rated}
+        self.matches = {}    # match_key -> (team1, team2, winner, game, date)
+        self.latest = None   # chronological_key of the newest rated match
+        self.synced_at = None  # newest MatchStore updated_at seen by sync_store()
+        self.stats = {'incremental': 0, 'recomputes': 0}
+        self._lock = threading.Lock()
+
+    def sync(self, matches):
+        """Bring ratings in line with a full match list; returns 'incremental', 'recompute' or None"""
+        with self._lock:
+            current = {match_key(m): m for m in matches}
+            removed = self.matches.keys() - current.keys()
+            changed = [m for key, m in current.items()
+                       if self.matches.get(key) != self._contribution(m)]
+            if not removed and not changed:
+                return None
+            if removed:
+                self._recompute_history(current.items())
+                return 'recompute'
+            return self._update(changed, lambda: current.items())
+
+    def sync_store(self, store):
+        """
+        Bring ratings in line with every match in a MatchStore; returns
+        'incremental', 'recompute' or None. Matches dropping out of the
+        app's in-memory window don't affect ratings
+        """
+        with self._lock:
+            rows, synced_at = store.updated_since(self.synced_at)
+            first_sync = self.synced_at is None
+            changed = [m for m in rows if self.matches.get(match_key(m)) != self._contribution(m)]
+            self.synced_at = synced_at
+            if not changed:
+                return None
+            if first_sync:
+                # Everything was just read, so there is no need to read it twice
+                self._recompute_history((match_key(m), m) for m in rows)
+                return 'recompute'
+            return self._update(changed, lambda: ((match_key(m), m) for m in store.iter_matches()))
+
+    def _update(self, changed, history):
+        """
+        Apply changed matches incrementally when they are all new and newer
+        than everything rated, otherwise recompute from history()
+        """
+        changed.sort(key=chronological_key)
+        is_new = all(match_key(m) not in self.matches for m in changed)
+        if (is_new and self.latest is not None
+                and len(changed) <= INCREMENTAL_LIMIT
+                and chronological_key(changed[0]) > self.latest):
+            for match in changed:
+                self._apply(match)
+            self.stats['incremental'] += len(changed)
+            return 'incremental'
+
+        self._recompute_history(history())
+        return 'recompute'
+
+    def _recompute_history(self, items):
+        self._recompute(sorted(items, key=lambda item: chronological_key(item[1])))
+        self.stats['recomputes'] += 1
+
+    @staticmethod
+    def _contribution(match):
+        return (match['team1'], match['team2'], match['winner'], match['game'], match['date'])
+
+    def _apply(self, match):
+        game = match['game']
+        ratings = self.ratings.setdefault(game, {})
+        played = self.played.setdefault(game, {})
+        team1, team2 = match['team1'], match['team2']
+        r1 = ratings.get(team1, self.base_rating)
+        r2 = ratings.get(team2, self.base_rating)
+
+        delta = self.k_factor * ((match['winner'] == team1) - expected_score(r1, r2))
+        ratings[team1] = r1 + delta
+        ratings[team2] = r2 - delta
+        played[team1] = played.get(team1, 0) + 1
+        played[team2] = played.get(team2, 0) + 1
+
+        self.matches[match_key(match)] = self._contribution(match)
+        key = chronological_key(match)
+        self.latest = key if self.latest is None else max(self.latest, key)
+
+    def _recompute(self, items):
+        """Rate the whole history again from chronologically sorted (key, match) items"""
+        self.ratings, self.played, self.matches, self.latest = {}, {}, {}, None
+        if not items:
+            return
+        if np is None:
+            for _, match in items:
+                self._apply(match)
+            return
+
+        # One rating slot per (game, team), so every game is rated in one pass
+        slots = {}
+        pairs = []
+        won = []
+        for key, match in items:
+            game = match['game']
+            a = slots.setdefault((game, match['team1']), len(slots))
+            b = slots.setdefault((game, match['team2']), len(slots))
+            pairs.append((a, b))
+            won.append(match['winner'] == match['team1'])
+            self.matches[key] = self._contribution(match)
+
+        pair_array = np.array(pairs, dtype=np.int64)
+        first, second = pair_array[:, 0], pair_array[:, 1]
+        played = np.bincount(np.concatenate([first, second]), minlength=len(slots))
+
+        # No layer can hold more than len(pairs) / (busiest slot's matches)
+        if len(pairs) < MIN_LAYER_SIZE * played.max():
+            ratings = [self.base_rating] * len(slots)
+            for (a, b), result in zip(pairs, won):
+                delta = self.k_factor * (result - expected_score(ratings[a], ratings[b]))
+                ratings[a] += delta
+                ratings[b] -= delta
+        else:
+            won = np.array(won, dtype=np.float64)
+            ratings = np.full(len(slots), self.base_rating)
+            for layer in conflict_free_layers(pairs, len(slots)):
+                idx = np.asarray(layer)
+                a, b = first[idx], second[idx]
+                expected = 1.0 / (1.0 + 10 ** ((ratings[b] - ratings[a]) / 400.0))
+                delta = self.k_factor * (won[idx] - expected)
+                ratings[a] += delta
+                ratings[b] -= delta
+
+        for (game, team), slot in slots.items():
+            self.ratings.setdefault(game, {})[team] = float(ratings[slot])
+            self.played.setdefault(game, {})[team] = int(played[slot])
+        self.latest = chronological_key(items[-1][1])
+
+    def table(self):
+        """game -> teams sorted by rating, as [{'team', 'rating', 'matches'}]"""
+        with self._lock:
+            return {
+                game: [{'team': team, 'rating': round(rating, 1),
+                        'matches': self.played[game][team]}
+                       for team, rating in sorted(ratings.items(), key=lambda item: -item[1])]
+                for game, ratings in sorted(self.ratings.items())
+            }
@@ -4,36 +4,358 @@ requests==2.31.0
 beautifulsoup4==4.12.2
 lxml==4.9.3
 python-dateutil==2.8.2
+numpy==1.25.2
 
 # scraper.py - Web scraping utilities
+import argparse
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from match_parser import HLTV_MATCHES, VLR_MATCHES
 import json
+import os
+import re
+import hashlib
 import time
-from datetime import datetime
+import threading
+from concurrent.futures import Future, wait
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse, urlencode
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Per-host request budgets: (requests per second, burst). Hosts not listed
+# here get one request per `delay` seconds with a burst of DEFAULT_BURST
+HOST_LIMITS = {
+    'www.hltv.org': (0.5, 2),
+    'www.vlr.gg': (1.0, 3),
+    'liquipedia.net': (1 / 30, 1),  # Liquipedia allows one parse request per 30s
+}
+DEFAULT_BURST = 2
+
+# Shared connection pool sizing (connections kept per host / hosts cached)
+POOL_MAXSIZE = 10
+POOL_CONNECTIONS = 10
+
+MAX_RETRIES = 3
+RETRY_STATUSES = (429, 503)
+
+# On-disk cache of fetched pages, revalidated with conditional GETs
+HTTP_CACHE_DIR = '.http_cache'
+HTTP_CACHE_MAX_BYTES = 50 * 1024 * 1024
+# Cache hits only update LRU order, so the index is rewritten for them at
+# most this often (stores and flush() write it straight away)
+HTTP_CACHE_INDEX_SAVE_INTERVAL = 30
+
+class TokenBucket:
+    """
+    Token bucket for one host; tokens can go negative to queue waiters, and
+    each waiter sleeps until its own token has refilled
+    """
+    
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()  # Time `tokens` is counted at (later while blocked)
+        self.blocked_until = 0
+        self.blocks = 0
+    
+    def reserve(self, now):
+        """Take a token and return how long the caller must wait for it"""
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+        self.tokens -= 1
+        wait_for_token = -self.tokens / self.rate if self.tokens < 0 else 0
+        return self.updated - now + wait_for_token
+    
+    def block(self, until):
+        """
+        Hold all requests until `until`. The bucket then restarts with a
+        single token, so queued waiters are let through one token apart
+        instead of all waking at `until` and hitting the host together
+        """
+        if until <= self.blocked_until:
+            return
+        self.blocked_until = until
+        self.tokens = 1
+        self.updated = until
+        self.blocks += 1
+
+class HostRateLimiter:
+    """
+    Per-host token buckets shared by every scraper, so parallel scrapes
+    never hit one site faster than its budget allows. Requests under budget
+    go straight through; a 429/Retry-After blocks the whole host
+    """
+    
+    def __init__(self, host_limits=None):
+        self.host_limits = dict(HOST_LIMITS if host_limits is None else host_limits)
+        self.buckets = {}
+        self.lock = threading.Lock()
+    
+    def configure(self, host, rate, burst=1):
+        with self.lock:
+            self.host_limits[host] = (rate, burst)
+            self.buckets.pop(host, None)
+    
+    def _bucket(self, host, delay):
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            rate, burst = self.host_limits.get(host, (1 / max(delay, 0.001), DEFAULT_BURST))
+            bucket = self.buckets[host] = TokenBucket(rate, burst)
+        return bucket
+    
+    def wait(self, host, delay=1):
+        """Reserve a request for host, sleeping only if it's over budget"""
+        waited = 0
+        while True:
+            with self.lock:
+                bucket = self._bucket(host, delay)
+                pause = bucket.reserve(time.monotonic())
+                blocks = bucket.blocks
+            if pause <= 0:
+                return waited
+            time.sleep(pause)
+            waited += pause
+            with self.lock:
+                if bucket.blocks == blocks:
+                    return waited
+            # A backoff started while we slept: queue up again behind it
+    
+    def backoff(self, host, seconds):
+        """Block all requests to host for `seconds` (e.g. after a 429)"""
+        with self.lock:
+            self._bucket(host, 1).block(time.monotonic() + seconds)
+        logger.warning(f"Backing off {host} for {seconds:.1f}s")
+
+def retry_after_seconds(response, attempt):
+    """Seconds to wait from a Retry-After header, or exponential backoff"""
+    value = response.headers.get('Retry-After')
+    if value:
+        if value.strip().isdigit():
+            return int(value)
+        try:
+            retry_at = parsedate_to_datetime(value)
+            return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0)
+        except (TypeError, ValueError):
+            pass
+    return 2 ** attempt
+
+def run_in_daemon_thread(func, *args, name=None):
+    """
+    Run func(*args) on a new daemon thread and return a Future for it.
+    ThreadPoolExecutor workers are joined at interpreter exit, so a scrape
+    that missed its deadline would still hold up the exit; these aren't
+    """
+    future = Future()
+    
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(func(*args))
+        except BaseException as e:
+            future.set_exception(e)
+    
+    threading.Thread(target=run, name=name, daemon=True).start()
+    return future
+
+_shared_session = None
+_session_lock = threading.Lock()
+
+def shared_session(pool_maxsize=None):
+    """One requests.Session (and connection pool) shared by all scrapers"""
+    global _shared_session
+    with _session_lock:
+        if _shared_session is None or pool_maxsize is not None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS,
+                                  pool_maxsize=pool_maxsize or POOL_MAXSIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            session.headers.update({
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+            })
+            _shared_session = session
+        return _shared_session
+
+class ResponseCache:
+    """
+    On-disk LRU cache of page bodies plus their ETag/Last-Modified, so
+    unchanged pages are revalidated with a conditional GET (304, no body)
+    instead of downloaded again. Bodies are evicted least recently used
+    first once the cache grows past max_bytes
+    """
+    
+    def __init__(self, directory=HTTP_CACHE_DIR, max_bytes=HTTP_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.index_file = os.path.join(directory, 'index.json')
+        self.index = None
+        self.index_dirty = False
+        self.index_saved_at = 0
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'index_writes': 0}
+    
+    @staticmethod
+    def key_for(url, params=None):
+        if params:
+            url = f"{url}?{urlencode(sorted(dict(params).items()))}"
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+    
+    def _load_index(self):
+        if self.index is None:
+            try:
+                with open(self.index_file, 'r') as f:
+                    self.index = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self.index = {}
+        return self.index
+    
+    def _save_index(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_file = f"{self.index_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(tmp_file, self.index_file)
+        self.index_dirty = False
+        self.index_saved_at = time.monotonic()
+        self.stats['index_writes'] += 1
+    
+    def flush(self):
+        """Write index changes deferred by cache hits"""
+        with self.lock:
+            if self.index_dirty:
+                self._save_index()
+    
+    def _body_path(self, key):
+        return os.path.join(self.directory, f"{key}.body")
+    
+    def validators(self, key):
+        """Conditional request headers for a cached page (empty if not cached)"""
+        with self.lock:
+            entry = self._load_index().get(key)
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+    
+    def load(self, key, url):
+        """Cached page as a requests.Response (after a 304), or None"""
+        with self.lock:
+            entry = self._load_index().get(key)
+            if entry is None:
+                return None
+            try:
+                with open(self._body_path(key), 'rb') as f:
+                    body = f.read()
+            except FileNotFoundError:
+                del self.index[key]
+                self.index_dirty = True
+                return None
+            entry['last_used'] = time.time()
+            self.index_dirty = True
+            if time.monotonic() - self.index_saved_at >= HTTP_CACHE_INDEX_SAVE_INTERVAL:
+                self._save_index()
+            self.stats['hits'] += 1
+        
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response._content = body
+        response.headers.update(entry.get('headers', {}))
+        response.from_cache = True
+        return response
+    
+    def store(self, key, response):
+        """Cache a 200 response if it carries an ETag or Last-Modified"""
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if response.status_code != 200 or not (etag or last_modified):
+            return
+        
+        with self.lock:
+            index = self._load_index()
+            os.makedirs(self.directory, exist_ok=True)
+            body_path = self._body_path(key)
+            with open(f"{body_path}.tmp", 'wb') as f:
+                f.write(response.content)
+            os.replace(f"{body_path}.tmp", body_path)
+            
+            index[key] = {
+                'url': response.url,
+                'etag': etag,
+                'last_modified': last_modified,
+                'size': len(response.content),
+                'last_used': time.time(),
+                'headers': {k: v for k, v in response.headers.items()
+                            if k.lower() in ('content-type', 'etag', 'last-modified')}
+            }
+            self.stats['stores'] += 1
+            self._evict()
+            self._save_index()
+    
+    def _evict(self):
+        total = sum(entry['size'] for entry in self.index.values())
+        for key in sorted(self.index, key=lambda k: self.index[k]['last_used']):
+            if total <= self.max_bytes:
+                break
+            total -= self.index.pop(key)['size']
+            self.stats['evictions'] += 1
+            try:
+                os.remove(self._body_path(key))
+            except FileNotFoundError:
+                pass
+
 class EsportsScraper:
     """
     Base class for esports data scraping
     Extend this class to scrape from specific sites
     """
     
+    rate_limiter = HostRateLimiter()
+    http_cache = ResponseCache()
+    
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        self.session = shared_session()
     
-    def get_page(self, url, delay=1):
-        """Get a web page with error handling and rate limiting"""
+    def get_page(self, url, delay=1, params=None, use_cache=True):
+        """
+        Get a web page with error handling and per-host rate limiting.
+        Cached pages are revalidated; a 304 returns the cached copy
+        """
+        host = urlparse(url).netloc
+        cache = self.http_cache if use_cache else None
+        key = cache.key_for(url, params) if cache else None
         try:
-            time.sleep(delay)  # Rate limiting
-            response = self.session.get(url, timeout=10)
+            attempt = 0
+            while True:
+                self.rate_limiter.wait(host, delay)
+                headers = cache.validators(key) if cache else {}
+                response = self.session.get(url, params=params, headers=headers, timeout=10)
+                if headers and response.status_code == 304:
+                    cached = cache.load(key, response.url)
+                    if cached is not None:
+                        return cached
+                    # Cache entry vanished (load() dropped it): go round again
+                    # unconditionally, through the same rate limit and retries
+                    continue
+                if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                    break
+                self.rate_limiter.backoff(host, retry_after_seconds(response, attempt))
+                attempt += 1
+            
             response.raise_for_status()
+            if cache:
+                cache.stats['misses'] += 1
+                cache.store(key, response)
             return response
         except requests.RequestException as e:
             logger.error(f"Error fetching {url}: {e}")
@@ -49,7 +371,7 @@ class LiquipediaScraper(EsportsScraper):
         super().__init__()
         self.base_url = "https://liquipedia.net"
     
-    def scrape_recent_matches(self, game="valorant"):
+    def scrape_recent_matches(self, game="valorant", seen=None):
         """
         Scrape recent matches from Liquipedia
         Note: This is a simplified example. Real implementation would need:
@@ -87,9 +409,10 @@ class HLTVScraper(EsportsScraper):
         super().__init__()
         self.base_url = "https://www.hltv.org"
     
-    def scrape_recent_matches(self):
+    def scrape_recent_matches(self, seen=None):
         """
-        Scrape recent matches from HLTV
+        Scrape recent matches from HLTV, newest first, stopping once the
+        source's watermark (`seen`) is reached; see Watermark
         This is a simplified example - real implementation needs:
         - Proper rate limiting
         - Handling of dynamic content
@@ -101,32 +424,24 @@ class HLTVScraper(EsportsScraper):
         if not response:
             return []
         
-        soup = BeautifulSoup(response.content, 'html.parser')
         matches = []
+        watermark = Watermark(seen)
         
         # Example parsing (structure may change)
-        match_elements = soup.find_all('div', class_='match')
-        
-        for match_elem in match_elements:
-            try:
-                # Extract match data from HTML structure
-                # This is pseudo-code - actual selectors would need inspection
-                team1 = match_elem.find('div', class_='team1').text.strip()
-                team2 = match_elem.find('div', class_='team2').text.strip()
-                score = match_elem.find('div', class_='score').text.strip()
-                
-                match_data = {
-                    'team1': team1,
-                    'team2': team2,
-                    'score': score,
-                    'game': 'CS2',
-                    'date': datetime.now().strftime('%Y-%m-%d')
-                }
-                matches.append(match_data)
-                
-            except Exception as e:
-                logger.error(f"Error parsing match: {e}")
+        # Selectors are pseudo-code - actual selectors would need inspection
+        for row in HLTV_MATCHES.parse(response.content):
+            match_data = {
+                'team1': row['team1'],
+                'team2': row['team2'],
+                'score': row['score'],
+                'game': 'CS2',
+                'date': datetime.now().strftime('%Y-%m-%d')
+            }
+            if watermark.unchanged(match_data):
+                if watermark.reached:
+                    break
                 continue
+            matches.append(match_data)
         
         return matches
 
@@ -139,9 +454,10 @@ class VLRScraper(EsportsScraper):
         super().__init__()
         self.base_url = "https://www.vlr.gg"
     
-    def scrape_recent_matches(self):
+    def scrape_recent_matches(self, seen=None):
         """
-        Scrape recent Valorant matches from VLR.gg
+        Scrape recent Valorant matches from VLR.gg, stopping at the watermark
+        (unchanged matches are skipped, changed ones returned again)
         """
         url = f"{self.base_url}/matches"
         
@@ -149,46 +465,315 @@ class VLRScraper(EsportsScraper):
         if not response:
             return []
         
-        soup = BeautifulSoup(response.content, 'html.parser')
         matches = []
+        watermark = Watermark(seen)
         
-        # This would need to be implemented based on VLR's actual structure
-        # Just showing the pattern here
+        # Selectors follow VLR's match list layout; verify against the live page
+        for row in VLR_MATCHES.parse(response.content):
+            match_data = {
+                'team1': row['team1'],
+                'team2': row['team2'],
+                'score1': row['score1'],
+                'score2': row['score2'],
+                'game': 'Valorant',
+                'date': datetime.now().strftime('%Y-%m-%d')
+            }
+            if watermark.unchanged(match_data):
+                if watermark.reached:
+                    break
+                continue
+            matches.append(match_data)
         
         return matches
 
+# Words that don't tell teams apart across sites ("Team Liquid" vs "Liquid")
+TEAM_NAME_NOISE = {'team', 'esports', 'esport', 'gaming', 'club', 'clan', 'gg'}
+# Normalized full name -> normalized short name, for sites that differ
+TEAM_ALIASES = {'natusvincere': 'navi', 'ninjasinpyjamas': 'nip'}
+WATERMARK_SIZE = 200
+# Finished, unchanged matches in a row that mean the rest was already scraped
+WATERMARK_RUN = 5
+# Fields whose change means a match has to be emitted (and upserted) again
+MATCH_STATE_FIELDS = ('score', 'score1', 'score2', 'winner', 'status')
+UNFINISHED_STATUSES = {'upcoming', 'live', 'scheduled'}
+DEDUP_DAYS = 30
+SCRAPE_STATE_FILE = 'scrape_state.json'
+
+def normalize_name(name, noise=()):
+    """Lowercase alphanumeric words of a name, minus noise words"""
+    words = re.findall(r'[a-z0-9]+', (name or '').lower())
+    return ''.join([w for w in words if w not in noise] or words)
+
+def match_fingerprint(match, date=None):
+    """Source-independent identity of a match: game, both teams (any order), date"""
+    teams = sorted(TEAM_ALIASES.get(name, name) for name in
+                   (normalize_name(match.get(key), TEAM_NAME_NOISE) for key in ('team1', 'team2')))
+    date = date or str(match.get('date', ''))[:10]
+    return f"{normalize_name(match.get('game'))}|{teams[0]}|{teams[1]}|{date}"
+
+def match_state(match):
+    """Result/status part of a match; it changes as a match goes from upcoming to final"""
+    return '|'.join(str(match.get(field) or '') for field in MATCH_STATE_FIELDS)
+
+def watermark_key(match):
+    """Identity plus state, so a match whose score or status changed is new again"""
+    return f"{match_fingerprint(match)}#{match_state(match)}"
+
+def match_is_final(match):
+    """Whether a match has a result that shouldn't change any more"""
+    status = str(match.get('status') or '').lower()
+    if status:
+        return status not in UNFINISHED_STATUSES
+    if match.get('winner'):
+        return True
+    scores = [match.get(field) for field in ('score', 'score1', 'score2')]
+    return any(re.search(r'\d', str(score)) for score in scores if score is not None)
+
+class Watermark:
+    """
+    Where a scraper reading a newest-first list can stop
+    
+    unchanged(match) is True for matches already scraped with the same
+    score/status; they're skipped. Upcoming or live matches are rescraped
+    until they have a result, and the scan only stops (`reached`) after
+    WATERMARK_RUN finished, unchanged matches in a row, so a corrected
+    result just below the newest matches is still picked up
+    """
+    
+    def __init__(self, seen=None):
+        self.seen = seen or set()
+        self.run = 0
+    
+    @property
+    def reached(self):
+        return self.run >= WATERMARK_RUN
+    
+    def unchanged(self, match):
+        if watermark_key(match) not in self.seen:
+            self.run = 0
+            return False
+        if match_is_final(match):
+            self.run += 1
+        return True
+
+class ScrapeState:
+    """
+    Incremental scraping state, saved as JSON between runs
+    - watermarks: each source's most recent watermark_key()s, newest first;
+      scrapers skip matches on it and stop once they are past it
+    - seen: fingerprint -> source for the last DEDUP_DAYS days, so a match
+      reported by several sites is only kept once
+    """
+    
+    def __init__(self, filename=SCRAPE_STATE_FILE):
+        self.filename = filename
+        self.watermarks = {}
+        self.seen = {}
+        try:
+            with open(filename, 'r') as f:
+                state = json.load(f)
+            self.watermarks = state.get('watermarks', {})
+            self.seen = state.get('seen', {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Error loading scrape state: {e}")
+    
+    def watermark(self, source):
+        return set(self.watermarks.get(source, []))
+    
+    def advance(self, source, matches):
+        """Put a source's newly scraped matches (newest first) on its watermark"""
+        keys = [watermark_key(m) for m in matches]
+        self.watermarks[source] = (keys + self.watermarks.get(source, []))[:WATERMARK_SIZE]
+    
+    def find_duplicate(self, match):
+        """Source that already reported this match (dates may be a day off), or None"""
+        try:
+            day = datetime.strptime(str(match.get('date', ''))[:10], '%Y-%m-%d')
+        except ValueError:
+            return self.seen.get(match_fingerprint(match))
+        for offset in (0, -1, 1):
+            date = (day + timedelta(days=offset)).strftime('%Y-%m-%d')
+            source = self.seen.get(match_fingerprint(match, date))
+            if source:
+                return source
+        return None
+    
+    def remember(self, match):
+        self.seen[match_fingerprint(match)] = match.get('source', '')
+    
+    def prune(self):
+        cutoff = (datetime.now() - timedelta(days=DEDUP_DAYS)).strftime('%Y-%m-%d')
+        self.seen = {fp: source for fp, source in self.seen.items()
+                     if fp.rsplit('|', 1)[1] >= cutoff}
+    
+    def save(self):
+        try:
+            tmp_file = f"{self.filename}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump({'watermarks': self.watermarks, 'seen': self.seen}, f)
+            os.replace(tmp_file, self.filename)
+        except Exception as e:
+            logger.error(f"Error saving scrape state: {e}")
+
 class EsportsDataAggregator:
     """
     Aggregates data from multiple sources
     """
     
-    def __init__(self):
+    def __init__(self, state_file=SCRAPE_STATE_FILE):
         self.scrapers = {
             'hltv': HLTVScraper(),
             'vlr': VLRScraper(),
             'liquipedia': LiquipediaScraper()
         }
+        self.last_run = {}
+        self.state = ScrapeState(state_file)
+        self._state_lock = threading.Lock()
+        # Held for as long as a source is being scraped, including scrapes
+        # that missed their deadline and carry on in the background
+        self._source_locks = {source: threading.Lock() for source in self.scrapers}
     
-    def get_all_recent_matches(self):
-        """Get recent matches from all sources"""
+    def get_all_recent_matches(self, concurrent=False, deadline=None, watermarks=None):
+        """Get recent matches from all sources (stopping at watermarks, if given)"""
+        if concurrent:
+            return self.get_all_recent_matches_concurrent(deadline, watermarks)
+        
         all_matches = []
+        watermarks = watermarks or {}
+        self.last_run = {}
         
         for source, scraper in self.scrapers.items():
+            if not self._claim(source):
+                continue
             try:
                 logger.info(f"Scraping from {source}")
-                matches = scraper.scrape_recent_matches()
-                
-                # Add source information
-                for match in matches:
-                    match['source'] = source
-                
+                matches, _ = self._scrape_source(source, scraper, watermarks.get(source))
                 all_matches.extend(matches)
+                self.last_run[source] = {'status': 'ok', 'matches': len(matches)}
                 
             except Exception as e:
                 logger.error(f"Error scraping from {source}: {e}")
+                self.last_run[source] = {'status': 'error', 'error': str(e)}
+        
+        return all_matches
+    
+    def _claim(self, source):
+        """
+        Lock a source for one _scrape_source() call. False (and noted in
+        last_run) while its previous scrape is still running, so a slow host
+        never gets two overlapping scrapes
+        """
+        if self._source_locks[source].acquire(blocking=False):
+            return True
+        logger.warning(f"Skipping {source}: its previous scrape is still running")
+        self.last_run[source] = {'status': 'busy'}
+        return False
+    
+    def _scrape_source(self, source, scraper, seen=None):
+        """Scrape a source claimed with _claim(), releasing it when done"""
+        try:
+            start = time.monotonic()
+            matches = scraper.scrape_recent_matches(seen=seen)
+            for match in matches:
+                match['source'] = source
+            return matches, time.monotonic() - start
+        finally:
+            self._source_locks[source].release()
+    
+    def get_all_recent_matches_concurrent(self, deadline=None, watermarks=None):
+        """
+        Scrape all sources in parallel and return whatever finished before
+        `deadline` seconds. Per-source outcomes are kept in self.last_run
+        """
+        all_matches = []
+        self.last_run = {}
+        futures = {}
+        watermarks = watermarks or {}
+        for source, scraper in self.scrapers.items():
+            if not self._claim(source):
+                continue
+            logger.info(f"Scraping from {source}")
+            future = run_in_daemon_thread(self._scrape_source, source, scraper,
+                                          watermarks.get(source), name=f"scrape-{source}")
+            futures[future] = source
+        
+        done, pending = wait(futures, timeout=deadline)
+        for future in done:
+            source = futures[future]
+            try:
+                matches, seconds = future.result()
+            except Exception as e:
+                logger.error(f"Error scraping from {source}: {e}")
+                self.last_run[source] = {'status': 'error', 'error': str(e)}
+                continue
+            all_matches.extend(matches)
+            self.last_run[source] = {'status': 'ok', 'matches': len(matches),
+                                     'seconds': round(seconds, 2)}
+        
+        for future in pending:
+            source = futures[future]
+            logger.warning(f"Scraping from {source} missed the {deadline}s deadline")
+            self.last_run[source] = {'status': 'timeout'}
         
+        # Slow sources finish in the background (or die with the process);
+        # their results are dropped, and they're skipped until they finish
         return all_matches
     
+    def get_new_matches(self, concurrent=True, deadline=None):
+        """
+        New or changed matches: each scraper skips matches on its source's
+        watermark with the same score/status and stops past it, and matches
+        another source already reported are dropped
+        """
+        with self._state_lock:
+            watermarks = {source: self.state.watermark(source) for source in self.scrapers}
+        matches = self.get_all_recent_matches(concurrent, deadline, watermarks)
+        EsportsScraper.http_cache.flush()
+        return self._keep_new(matches)
+    
+    def refresh_source(self, source):
+        """
+        New matches from one source, scraped from its watermark; returns
+        (new matches, seconds). Scraping errors are raised, not logged
+        """
+        with self._state_lock:
+            seen = self.state.watermark(source)
+        if not self._claim(source):
+            raise RuntimeError(f"previous {source} scrape is still running")
+        try:
+            matches, seconds = self._scrape_source(source, self.scrapers[source], seen)
+        finally:
+            EsportsScraper.http_cache.flush()
+        return self._keep_new(matches), seconds
+    
+    def _keep_new(self, matches):
+        """Advance watermarks and drop cross-source duplicates (safe to call from several threads)"""
+        with self._state_lock:
+            by_source = {}
+            for match in matches:
+                by_source.setdefault(match['source'], []).append(match)
+            for source, source_matches in by_source.items():
+                self.state.advance(source, source_matches)
+            
+            new_matches = []
+            duplicates = 0
+            for match in matches:
+                # Only another source's report is a duplicate; the same
+                # source reporting again means the match changed
+                reported_by = self.state.find_duplicate(match)
+                if reported_by and reported_by != match['source']:
+                    duplicates += 1
+                    continue
+                self.state.remember(match)
+                new_matches.append(match)
+            
+            self.state.prune()
+            self.state.save()
+        logger.info(f"{len(new_matches)} new matches ({duplicates} cross-source duplicates dropped)")
+        return new_matches
+    
     def save_matches_to_file(self, matches, filename='matches.json'):
         """Save matches to a JSON file"""
         try:
@@ -212,20 +797,226 @@ class EsportsDataAggregator:
             logger.error(f"Error loading matches: {e}")
             return []
 
+# Refresh schedule per source, in seconds: how often to refresh when the
+# data changes, how far to back off while it doesn't, and how old its data
+# may get before it counts as stale. Live/upcoming match pages change during
+# matches; the results archive rarely does
+SOURCE_SCHEDULES = {
+    'hltv': {'interval': 60, 'max_interval': 600, 'sla': 300},
+    'vlr': {'interval': 60, 'max_interval': 600, 'sla': 300},
+    'liquipedia': {'interval': 900, 'max_interval': 3600, 'sla': 3600}
+}
+DEFAULT_SCHEDULE = {'interval': 300, 'max_interval': 1800, 'sla': 900}
+BACKOFF_FACTOR = 2
+
+class RefreshScheduler:
+    """
+    Refreshes each of an aggregator's sources on its own schedule
+    
+    - A source with nothing new (or an error) waits BACKOFF_FACTOR times
+      longer next time, up to its max_interval; new matches reset it
+    - A source is never refreshed while its previous refresh is running:
+      the next run is only scheduled once the current one has finished
+    - When several sources are due, the most frequently refreshed go first
+    - `on_matches(source, new_matches)` is called with each batch of new
+      matches, one call at a time
+    """
+    
+    def __init__(self, aggregator, schedules=None, on_matches=None):
+        self.aggregator = aggregator
+        self.on_matches = on_matches
+        schedules = SOURCE_SCHEDULES if schedules is None else schedules
+        
+        now = time.monotonic()
+        self.sources = {}
+        for source in aggregator.scrapers:
+            schedule = dict(DEFAULT_SCHEDULE, **schedules.get(source, {}))
+            self.sources[source] = dict(schedule, **{
+                'current_interval': schedule['interval'],
+                'next_run': now,
+                'running': False,
+                'status': 'pending',
+                'runs': 0,
+                'errors': 0,
+                'unchanged_runs': 0,
+                'new_matches': 0,
+                'last_success': None,
+                'last_seconds': None,
+                'total_seconds': 0.0,
+                'last_error': None
+            })
+        
+        self._lock = threading.Lock()
+        self._callback_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        """Refresh every source now, then keep each on its schedule"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="RefreshScheduler", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        # Refreshes still running are on daemon threads: they don't hold up exit
+    
+    def refresh_now(self, source=None):
+        """Make one source (or all of them) due right away"""
+        with self._lock:
+            for name in ([source] if source else self.sources):
+                self.sources[name]['next_run'] = time.monotonic()
+        self._wake.set()
+    
+    def _run(self):
+        while not self._stop.is_set():
+            now = time.monotonic()
+            with self._lock:
+                due = sorted((name for name, state in self.sources.items()
+                              if not state['running'] and state['next_run'] <= now),
+                             key=lambda name: self.sources[name]['interval'])
+                for name in due:
+                    self.sources[name]['running'] = True
+                waits = [state['next_run'] - now for state in self.sources.values()
+                         if not state['running']]
+            
+            # At most one refresh per source runs at a time, so a thread each
+            for name in due:
+                run_in_daemon_thread(self._refresh, name, name=f"refresh-{name}")
+            # Sleep until the next source is due or a refresh finishes
+            self._wake.wait(min(waits) if waits else None)
+            self._wake.clear()
+    
+    def _refresh(self, source):
+        error = None
+        new_matches = []
+        try:
+            new_matches, seconds = self.aggregator.refresh_source(source)
+        except Exception as e:
+            logger.error(f"Error refreshing {source}: {e}")
+            error = e
+        
+        if new_matches and self.on_matches:
+            with self._callback_lock:
+                try:
+                    self.on_matches(source, new_matches)
+                except Exception as e:
+                    logger.error(f"Error handling new matches from {source}: {e}")
+        
+        with self._lock:
+            state = self.sources[source]
+            state['runs'] += 1
+            if error is not None:
+                state['errors'] += 1
+                state['status'] = 'error'
+                state['last_error'] = str(error)
+            else:
+                state['last_success'] = time.time()
+                state['last_seconds'] = seconds
+                state['total_seconds'] += seconds
+                state['new_matches'] += len(new_matches)
+                state['status'] = 'updated' if new_matches else 'unchanged'
+            
+            if new_matches:
+                state['unchanged_runs'] = 0
+                state['current_interval'] = state['interval']
+            else:
+                state['unchanged_runs'] += error is None
+                state['current_interval'] = min(state['current_interval'] * BACKOFF_FACTOR,
+                                                state['max_interval'])
+            state['next_run'] = time.monotonic() + state['current_interval']
+            state['running'] = False
+        self._wake.set()
+    
+    def report(self):
+        """Per-source freshness: data age vs SLA, refresh latency, schedule and counters"""
+        now, wall_now = time.monotonic(), time.time()
+        report = {}
+        with self._lock:
+            for source, state in self.sources.items():
+                age = wall_now - state['last_success'] if state['last_success'] else None
+                successes = state['runs'] - state['errors']
+                report[source] = {
+                    'status': state['status'],
+                    'running': state['running'],
+                    'age_seconds': round(age, 1) if age is not None else None,
+                    'sla_seconds': state['sla'],
+                    'within_sla': age is not None and age <= state['sla'],
+                    'interval_seconds': state['current_interval'],
+                    'next_refresh_seconds': (None if state['running']
+                                             else round(max(state['next_run'] - now, 0), 1)),
+                    'last_latency_seconds': (round(state['last_seconds'], 2)
+                                             if state['last_seconds'] is not None else None),
+                    'avg_latency_seconds': (round(state['total_seconds'] / successes, 2)
+                                            if successes else None),
+                    'runs': state['runs'],
+                    'errors': state['errors'],
+                    'unchanged_runs': state['unchanged_runs'],
+                    'new_matches': state['new_matches'],
+                    'last_error': state['last_error']
+                }
+        return report
+    
+    def print_report(self):
+        print(f"\n{'source':<12}{'status':<11}{'age':>8}{'sla':>7}{'latency':>9}"
+              f"{'interval':>10}{'next':>7}{'runs':>6}{'errors':>8}{'new':>6}")
+        for source, r in self.report().items():
+            age = f"{r['age_seconds']:.0f}s" if r['age_seconds'] is not None else '-'
+            latency = f"{r['last_latency_seconds']:.2f}s" if r['last_latency_seconds'] is not None else '-'
+            next_run = f"{r['next_refresh_seconds']:.0f}s" if r['next_refresh_seconds'] is not None else 'now'
+            print(f"{source:<12}{r['status']:<11}{age:>8}{r['sla_seconds']:>6}s{latency:>9}"
+                  f"{r['interval_seconds']:>9}s{next_run:>7}"
+                  f"{r['runs']:>6}{r['errors']:>8}{r['new_matches']:>6}"
+                  f"{'' if r['within_sla'] else '  ⚠️ stale'}")
+
 # Usage example
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape recent esports matches")
+    parser.add_argument('--watch', action='store_true',
+                        help="keep refreshing each source on its own schedule")
+    parser.add_argument('--report-every', type=int, default=60,
+                        help="seconds between freshness reports with --watch")
+    args = parser.parse_args()
+    
     # Example usage
     aggregator = EsportsDataAggregator()
     
     # Try to load existing data first
     matches = aggregator.load_matches_from_file()
     
-    # If no existing data or data is stale, scrape new data
-    if not matches:
-        print("Scraping new match data...")
-        matches = aggregator.get_all_recent_matches()
-        aggregator.save_matches_to_file(matches)
-    
-    print(f"Total matches: {len(matches)}")
-    for match in matches[:5]:  # Show first 5 matches
-        print(f"{match.get('team1', 'N/A')} vs {match.get('team2', 'N/A')} - {match.get('game', 'N/A')}")
+    if args.watch:
+        def save_new(source, new_matches):
+            # Newest first, like the scrapers return them; a changed match
+            # replaces its old copy (same identity _keep_new uses)
+            changed = {match_fingerprint(match) for match in new_matches}
+            matches[:] = new_matches + [match for match in matches
+                                        if match_fingerprint(match) not in changed]
+            aggregator.save_matches_to_file(matches)
+        
+        scheduler = RefreshScheduler(aggregator, on_matches=save_new)
+        scheduler.start()
+        print("🔄 Refreshing sources on their schedules (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(args.report_every)
+                scheduler.print_report()
+        except KeyboardInterrupt:
+            scheduler.stop()
+            print(f"\nTotal matches: {len(matches)}")
+    else:
+        # If no existing data or data is stale, scrape new data
+        if not matches:
+            print("Scraping new match data...")
+            matches = aggregator.get_new_matches(deadline=60)
+            aggregator.save_matches_to_file(matches)
+        
+        print(f"Total matches: {len(matches)}")
+        for match in matches[:5]:  # Show first 5 matches
+            print(f"{match.get('team1', 'N/A')} vs {match.get('team2', 'N/A')} - {match.get('game', 'N/A')}")
@@ -0,0 +1,297 @@
+# snapshot_share.py - Match snapshots shared between processes through a file
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+from payload_cache import Payload, body_etag, encode_body
+
+logger = logging.getLogger(__name__)
+
+# File layout: MAGIC, header length (uint32), JSON header, then the blobs.
+# The header holds the snapshot version/build time and, per section, the
+# offset (from the start of the file), length and crc32 of its JSON body,
+# its ETag and Last-Modified, and the same for each compressed variant.
+# Workers serve those bytes as they are instead of re-serializing them
+MAGIC = b'MSNP'
+FORMAT_VERSION = 2
+PREFIX = struct.Struct('<4sI')
+SECTIONS = ('matches', 'team_stats', 'leaderboard', 'ratings')
+
+
+def encode_snapshot(snapshot, previous=None):
+    """
+    Snapshot file contents as bytes, plus its header. `previous` (the last
+    header written) keeps Last-Modified for sections that didn't change
+    """
+    blobs = []
+    sections = {}
+    for name in SECTIONS:
+        body = json.dumps(getattr(snapshot, name), separators=(',', ':'),
+                          default=str).encode('utf-8')
+        etag = body_etag(body)
+        modified = int(snapshot.built_at)
+        if previous and previous['sections'][name]['etag'] == etag:
+            modified = previous['sections'][name]['modified']
+        sections[name] = {'etag': etag, 'modified': modified, 'body': len(blobs), 'encoded': {}}
+        blobs.append(body)
+        for encoding, data in encode_body(body).items():
+            sections[name]['encoded'][encoding] = len(blobs)
+            blobs.append(data)
+
+    def build_header(offset):
+        extents = []
+        for blob in blobs:
+            extents.append([offset, len(blob), zlib.crc32(blob)])
+            offset += len(blob)
+        return {
+            'format': FORMAT_VERSION,
+            'version': snapshot.version,
+            'built_at': snapshot.built_at,
+            'match_count': len(snapshot.matches),
+            'sections': {
+                name: dict(entry, body=extents[entry['body']],
+                           encoded={encoding: extents[blob]
+                                    for encoding, blob in entry['encoded'].items()})
+                for name, entry in sections.items()
+            }
+        }
+
+    # Offsets depend on the header's own length, so size it first and pad
+    # the final header to the same length
+    size = len(json.dumps(build_header(10 ** 12)).encode('utf-8'))
+    header = build_header(PREFIX.size + size)
+    prefix = PREFIX.pack(MAGIC, size) + json.dumps(header).encode('utf-8').ljust(size)
+    return prefix + b''.join(blobs), header
+
+
+def read_header(buffer):
+    """Header of snapshot file contents, with every blob checked; raises ValueError if damaged"""
+    magic, size = PREFIX.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a match snapshot file")
+    header = json.loads(bytes(buffer[PREFIX.size:PREFIX.size + size]))
+    if header.get('format') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format: {header.get('format')}")
+
+    view = memoryview(buffer)
+    try:
+        for name in SECTIONS:
+            entry = header['sections'][name]
+            for offset, length, crc in [entry['body'], *entry['encoded'].values()]:
+                blob = view[offset:offset + length]
+                if len(blob) != length or zlib.crc32(blob) != crc:
+                    raise ValueError(f"Corrupt snapshot section: {name}")
+    finally:
+        view.release()
+    return header
+
+
+class SharedSnapshot:
+    """
+    A published snapshot, read from its memory map
+
+    Has the MatchSnapshot fields, but nothing is decoded up front: `matches`
+    (the large section) is decoded each time it's read, the small per-team
+    sections once. payload() hands out a section's published bytes and
+    compressed variants as views into the map, so the data itself lives in
+    the page cache shared by every worker
+    """
+
+    def __init__(self, mapped, header, version):
+        self._view = memoryview(mapped)
+        self._decoded = {}
+        self.header = header
+        self.version = version
+        self.built_at = header['built_at']
+
+    def _blob(self, extent):
+        offset, length, _ = extent
+        return self._view[offset:offset + length]
+
+    def _decode(self, name):
+        return json.loads(bytes(self._blob(self.header['sections'][name]['body'])))
+
+    def _decode_once(self, name):
+        value = self._decoded.get(name)
+        if value is None:
+            value = self._decoded[name] = self._decode(name)
+        return value
+
+    @property
+    def matches(self):
+        return tuple(self._decode('matches'))
+
+    @property
+    def team_stats(self):
+        return self._decode_once('team_stats')
+
+    @property
+    def leaderboard(self):
+        return self._decode_once('leaderboard')
+
+    @property
+    def ratings(self):
+        return self._decode_once('ratings')
+
+    def payload(self, name, mimetype='application/json'):
+        """The section's JSON as a payload_cache.Payload over the map"""
+        entry = self.header['sections'][name]
+        encoded = {encoding: self._blob(extent) for encoding, extent in entry['encoded'].items()}
+        return Payload(self._blob(entry['body']), mimetype, entry['etag'], entry['modified'], encoded)
+
+
+class SnapshotPublisher:
+    """
+    Writes each new snapshot to `path` for worker processes to pick up
+
+    The file is written next to its destination and moved into place with
+    os.replace, so readers only ever see a complete old or new file
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.metrics = {'published': 0, 'last_publish_seconds': 0, 'bytes': 0}
+        self._header = None
+
+    def publish(self, snapshot):
+        start = time.perf_counter()
+        data, header = encode_snapshot(snapshot, self._header)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        self._header = header
+        self.metrics['published'] += 1
+        self.metrics['bytes'] = len(data)
+        self.metrics['last_publish_seconds'] = round(time.perf_counter() - start, 4)
+        logger.info(f"Published snapshot v{snapshot.version} ({len(data)} bytes) to {self.path}")
+
+
+class SharedSnapshotReader:
+    """
+    Serves the snapshot a refresher process publishes, in place of a
+    MatchRepository (same get()/get_metrics()/start()/stop())
+
+    - Never scrapes: the file is the only data source
+    - At most every `check_interval` seconds a get() stats the file; when it
+      has been replaced, the new file is memory-mapped read-only, checked
+      and swapped in with one reference assignment as a SharedSnapshot, so
+      requests see either the old or the new snapshot, never a mix. An old
+      map is released once no request is using it any more
+    - Versions are local to this process, so a restarted refresher that
+      starts counting from 1 again can't collide with cached payloads
+    """
+
+    def __init__(self, path, ttl=300, check_interval=1.0, wait_timeout=30):
+        self.path = str(path)
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self.wait_timeout = wait_timeout
+
+        self._snapshot = None
+        self._file_id = None
+        self._next_check = 0
+        self._load_lock = threading.Lock()
+
+        self.metrics = {
+            'hits': 0,
+            'swaps': 0,
+            'load_errors': 0,
+            'published_version': None,
+            'last_load_seconds': 0,
+            'last_error': None
+        }
+
+    def get(self):
+        """Current snapshot, switching to a newly published one if there is one"""
+        if time.monotonic() >= self._next_check:
+            self._check()
+        if self._snapshot is None:
+            return self._wait_for_first()
+        self.metrics['hits'] += 1
+        return self._snapshot
+
+    def _check(self):
+        if not self._load_lock.acquire(blocking=self._snapshot is None):
+            return  # Another thread is already loading
+        try:
+            self._next_check = time.monotonic() + self.check_interval
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                return
+            file_id = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if file_id != self._file_id:
+                self._load(file_id)
+        finally:
+            self._load_lock.release()
+
+    def _load(self, file_id):
+        start = time.perf_counter()
+        try:
+            with open(self.path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            header = read_header(mapped)
+        except (OSError, ValueError, KeyError, TypeError, struct.error) as e:
+            self.metrics['load_errors'] += 1
+            self.metrics['last_error'] = str(e)
+            logger.error(f"Error loading snapshot from {self.path}: {e}")
+            return
+
+        version = self._snapshot.version + 1 if self._snapshot else 1
+        self._snapshot = SharedSnapshot(mapped, header, version)
+        self._file_id = file_id
+
+        self.metrics['swaps'] += 1
+        self.metrics['published_version'] = header['version']
+        self.metrics['last_load_seconds'] = round(time.perf_counter() - start, 4)
+
+    def _wait_for_first(self):
+        """Block until the refresher has published something"""
+        deadline = time.monotonic() + self.wait_timeout
+        while self._snapshot is None:
+            if time.monotonic() >= deadline:
+                raise RuntimeError(f"No snapshot published at {self.path} "
+                                   f"after {self.wait_timeout}s - is the refresher running?")
+            time.sleep(min(self.check_interval, 0.2))
+            self._next_check = 0
+            self._check()
+        return self._snapshot
+
+    def refresh(self, wait=False):
+        """Pick up a newly published file now (refreshing is the refresher's job)"""
+        self._next_check = 0
+        return self.get()
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def get_metrics(self):
+        snapshot = self._snapshot
+        metrics = dict(self.metrics)
+        metrics.update({
+            'role': 'worker',
+            'snapshot_file': self.path,
+            'version': snapshot.version if snapshot else 0,
+            'matches': snapshot.header['match_count'] if snapshot else 0,
+            'snapshot_age_seconds': round(time.time() - snapshot.built_at, 2) if snapshot else None,
+            'stale': time.time() - snapshot.built_at > self.ttl if snapshot else True,
+            'ttl': self.ttl
+        })
+        return metrics
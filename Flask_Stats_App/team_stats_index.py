@@ -0,0 +1,260 @@
+# team_stats_index.py - Incrementally maintained team statistics
+import threading
+from bisect import bisect_left, bisect_right, insort
+
+
+def match_key(match):
+    """Stable identity of a match: (source, id), or its content when it has no id"""
+    if match.get('id') is not None:
+        return (match.get('source'), match['id'])
+    return (match.get('source'), match.get('date'), match.get('game'),
+            match.get('team1'), match.get('team2'))
+
+
+def _contribution(match):
+    """The parts of a match the index depends on"""
+    return (match['team1'], match['team2'], match['winner'], match['game'], match['date'])
+
+
+def _win_rate(wins, played):
+    return round((wins / played) * 100, 1) if played else 0
+
+
+def totals_stats(team, games):
+    """Stats dict (as TeamStatsIndex.stats) from {game: (played, wins)} totals"""
+    played = sum(counts[0] for counts in games.values())
+    wins = sum(counts[1] for counts in games.values())
+    return {
+        'name': team,
+        'matches_played': played,
+        'wins': wins,
+        'losses': played - wins,
+        'win_rate': _win_rate(wins, played),
+        'games': [game for game, counts in games.items() if counts[0]]
+    }
+
+
+class Leaderboard:
+    """Teams kept sorted by win rate (ties by name) with bisect"""
+
+    def __init__(self):
+        self._entries = []
+        self._keys = {}
+
+    def update(self, team, win_rate):
+        key = (-win_rate, team)
+        old = self._keys.get(team)
+        if old == key:
+            return
+        if old is not None:
+            del self._entries[bisect_left(self._entries, old)]
+        insort(self._entries, key)
+        self._keys[team] = key
+
+    def remove(self, team):
+        old = self._keys.pop(team, None)
+        if old is not None:
+            del self._entries[bisect_left(self._entries, old)]
+
+    def teams(self, limit=None):
+        entries = self._entries if limit is None else self._entries[:limit]
+        return [team for _, team in entries]
+
+
+class TeamRecord:
+    """Totals for one team: overall, per game and per day"""
+
+    def __init__(self, name):
+        self.name = name
+        self.played = 0
+        self.wins = 0
+        self.games = {}      # game -> [played, wins]
+        self.days = {}       # (game, date) and (None, date) -> [played, wins]
+        self.day_index = {}  # game or None -> sorted dates
+
+    def add(self, game, date, won, sign):
+        self.played += sign
+        self.wins += sign * won
+
+        counts = self.games.setdefault(game, [0, 0])
+        counts[0] += sign
+        counts[1] += sign * won
+        if not counts[0]:
+            del self.games[game]
+
+        for bucket in (None, game):
+            counts = self.days.get((bucket, date))
+            if counts is None:
+                counts = self.days[(bucket, date)] = [0, 0]
+                insort(self.day_index.setdefault(bucket, []), date)
+            counts[0] += sign
+            counts[1] += sign * won
+            if not counts[0]:
+                del self.days[(bucket, date)]
+                dates = self.day_index[bucket]
+                del dates[bisect_left(dates, date)]
+
+    def totals(self, game=None, start=None, end=None):
+        """(played, wins), optionally for one game and/or an inclusive date range"""
+        if start is None and end is None:
+            if game is None:
+                return self.played, self.wins
+            return tuple(self.games.get(game, (0, 0)))
+
+        dates = self.day_index.get(game, [])
+        lo = bisect_left(dates, start) if start else 0
+        hi = bisect_right(dates, end) if end else len(dates)
+        played = wins = 0
+        for date in dates[lo:hi]:
+            counts = self.days[(game, date)]
+            played += counts[0]
+            wins += counts[1]
+        return played, wins
+
+
+class TeamStatsIndex:
+    """
+    Team statistics updated by deltas instead of rescanning every match
+
+    Each match is remembered by match_key(); applying a corrected match
+    first subtracts what the old version contributed. Leaderboards (overall
+    and per game) stay sorted as teams change, so reading them is O(teams)
+    """
+
+    def __init__(self):
+        self.teams = {}
+        self.matches = {}
+        self.leaderboards = {None: Leaderboard()}
+        self.synced_at = None
+        self._lock = threading.RLock()
+
+    def apply(self, match):
+        """Add a new match or replace a corrected one; returns True if anything changed"""
+        key = match_key(match)
+        contribution = _contribution(match)
+        with self._lock:
+            old = self.matches.get(key)
+            if old == contribution:
+                return False
+            if old is not None:
+                self._add(old, -1)
+            self.matches[key] = contribution
+            self._add(contribution, 1)
+            return True
+
+    def remove(self, key):
+        """Remove a match by match_key(); returns True if it was indexed"""
+        with self._lock:
+            old = self.matches.pop(key, None)
+            if old is None:
+                return False
+            self._add(old, -1)
+            return True
+
+    def sync(self, matches):
+        """
+        Make the index match a full match list: new and corrected matches are
+        applied, matches no longer present are removed. Returns changes made
+        """
+        with self._lock:
+            seen = set()
+            changed = 0
+            for match in matches:
+                seen.add(match_key(match))
+                changed += self.apply(match)
+            for key in [k for k in self.matches if k not in seen]:
+                changed += self.remove(key)
+            return changed
+
+    def sync_store(self, store):
+        """
+        Apply every match a MatchStore has inserted or changed since the last
+        call (all of them the first time). Returns changes made
+        """
+        with self._lock:
+            rows, self.synced_at = store.updated_since(self.synced_at)
+            return sum(self.apply(match) for match in rows)
+
+    def _add(self, contribution, sign):
+        team1, team2, winner, game, date = contribution
+        touched = []
+        for team in (team1, team2):
+            record = self.teams.get(team)
+            if record is None:
+                record = self.teams[team] = TeamRecord(team)
+            record.add(game, date, int(winner == team), sign)
+            touched.append(record)
+
+        board = self.leaderboards.get(game)
+        if board is None:
+            board = self.leaderboards[game] = Leaderboard()
+
+        for record in touched:
+            if record.played:
+                self.leaderboards[None].update(record.name, _win_rate(record.wins, record.played))
+            else:
+                self.leaderboards[None].remove(record.name)
+                del self.teams[record.name]
+
+            played, wins = record.totals(game)
+            if played:
+                board.update(record.name, _win_rate(wins, played))
+            else:
+                board.remove(record.name)
+
+    def stats(self, team, game=None, start=None, end=None):
+        """Stats dict for one team (same shape as calculate_team_stats), or None"""
+        with self._lock:
+            record = self.teams.get(team)
+            if record is None:
+                return None
+            played, wins = record.totals(game, start, end)
+            if game is not None:
+                games = [game]
+            elif start is None and end is None:
+                games = list(record.games)
+            else:
+                games = [g for g in record.games if record.totals(g, start, end)[0]]
+            return {
+                'name': team,
+                'matches_played': played,
+                'wins': wins,
+                'losses': played - wins,
+                'win_rate': _win_rate(wins, played),
+                'games': games if played else []
+            }
+
+    def team_stats(self):
+        """All teams, like calculate_team_stats()"""
+        with self._lock:
+            return {team: self.stats(team) for team in self.teams}
+
+    def leaderboard(self, game=None, limit=None):
+        """Team stats sorted by win rate, overall or for one game"""
+        with self._lock:
+            board = self.leaderboards.get(game)
+            if board is None:
+                return []
+            return [self.stats(team, game) for team in board.teams(limit)]
+
+    def ranked(self, game=None, start=None, end=None):
+        """
+        Leaderboard for a game and/or date range. Without a range this is the
+        maintained leaderboard; with one, teams are ranked on the fly
+        """
+        if start is None and end is None:
+            return self.leaderboard(game)
+        with self._lock:
+            stats = [self.stats(team, game, start, end) for team in self.teams]
+        stats = [s for s in stats if s and s['matches_played']]
+        return sorted(stats, key=lambda s: (-s['win_rate'], s['name']))
+
+    def breakdown(self, team, start=None, end=None):
+        """A team's stats overall and per game, optionally for a date range"""
+        with self._lock:
+            overall = self.stats(team, start=start, end=end)
+            if overall is None:
+                return None
+            overall['by_game'] = {game: self.stats(team, game, start, end)
+                                  for game in self.teams[team].games}
+            return overall
@@ -0,0 +1,124 @@
+# test_scraper_cache.py - EsportsScraper.get_page against a local http.server stub
+# Run from the app directory (scraper.py split out as in setup_guide.md):
+#   python -m unittest discover tests
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scraper import EsportsScraper, HostRateLimiter, ResponseCache
+
+ETAG = '"v1"'
+BODY = b'<html><body>matches</body></html>'
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Serves BODY with an ETag, 304s a matching If-None-Match and answers
+    the first `server.throttle` requests with 429
+    """
+    
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        if server.throttle > 0:
+            server.throttle -= 1
+            self.send_response(429)
+            self.send_header('Retry-After', '0')
+            self.end_headers()
+        elif self.headers.get('If-None-Match') == ETAG:
+            self.send_response(304)
+            self.end_headers()
+        else:
+            self.send_response(200)
+            self.send_header('ETag', ETAG)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', str(len(BODY)))
+            self.end_headers()
+            self.wfile.write(BODY)
+    
+    def log_message(self, *args):
+        pass
+
+
+class CountingRateLimiter(HostRateLimiter):
+    def __init__(self):
+        super().__init__(host_limits={})
+        self.waits = 0
+    
+    def wait(self, host, delay=1):
+        self.waits += 1
+        return super().wait(host, delay)
+
+
+class GetPageTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        self.server.requests = []
+        self.server.throttle = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/matches"
+        
+        self.cache_dir = tempfile.mkdtemp()
+        self.scraper = EsportsScraper()
+        self.scraper.http_cache = ResponseCache(self.cache_dir)
+        self.scraper.rate_limiter = CountingRateLimiter()
+        self.scraper.rate_limiter.configure(f"127.0.0.1:{self.server.server_port}", 1000, 10)
+    
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.cache_dir)
+    
+    def test_revalidated_page_comes_from_cache(self):
+        first = self.scraper.get_page(self.url)
+        second = self.scraper.get_page(self.url)
+        
+        self.assertEqual(first.content, BODY)
+        self.assertFalse(getattr(first, 'from_cache', False))
+        self.assertEqual(second.content, BODY)
+        self.assertTrue(second.from_cache)
+        self.assertEqual(self.server.requests[1].get('If-None-Match'), ETAG)
+    
+    def test_vanished_body_is_refetched_through_the_rate_limiter(self):
+        self.scraper.get_page(self.url)
+        cache = self.scraper.http_cache
+        os.remove(cache._body_path(cache.key_for(self.url)))
+        
+        response = self.scraper.get_page(self.url)
+        
+        self.assertEqual(response.content, BODY)
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertNotIn('If-None-Match', self.server.requests[2])
+        self.assertEqual(self.scraper.rate_limiter.waits, 3)
+    
+    def test_429_is_retried(self):
+        self.server.throttle = 2
+        
+        response = self.scraper.get_page(self.url)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.server.requests), 3)
+    
+    def test_cache_hits_defer_index_writes(self):
+        cache = self.scraper.http_cache
+        self.scraper.get_page(self.url)
+        writes = cache.stats['index_writes']
+        
+        for _ in range(5):
+            self.assertTrue(self.scraper.get_page(self.url).from_cache)
+        self.assertLessEqual(cache.stats['index_writes'], writes + 1)
+        
+        cache.flush()
+        reloaded = ResponseCache(self.cache_dir)
+        key = cache.key_for(self.url)
+        self.assertEqual(reloaded._load_index()[key]['last_used'], cache.index[key]['last_used'])
+
+
+if __name__ == '__main__':
+    unittest.main()